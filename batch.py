@@ -0,0 +1,328 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+import multiprocessing.util
+from selenium.common.exceptions import WebDriverException
+
+from setup import setup_driver, quit_driver
+from static_engine import StaticDriver
+from instrumentation import TRACER
+from fingerprint import FingerprintStore
+from utils import save_result, collect_results, report_sink, stream_results
+from report import REPORT_DIRECTORY, REPORT_NAME, RowSink
+from records import ResultTable
+from sharding import SHARD_DIRECTORY, parse_shard, shard_from_env, select_shard, shard_name, write_manifest
+from history import new_run_id
+from log_pipeline import set_run_id, worker_logs, forward_logging
+from test_automation import (
+    run_audit, default_tests, add_common_arguments, open_link_cache, open_history, open_replay, open_http_session,
+    build_check_options,
+)
+
+
+# Per-process state of a batch worker: its browser session and how many pages it served
+_worker = {}
+
+
+def read_urls(source):
+    """
+    Read URLs from a file, or from stdin when `source` is "-".
+
+    Blank lines and lines starting with '#' are ignored; duplicates are dropped.
+
+    Args:
+        source (str): Path of a file with one URL per line, or "-".
+
+    Returns:
+        list: URLs in their original order.
+    """
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+    urls = []
+    seen = set()
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#") and line not in seen:
+            seen.add(line)
+            urls.append(line)
+    return urls
+
+
+def _init_worker(args, log_queue):
+    """Process initializer: remember the options; the driver is started lazily."""
+    # Only the parent writes the log files
+    forward_logging(log_queue)
+    # Close the browser when the worker exits normally (pool.close() + join())
+    multiprocessing.util.Finalize(None, _shutdown_worker, exitpriority=10)
+    if args.trace or args.profile_checks:
+        TRACER.enable(profile_dir=args.profile_checks)
+    _worker["args"] = args
+    set_run_id(args.run_id)
+    _worker["driver"] = None
+    _worker["pages"] = 0
+    _worker["static"] = StaticDriver() if args.engine != "browser" else None
+    _worker["link_cache"] = open_link_cache(args)
+    _worker["fingerprints"] = FingerprintStore(args.fingerprints) if args.incremental else None
+    # All workers append to the run started by the parent process
+    _worker["history"] = open_history(args, run_id=getattr(args, "run_id", None))
+    # One pooled HTTP session per worker, so link checks reuse connections across pages
+    _worker["http_session"] = open_http_session(args)
+    _worker["check_options"] = build_check_options(args, _worker["link_cache"], _worker["http_session"])
+    # With --stream every worker writes its rows to its own part files of the report
+    _worker["sink"] = RowSink(
+        fmt=args.report_format, directory=args.stream_directory, name=args.stream_name,
+        buffer_rows=args.stream_buffer, part=os.getpid(),
+    ) if args.stream else None
+
+
+def _start_driver():
+    args = _worker["args"]
+    _worker["driver"] = setup_driver(
+        browser=args.browser, headless=args.headless, reuse_profile=not args.fresh_profile,
+        page_load=args.page_load, block_images=args.block_images,
+    )
+    _worker["pages"] = 0
+    logging.info(f"Worker {os.getpid()} started a new {args.browser} session.")
+
+
+def _stop_driver():
+    driver = _worker.get("driver")
+    _worker["driver"] = None
+    if driver is not None:
+        try:
+            quit_driver(driver)
+        except WebDriverException as e:
+            logging.warning(f"Worker {os.getpid()} could not quit its session cleanly: {e}")
+
+
+def _driver_alive(driver):
+    try:
+        driver.title
+        return True
+    except WebDriverException:
+        return False
+
+
+def _audit_url(url, page_url=None):
+    """
+    Audit one URL in a worker process, recycling the browser session when needed.
+
+    With --stream the rows are written to the worker's part of the report, tagged with
+    `page_url` (default: `url`), and no sheets are returned.
+
+    Returns:
+        tuple: (url, {sheet name: ResultTable}, error message or None, seconds, worker pid)
+    """
+    started = time.time()
+    args = _worker["args"]
+
+    if _worker["driver"] is not None and _worker["pages"] >= args.recycle_after:
+        logging.info(f"Worker {os.getpid()} recycling its session after {_worker['pages']} pages.")
+        _stop_driver()
+
+    error = None
+    sheets = {}
+    try:
+        if _worker["driver"] is None:
+            _start_driver()
+        sink = _worker["sink"]
+        results = stream_results(sink, prefix={"page_url": page_url or url}) if sink else collect_results()
+        with results as collected:
+            run_audit(
+                _worker["driver"], url, tests=default_tests(args), check_options=_worker["check_options"],
+                engine=args.engine, static_driver=_worker["static"],
+                fingerprints=_worker["fingerprints"], force=args.full, history=_worker["history"],
+            )
+        if not sink:
+            sheets = {name: ResultTable.concat(frames) for name, frames in collected.items()}
+        _worker["pages"] += 1
+        if _worker["history"]:
+            _worker["history"].flush()
+    except Exception as e:
+        logging.error(f"Worker {os.getpid()} failed to audit {url}: {e}", exc_info=True)
+        error = str(e)
+
+    # A crashed browser is replaced before the next page
+    if _worker["driver"] is not None and (error or not _driver_alive(_worker["driver"])):
+        logging.warning(f"Worker {os.getpid()} session is unusable, restarting it.")
+        _stop_driver()
+
+    return url, sheets, error, time.time() - started, os.getpid()
+
+
+def _audit_target(target):
+    """Audit a (URL to load, URL to report) pair; see _audit_url."""
+    return _audit_url(*target)
+
+
+def _shutdown_worker():
+    _stop_driver()
+    if _worker.get("sink"):
+        _worker["sink"].close()
+    if _worker.get("static"):
+        _worker["static"].quit()
+    if _worker.get("http_session"):
+        _worker["http_session"].close()
+    if _worker.get("link_cache"):
+        _worker["link_cache"].close()
+    if _worker.get("fingerprints"):
+        _worker["fingerprints"].close()
+    if _worker.get("history"):
+        _worker["history"].close()
+    if _worker["args"].trace:
+        # One trace per worker process
+        TRACER.export(_worker["args"].trace, suffix=f"-{os.getpid()}")
+
+
+def merge_results(outcomes):
+    """
+    Merge per-URL results into one table per sheet, tagged with the audited page URL.
+
+    Args:
+        outcomes (iterable): (url, sheets, error, seconds, pid) tuples from the workers.
+
+    Returns:
+        dict: Sheet name mapped to the merged ResultTable, plus a 'Batch Summary' sheet.
+    """
+    frames = {}
+    summary = []
+    for url, sheets, error, seconds, pid in outcomes:
+        for name, df in sheets.items():
+            df = df.copy()
+            df.insert(0, "page_url", url)
+            frames.setdefault(name, []).append(df)
+        summary.append({
+            "page_url": url,
+            "result": "Fail" if error else "Pass",
+            "comments": error or "Audited",
+            "seconds": round(seconds, 2),
+            "worker": pid,
+        })
+
+    merged = {name: ResultTable.concat(dfs) for name, dfs in frames.items()}
+    merged["Batch Summary"] = ResultTable.from_records(summary)
+    return merged
+
+
+def run_batch(urls, args):
+    """
+    Audit many URLs over a pool of long-lived browser sessions in worker processes.
+
+    Args:
+        urls (list): URLs to audit.
+        args (argparse.Namespace): Parsed arguments (see add_common_arguments and main).
+
+    Returns:
+        dict: Sheet name mapped to the merged ResultTable.
+    """
+    workers = max(1, min(args.workers, len(urls)))
+    logging.info(f"Auditing {len(urls)} URLs with {workers} browser sessions.")
+
+    # With --replay the workers audit the recorded copies; results keep the original URLs
+    replay = open_replay(args)
+    targets = {replay.url_for(url): url for url in urls} if replay else {url: url for url in urls}
+
+    outcomes = []
+    context = multiprocessing.get_context("spawn")
+    with worker_logs(context) as log_queue:
+        pool = context.Pool(processes=workers, initializer=_init_worker, initargs=(args, log_queue))
+        try:
+            for i, outcome in enumerate(pool.imap_unordered(_audit_target, targets.items()), start=1):
+                outcome = (targets[outcome[0]], *outcome[1:])
+                outcomes.append(outcome)
+                logging.info(f"[{i}/{len(urls)}] Finished {outcome[0]} in {outcome[3]:.1f}s")
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            if replay:
+                replay.stop()
+
+    return merge_results(outcomes)
+
+
+def main():
+    """Entry point for auditing a list of URLs in parallel."""
+    parser = argparse.ArgumentParser(description="Run the automation tests over many URLs in parallel.")
+    parser.add_argument(
+        "urls",
+        type=str,
+        help="File with one URL per line, or '-' to read URLs from stdin."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of parallel browser sessions (default: number of CPUs)."
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        default=None,
+        help="Only audit shard 'i/N' of the URL list (0 <= i < N), e.g. one per machine. "
+             "Defaults to the SHARD (or SHARD_INDEX/SHARD_COUNT) environment variable."
+    )
+    parser.add_argument(
+        "--recycle-after",
+        type=int,
+        default=50,
+        help="Restart a browser session after this many pages (default: 50)."
+    )
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    urls = read_urls(args.urls)
+    # Shards of one run on several machines can share a run id through RUN_ID
+    args.run_id = os.getenv("RUN_ID") or new_run_id()
+    set_run_id(args.run_id)
+    shard = parse_shard(args.shard) if args.shard else shard_from_env()
+    if shard:
+        urls = select_shard(urls, *shard)
+        logging.info(f"Shard {shard[0]}/{shard[1]}: {len(urls)} URLs assigned.")
+    if not urls and not shard:
+        logging.warning("No URLs to audit.")
+        return
+    if args.stream and args.report_format == "xlsx":
+        parser.error("--stream needs --report-format csv or parquet, since every worker writes its own part.")
+    # Streamed rows go straight to the report the run writes (see _init_worker)
+    if shard:
+        args.stream_directory, args.stream_name = SHARD_DIRECTORY, shard_name(*shard)
+    else:
+        args.stream_directory, args.stream_name = REPORT_DIRECTORY, REPORT_NAME
+    if args.stream:
+        RowSink(fmt=args.report_format, directory=args.stream_directory, name=args.stream_name).clear()
+
+    if not shard:
+        results = run_batch(urls, args)
+        with report_sink(fmt=args.report_format):
+            for name, df in results.items():
+                save_result(df, name)
+        return
+
+    # Each shard writes its own report and manifest; sharding.py merges them
+    results = {}
+    try:
+        if urls:
+            results = run_batch(urls, args)
+        with report_sink(
+            fmt=args.report_format, directory=SHARD_DIRECTORY, name=shard_name(*shard), keep_existing=False,
+        ):
+            for name, df in results.items():
+                save_result(df, name)
+    except BaseException as e:
+        write_manifest(*shard, urls, results, fmt=args.report_format, error=str(e) or type(e).__name__)
+        raise
+    write_manifest(*shard, urls, results, fmt=args.report_format)
+
+
+if __name__ == "__main__":
+    main()
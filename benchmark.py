@@ -0,0 +1,304 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+
+from setup import setup_driver, quit_driver
+from utils import collect_results, report_sink, stream_results
+from report import RowSink
+from page_session import PageSession
+from static_engine import StaticDriver
+from fixture_site import FixtureSite, page_path
+from test_automation import BROWSER_ONLY_TESTS, default_tests, run_audit
+
+
+# Entry-point modules whose import time is measured, and the heavy libraries they should not load
+STARTUP_MODULES = ("test_automation", "batch")
+HEAVY_MODULES = ("pandas", "openpyxl", "webdriver_manager")
+
+# Pages the benchmark runs against; each one stresses a different part of the suite
+SCENARIOS = {
+    "small": {"links": 20, "images": 10, "headings": 3, "currencies": 3, "tiles": 5, "lazy": 0},
+    "medium": {"links": 150, "images": 60, "headings": 6, "currencies": 8, "tiles": 20, "lazy": 10},
+    "large": {"links": 600, "images": 300, "headings": 6, "currencies": 12, "tiles": 60, "lazy": 30},
+}
+
+
+def git_revision():
+    """Return the current commit hash, or 'unknown' outside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _time(func, repeat):
+    timings = []
+    value = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), timings, value
+
+
+def measure_startup(repeat=3):
+    """
+    Time a cold import of each entry-point module in a fresh interpreter.
+
+    Returns:
+        dict: Module name mapped to the median seconds and the heavy libraries it imported.
+    """
+    results = {}
+    for module in STARTUP_MODULES:
+        code = (
+            f"import sys, json; import {module}; "
+            f"print(json.dumps([m for m in {list(HEAVY_MODULES)!r} if m in sys.modules]))"
+        )
+        timings = []
+        loaded = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = subprocess.check_output(
+                [sys.executable, "-c", code], text=True, stderr=subprocess.DEVNULL,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+            )
+            timings.append(time.perf_counter() - started)
+            loaded = json.loads(output.strip().splitlines()[-1])
+        results[module] = {"median_s": round(statistics.median(timings), 4), "heavy_modules": loaded}
+        logging.info(f"Startup of {module}: {statistics.median(timings):.3f}s")
+    return results
+
+
+def measure_memory(driver, static_driver, url, tests, engine, check_options, pages=10, stream=False):
+    """
+    Measure the Python memory of auditing the same page `pages` times while keeping every
+    result, as a batch worker does until the report is written.
+
+    With `stream` the rows are streamed to a throwaway CSV report instead (see
+    utils.stream_results), so nothing should be retained from one page to the next.
+
+    Returns:
+        dict: KiB retained per page and peak MiB during the run.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        sink = RowSink(fmt="csv", directory=directory) if stream else None
+        tracemalloc.start()
+        try:
+            kept = []
+            baseline, _ = tracemalloc.get_traced_memory()
+            for _ in range(pages):
+                with stream_results(sink) if stream else collect_results() as collected:
+                    run_audit(
+                        driver, url, tests=tests, check_options=check_options,
+                        engine=engine, static_driver=static_driver,
+                    )
+                if not stream:
+                    kept.append(collected)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            if sink:
+                sink.close()
+    return {
+        "retained_kib_per_page": round((current - baseline) / pages / 1024, 1),
+        "peak_mib": round(peak / 1024 / 1024, 2),
+    }
+
+
+def bench_checks(driver, static_driver, url, tests, repeat, check_options):
+    """
+    Time each check on its own, including its page load.
+
+    Returns:
+        list: One dict per check with median/min/max seconds and the number of result rows.
+    """
+    rows = []
+    for name, test in tests:
+        engine_driver = driver if static_driver is None or name in BROWSER_ONLY_TESTS else static_driver
+
+        def run_check():
+            with collect_results():
+                return test(engine_driver, url, session=PageSession(engine_driver), **check_options.get(name, {}))
+
+        median, timings, result = _time(run_check, repeat)
+        rows.append({
+            "check": name,
+            "engine": "static" if engine_driver is static_driver else "browser",
+            "median_s": round(median, 4),
+            "min_s": round(min(timings), 4),
+            "max_s": round(max(timings), 4),
+            "rows": len(result),
+        })
+        logging.info(f"{name}: {median:.3f}s (median of {repeat})")
+    return rows
+
+
+def bench_pipeline(driver, static_driver, url, tests, repeat, engine, check_options):
+    """
+    Time the full pipeline used by main(): all checks plus writing the report.
+
+    Returns:
+        dict: Median/min/max seconds and pages per second.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        def run_pipeline():
+            with report_sink(directory=directory):
+                run_audit(
+                    driver, url, tests=tests, check_options=check_options,
+                    engine=engine, static_driver=static_driver,
+                )
+
+        median, timings, _ = _time(run_pipeline, repeat)
+    return {
+        "median_s": round(median, 4),
+        "min_s": round(min(timings), 4),
+        "max_s": round(max(timings), 4),
+        "pages_per_s": round(1 / median, 4) if median else None,
+    }
+
+
+def run_benchmark(args):
+    """
+    Run every selected scenario against the local fixture site.
+
+    Returns:
+        dict: Machine-readable benchmark results.
+    """
+    tests = default_tests(args)
+    driver = None
+    if args.engine == "static":
+        # Without a browser only the DOM-only checks can run
+        tests = [(name, test) for name, test in tests if name not in BROWSER_ONLY_TESTS]
+    else:
+        driver = setup_driver(
+            browser=args.browser, headless=args.headless, reuse_profile=not args.fresh_profile,
+            page_load=args.page_load, block_images=args.block_images,
+        )
+    static_driver = StaticDriver() if args.engine == "static" else None
+
+    # No persistent link cache, so every run measures the same work
+    check_options = {"URL Status Code Test": {"max_workers": args.link_workers, "budget": args.link_budget}}
+
+    results = {
+        "commit": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "engine": args.engine,
+        "browser": None if driver is None else args.browser,
+        "page_load": None if driver is None else args.page_load,
+        "repeat": args.repeat,
+        "driver_startup": getattr(driver, "startup_info", None),
+        "startup": measure_startup(),
+        "scenarios": {},
+    }
+
+    try:
+        with FixtureSite() as site:
+            for scenario in args.scenarios:
+                url = site.url(page_path(scenario, **SCENARIOS[scenario]))
+                logging.info(f"Benchmarking scenario '{scenario}': {url}")
+                results["scenarios"][scenario] = {
+                    "params": SCENARIOS[scenario],
+                    "checks": bench_checks(driver, static_driver, url, tests, args.repeat, check_options),
+                    "pipeline": bench_pipeline(
+                        driver, static_driver, url, tests, args.repeat, args.engine, check_options,
+                    ),
+                    "memory": measure_memory(driver, static_driver, url, tests, args.engine, check_options),
+                    "streamed_memory": measure_memory(
+                        driver, static_driver, url, tests, args.engine, check_options, stream=True,
+                    ),
+                }
+    finally:
+        if driver is not None:
+            quit_driver(driver)
+        if static_driver is not None:
+            static_driver.quit()
+    return results
+
+
+def compare(baseline, current, threshold):
+    """
+    Compare two benchmark result files and list regressions above `threshold` (e.g. 0.1 = 10%).
+
+    Returns:
+        list: Human-readable regression lines (empty if nothing regressed).
+    """
+    regressions = []
+    for module, data in current.get("startup", {}).items():
+        old = baseline.get("startup", {}).get(module)
+        if old and data["median_s"] > old["median_s"] * (1 + threshold):
+            regressions.append(f"startup/{module}: {old['median_s']:.3f}s -> {data['median_s']:.3f}s")
+    for scenario, data in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(scenario)
+        if not before:
+            continue
+        old_checks = {row["check"]: row for row in before["checks"]}
+        for row in data["checks"]:
+            old = old_checks.get(row["check"])
+            if old and old["median_s"] and row["median_s"] > old["median_s"] * (1 + threshold):
+                regressions.append(
+                    f"{scenario}/{row['check']}: {old['median_s']:.3f}s -> {row['median_s']:.3f}s"
+                )
+        old_rate, new_rate = before["pipeline"]["pages_per_s"], data["pipeline"]["pages_per_s"]
+        if old_rate and new_rate and new_rate < old_rate / (1 + threshold):
+            regressions.append(f"{scenario}/pipeline: {old_rate:.3f} -> {new_rate:.3f} pages/s")
+    return regressions
+
+
+def main():
+    """Entry point for the offline benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the checks against a local fixture site.")
+    parser.add_argument("--engine", choices=("browser", "static"), default="browser",
+                        help="'browser' (default) runs every check; 'static' runs DOM-only checks without a browser.")
+    parser.add_argument("--browser", type=str, default="chrome", help="Browser to use: 'chrome' (default) or 'firefox'.")
+    parser.add_argument("--headless", action="store_true", help="Run the browser in headless mode.")
+    parser.add_argument("--fresh-profile", action="store_true", help="Use a throwaway browser profile.")
+    parser.add_argument("--page-load", choices=("lean", "full"), default="lean",
+                        help="Page-load profile for DOM-only checks (default: lean).")
+    parser.add_argument("--resource-status", action="store_true",
+                        help="Also run the Resource Status Test (a second, full page load per page).")
+    parser.add_argument("--block-images", action="store_true", help="With --page-load lean, also block images.")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help="Scenarios to run (default: all).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the median is reported (default: 3).")
+    parser.add_argument("--link-workers", type=int, default=16, help="Concurrent link checks (default: 16).")
+    parser.add_argument("--link-budget", type=float, default=None, help="Time budget for the links of one page.")
+    parser.add_argument("--out", type=str, default=None, help="Write the JSON results to this file (default: stdout).")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="Earlier results file to compare against; exits with status 1 on regressions.")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative slowdown that counts as a regression (default: 0.1).")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    output = json.dumps(results, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+        logging.info(f"Benchmark results saved to {args.out}")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        for line in regressions:
+            logging.warning(f"Regression: {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
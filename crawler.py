@@ -0,0 +1,393 @@
+import os
+import re
+import gzip
+import json
+import math
+import sqlite3
+import hashlib
+import logging
+import argparse
+from urllib.parse import urljoin, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+import lxml.etree
+import lxml.html
+import requests
+
+from link_checker import build_session, normalize_url
+from static_engine import DEFAULT_HEADERS
+from report import read_report
+
+
+DEFAULT_CHECKPOINT_PATH = os.path.join("reports", "crawl.sqlite")
+
+
+class BloomFilter:
+    """
+    Compact, fixed-size set of strings with a bounded false-positive rate and no false negatives.
+
+    Memory stays constant however many URLs are added: about 1.8 MB for one million URLs at
+    a 0.1% error rate. A false positive only means an unseen URL is skipped.
+    """
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001, bits=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8) if bits is None else bytearray(bits)
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item):
+        """Add `item`; return True if it was not in the set before."""
+        new = False
+        for p in self._positions(item):
+            mask = 1 << (p & 7)
+            if not self.bits[p >> 3] & mask:
+                self.bits[p >> 3] |= mask
+                new = True
+        return new
+
+
+class CrawlFrontier:
+    """
+    Breadth-first crawl frontier checkpointed to SQLite.
+
+    The queue of discovered URLs lives on disk, and the seen-set is a BloomFilter kept in
+    memory and saved with every checkpoint. Queue, seen-set, progress and the pending/done
+    counters are written in one transaction, so after a crash or a restart the crawl resumes
+    from the last checkpoint without counting the frontier table.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH, capacity=1_000_000, error_rate=0.001):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS frontier (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                matched INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state, id);
+            CREATE TABLE IF NOT EXISTS crawl_meta (key TEXT PRIMARY KEY, value BLOB);
+            """
+        )
+        meta = dict(self.conn.execute("SELECT key, value FROM crawl_meta"))
+        if "bloom" in meta:
+            settings = json.loads(meta["bloom_settings"])
+            self.seen = BloomFilter(settings["capacity"], settings["error_rate"], bits=meta["bloom"])
+            if "counts" in meta:
+                counts = json.loads(meta["counts"])
+            else:
+                counts = dict(self.conn.execute(
+                    "SELECT state = 'pending', COUNT(*) FROM frontier GROUP BY state = 'pending'"
+                ))
+                counts = {"pending": counts.get(1, 0), "done": counts.get(0, 0)}
+            self._pending, self._done = counts["pending"], counts["done"]
+            logging.info(f"Resuming crawl from {path}: {self.pending()} URLs pending, {self.done()} done.")
+        else:
+            self.seen = BloomFilter(capacity, error_rate)
+            self._pending = self._done = 0
+        self.conn.commit()
+
+    def add(self, url, depth, matched):
+        """Queue `url` unless it was seen before; return True if it was queued."""
+        if not self.seen.add(url):
+            return False
+        self.conn.execute(
+            "INSERT INTO frontier (url, depth, matched) VALUES (?, ?, ?)", (url, depth, int(matched))
+        )
+        self._pending += 1
+        return True
+
+    def next_batch(self, size):
+        """Return up to `size` pending (id, url, depth) rows in discovery order."""
+        return self.conn.execute(
+            "SELECT id, url, depth FROM frontier WHERE state = 'pending' ORDER BY id LIMIT ?", (size,)
+        ).fetchall()
+
+    def mark(self, row_id, state):
+        cursor = self.conn.execute(
+            "UPDATE frontier SET state = ? WHERE id = ? AND state = 'pending'", (state, row_id)
+        )
+        if cursor.rowcount:
+            self._pending -= 1
+            self._done += 1
+
+    def checkpoint(self):
+        """Persist the queue, the progress and the seen-set atomically."""
+        settings = json.dumps({"capacity": self.seen.capacity, "error_rate": self.seen.error_rate})
+        counts = json.dumps({"pending": self._pending, "done": self._done})
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO crawl_meta (key, value) VALUES (?, ?)",
+            [("bloom", bytes(self.seen.bits)), ("bloom_settings", settings), ("counts", counts)],
+        )
+        self.conn.commit()
+
+    def pending(self):
+        return self._pending
+
+    def done(self):
+        return self._done
+
+    def matched_urls(self):
+        """Return the crawled URLs that passed the include filter, in discovery order."""
+        return [row[0] for row in self.conn.execute(
+            "SELECT url FROM frontier WHERE matched = 1 AND state = 'done' ORDER BY id"
+        )]
+
+    def close(self):
+        self.conn.close()
+
+
+def read_sitemap(http, url, timeout=15, limit=None):
+    """
+    Return the page URLs listed in a sitemap, following sitemap index files.
+
+    Args:
+        http (requests.Session): HTTP session.
+        url (str): URL of the sitemap (or sitemap index); .gz files are decompressed.
+        timeout (int): Request timeout in seconds.
+        limit (int | None): Stop after this many URLs.
+
+    Returns:
+        list: Page URLs in sitemap order.
+    """
+    urls = []
+    pending = [url]
+    while pending and (limit is None or len(urls) < limit):
+        sitemap_url = pending.pop(0)
+        try:
+            response = http.get(sitemap_url, timeout=timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logging.warning(f"Could not read sitemap {sitemap_url}: {e}")
+            continue
+        content = response.content
+        if content[:2] == b"\x1f\x8b":
+            content = gzip.decompress(content)
+        root = lxml.etree.fromstring(content, parser=lxml.etree.XMLParser(recover=True))
+        if root is None:
+            continue
+        locations = [loc.text.strip() for loc in root.iterfind(".//{*}loc") if loc.text]
+        if lxml.etree.QName(root).localname == "sitemapindex":
+            pending.extend(locations)
+        else:
+            urls.extend(locations)
+    logging.info(f"Read {len(urls)} URLs from the sitemap {url}.")
+    return urls if limit is None else urls[:limit]
+
+
+def report_links(path, sheet_name="URL Status Test"):
+    """
+    Return the working links collected by an earlier URL Status Test run.
+
+    Args:
+        path (str): Report written by test_automation.py or batch.py (see report.read_report).
+        sheet_name (str): Sheet with the link results.
+
+    Returns:
+        list: URLs of the links that passed, in report order.
+    """
+    df = read_report(path).get(sheet_name)
+    if df is None or "url" not in df.columns:
+        logging.warning(f"No '{sheet_name}' sheet with a 'url' column in {path}.")
+        return []
+    df = df[df["result"] == "Pass"] if "result" in df.columns else df
+    return [url for url in df["url"].dropna().astype(str) if url.startswith(("http://", "https://"))]
+
+
+def extract_links(html, base_url):
+    """Return the absolute http(s) URLs of all <a href> in `html`, without fragments."""
+    try:
+        document = lxml.html.fromstring(html, base_url=base_url)
+    except (lxml.etree.ParserError, ValueError):
+        return []
+    base = document.find(".//base[@href]")
+    if base is not None:
+        base_url = urljoin(base_url, base.get("href"))
+    links = []
+    for element in document.iter("a"):
+        href = (element.get("href") or "").strip()
+        if href:
+            url = urljoin(base_url, href).split("#", 1)[0]
+            if url.startswith(("http://", "https://")):
+                links.append(url)
+    return links
+
+
+class Crawler:
+    """
+    Discover the pages of a site from its sitemap and/or by following internal links.
+
+    Only pages on the hosts of the start URLs are followed. `include` and `exclude` are
+    regular expressions matched against the URL path (plus query): excluded URLs are never
+    queued, and only URLs matching `include` (when given) are reported for auditing, while
+    other internal pages are still followed to discover them.
+    """
+
+    def __init__(self, frontier, max_depth=2, include=None, exclude=None, max_pages=None, workers=8,
+                 timeout=15, checkpoint_every=50, session=None):
+        self.frontier = frontier
+        self.max_depth = max_depth
+        self.include = [re.compile(pattern) for pattern in include or []]
+        self.exclude = [re.compile(pattern) for pattern in exclude or []]
+        self.max_pages = max_pages
+        self.workers = workers
+        self.timeout = timeout
+        self.checkpoint_every = checkpoint_every
+        self.http = session or build_session(pool_size=workers)
+        self.http.headers.update(DEFAULT_HEADERS)
+        self.hosts = set()
+
+    def _path(self, url):
+        parts = urlsplit(url)
+        return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+    def _allowed(self, url):
+        return urlsplit(url).netloc in self.hosts and not any(p.search(self._path(url)) for p in self.exclude)
+
+    def _matches(self, url):
+        return not self.include or any(p.search(self._path(url)) for p in self.include)
+
+    def enqueue(self, url, depth):
+        url = normalize_url(url)
+        if depth > self.max_depth or not self._allowed(url):
+            return False
+        return self.frontier.add(url, depth, self._matches(url))
+
+    def seed(self, start_urls, sitemap_urls=(), known_links=()):
+        """
+        Queue the start URLs and every URL listed in the given sitemaps at depth 0, and links
+        already collected from audited pages (e.g. report_links()) at depth 1.
+        """
+        self.hosts.update(urlsplit(normalize_url(url)).netloc for url in start_urls)
+        added = sum(self.enqueue(url, 0) for url in start_urls)
+        for sitemap_url in sitemap_urls:
+            added += sum(self.enqueue(url, 0) for url in read_sitemap(self.http, sitemap_url, self.timeout))
+        added += sum(self.enqueue(url, 1) for url in known_links)
+        self.frontier.checkpoint()
+        logging.info(f"Seeded the crawl frontier with {added} new URLs.")
+
+    def _fetch(self, url):
+        try:
+            response = self.http.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            logging.warning(f"Could not fetch {url}: {e}")
+            return None, []
+        if response.status_code >= 400:
+            return response.status_code, []
+        if "html" not in response.headers.get("Content-Type", ""):
+            return response.status_code, []
+        return response.status_code, extract_links(response.content, response.url)
+
+    def run(self):
+        """
+        Crawl until the frontier is empty or `max_pages` pages were fetched in total.
+
+        Returns:
+            int: Number of pages fetched in this run.
+        """
+        fetched = 0
+        since_checkpoint = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                size = self.workers
+                if self.max_pages is not None:
+                    size = min(size, self.max_pages - self.frontier.done())
+                batch = self.frontier.next_batch(size) if size > 0 else []
+                if not batch:
+                    break
+                for (row_id, url, depth), (status, links) in zip(
+                    batch, executor.map(lambda row: self._fetch(row[1]), batch)
+                ):
+                    self.frontier.mark(row_id, "done" if status is not None and status < 400 else "failed")
+                    for link in links:
+                        self.enqueue(link, depth + 1)
+                fetched += len(batch)
+                since_checkpoint += len(batch)
+                if since_checkpoint >= self.checkpoint_every:
+                    self.frontier.checkpoint()
+                    since_checkpoint = 0
+                    logging.info(f"Crawled {self.frontier.done()} pages, {self.frontier.pending()} pending.")
+        self.frontier.checkpoint()
+        return fetched
+
+
+def main():
+    """Entry point for discovering the URLs to audit."""
+    parser = argparse.ArgumentParser(description="Discover the pages of a site to audit with batch.py.")
+    parser.add_argument("start_urls", nargs="+", help="Start URL(s); only their hosts are crawled.")
+    parser.add_argument("--sitemap", action="append", default=[], metavar="URL",
+                        help="Seed from this sitemap (or sitemap index); can be repeated.")
+    parser.add_argument("--use-sitemap", action="store_true",
+                        help="Seed from /sitemap.xml of every start URL's host.")
+    parser.add_argument("--from-report", type=str, default=None, metavar="PATH",
+                        help="Seed from the working links of an earlier report (URL Status Test sheet).")
+    parser.add_argument("--max-depth", type=int, default=2,
+                        help="Maximum number of links followed from a seed URL (default: 2).")
+    parser.add_argument("--include", action="append", default=[], metavar="REGEX",
+                        help="Only report URLs whose path matches this pattern (e.g. '^/property/'); can be repeated.")
+    parser.add_argument("--exclude", action="append", default=[], metavar="REGEX",
+                        help="Never queue URLs whose path matches this pattern; can be repeated.")
+    parser.add_argument("--max-pages", type=int, default=None, help="Stop after fetching this many pages in total.")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent page fetches (default: 8).")
+    parser.add_argument("--expected-urls", type=int, default=1_000_000,
+                        help="Expected number of distinct URLs, used to size the seen-set (default: 1000000).")
+    parser.add_argument("--checkpoint", type=str, default=DEFAULT_CHECKPOINT_PATH,
+                        help=f"Checkpoint file; an existing one is resumed (default: {DEFAULT_CHECKPOINT_PATH}).")
+    parser.add_argument("--restart", action="store_true", help="Discard the checkpoint and start over.")
+    parser.add_argument("--out", type=str, default=None,
+                        help="Write the discovered URLs to this file (default: stdout), ready for batch.py.")
+    args = parser.parse_args()
+
+    if args.restart:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.checkpoint + suffix):
+                os.remove(args.checkpoint + suffix)
+
+    frontier = CrawlFrontier(args.checkpoint, capacity=args.expected_urls)
+    try:
+        crawler = Crawler(
+            frontier, max_depth=args.max_depth, include=args.include, exclude=args.exclude,
+            max_pages=args.max_pages, workers=args.workers,
+        )
+        sitemaps = list(args.sitemap)
+        if args.use_sitemap:
+            sitemaps += [urljoin(url, "/sitemap.xml") for url in args.start_urls]
+        known_links = report_links(args.from_report) if args.from_report else []
+        crawler.seed(args.start_urls, sitemaps, known_links)
+        crawler.run()
+
+        urls = frontier.matched_urls()
+        logging.info(f"Crawl finished: {len(urls)} URLs to audit, {frontier.pending()} still pending.")
+        output = "\n".join(urls) + ("\n" if urls else "")
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(output)
+            logging.info(f"Discovered URLs saved to {args.out}")
+        else:
+            print(output, end="")
+    finally:
+        frontier.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
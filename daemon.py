@@ -0,0 +1,483 @@
+import os
+import json
+import time
+import uuid
+import queue
+import signal
+import logging
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from setup import setup_driver, quit_driver
+from static_engine import StaticDriver
+from utils import collect_results, capture_check_errors
+from records import ResultTable
+from history import new_run_id
+from log_pipeline import set_run_id
+from test_automation import (
+    TESTS, default_tests, run_audit, add_common_arguments, open_link_cache, open_history, open_replay,
+    open_http_session, build_check_options,
+)
+
+
+DEFAULT_PORT = 8765
+
+# Latencies kept for the percentiles of /metrics
+LATENCY_WINDOW = 1000
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of `values` (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
+
+
+class Job:
+    """An audit request: one URL and the checks to run on it."""
+
+    def __init__(self, url, checks):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.checks = checks
+        self.status = "queued"
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.worker = None
+        self.results = None
+        self.error = None
+        # Exceptions the checks caught and reported as 'Fail' rows
+        self.check_errors = []
+        self.done = threading.Event()
+
+    def to_dict(self):
+        data = {
+            "id": self.id,
+            "url": self.url,
+            "checks": [name for name, _ in self.checks],
+            "status": self.status,
+            "queued_at": self.queued_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "worker": self.worker,
+            "error": self.error,
+            "check_errors": self.check_errors,
+        }
+        if self.results is not None:
+            data["results"] = {name: table.to_dict("records") for name, table in self.results.items()}
+        return data
+
+
+class AuditDaemon:
+    """
+    Keep a pool of warm browser sessions and run audit jobs on them as they arrive.
+
+    Every worker thread owns one driver from setup.setup_driver (plus its own link cache and
+    history connection) and takes jobs from a bounded queue. When the queue is full new jobs
+    are rejected instead of piling up, so callers can back off and retry. Sessions are
+    restarted after `recycle_after` jobs or when they stop responding.
+    """
+
+    def __init__(self, args, pool_size=2, queue_size=32, recycle_after=50, keep_jobs=1000, replay=None):
+        self.args = args
+        # With a ReplayServer, jobs audit the recorded copy of their URL
+        self.replay = replay
+        self.pool_size = pool_size
+        self.recycle_after = recycle_after
+        self.keep_jobs = keep_jobs
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.running = 0
+        # check_errors: finished jobs in which at least one check caught an exception
+        self.counters = {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0, "check_errors": 0}
+        self.latencies = {name: deque(maxlen=LATENCY_WINDOW) for name in ("wait", "run", "total")}
+        self.started_at = time.time()
+        # All jobs of the daemon's lifetime are recorded as one history run
+        self.run_id = getattr(args, "run_id", None) or new_run_id()
+        set_run_id(self.run_id)
+        self.threads = []
+        self._warm = 0
+        self._stopping = threading.Event()
+
+    def start(self):
+        """Start the worker threads; each one starts its browser session right away."""
+        for i in range(self.pool_size):
+            thread = threading.Thread(target=self._work, name=f"audit-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, url, checks):
+        """
+        Queue an audit job.
+
+        Args:
+            url (str): URL to audit.
+            checks (list): (name, function) pairs, as in test_automation.TESTS.
+
+        Returns:
+            Job | None: The queued job, or None when the queue is full.
+        """
+        job = Job(url, checks)
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            with self.lock:
+                self.counters["rejected"] += 1
+            logging.warning(f"Queue full, rejected audit of {url}")
+            return None
+        with self.lock:
+            self.counters["accepted"] += 1
+            self.jobs[job.id] = job
+            self._forget_old_jobs()
+        logging.info(f"Queued job {job.id}: {url} ({len(checks)} checks)")
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _forget_old_jobs(self):
+        # Only finished jobs are dropped, oldest first
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.keep_jobs:
+                break
+            if self.jobs[job_id].done.is_set():
+                del self.jobs[job_id]
+
+    def _start_driver(self):
+        args = self.args
+        return setup_driver(
+            browser=args.browser, headless=args.headless, reuse_profile=not args.fresh_profile,
+            page_load=args.page_load, block_images=args.block_images,
+        )
+
+    def _work(self):
+        """Worker thread: own one warm session and run queued jobs on it."""
+        args = self.args
+        name = threading.current_thread().name
+        link_cache = open_link_cache(args)
+        history = open_history(args, run_id=self.run_id)
+        http_session = open_http_session(args)
+        check_options = build_check_options(args, link_cache, http_session)
+        static_driver = StaticDriver() if args.engine != "browser" else None
+        driver = None
+        served = 0
+        try:
+            while True:
+                if driver is None:
+                    try:
+                        driver = self._start_driver()
+                        served = 0
+                        logging.info(f"{name} started a new {args.browser} session.")
+                    except Exception as e:
+                        logging.error(f"{name} could not start a browser session: {e}", exc_info=True)
+                        # Retry until the browser starts, unless the daemon is shutting down
+                        if self._stopping.wait(5):
+                            break
+                        continue
+                    self._session_started()
+
+                job = self.queue.get()
+                if job is None:
+                    break
+                try:
+                    self._run(job, driver, static_driver, check_options, history, name)
+                    served += 1
+                    # Errors caught by the checks (e.g. a missing widget) leave the session usable;
+                    # only a failed audit or a session that stopped responding is replaced
+                    restart = job.error or served >= self.recycle_after or not _driver_alive(driver)
+                except Exception as e:
+                    # Never let the thread die: the pool would shrink for good
+                    logging.error(f"{name} failed while handling job {job.id}: {e}", exc_info=True)
+                    restart = True
+
+                if restart:
+                    logging.info(f"{name} restarting its session after {served} job(s).")
+                    _stop_driver(driver)
+                    driver = None
+                    self._session_lost()
+        finally:
+            _stop_driver(driver)
+            if driver is not None:
+                self._session_lost()
+            if static_driver:
+                static_driver.quit()
+            http_session.close()
+            if link_cache:
+                link_cache.close()
+            if history:
+                history.close()
+
+    def _session_started(self):
+        with self.lock:
+            self._warm += 1
+            if self._warm >= self.pool_size:
+                self.ready.set()
+
+    def _session_lost(self):
+        # /health reports not ready until the session is replaced
+        with self.lock:
+            self._warm -= 1
+            self.ready.clear()
+
+    def _run(self, job, driver, static_driver, check_options, history, worker):
+        """Run `job` on `driver`; the errors the checks caught are listed in `job.check_errors`."""
+        job.started_at = time.time()
+        job.status = "running"
+        job.worker = worker
+        with self.lock:
+            self.running += 1
+        try:
+            with collect_results() as collected, capture_check_errors() as errors:
+                run_audit(
+                    driver, self.replay.url_for(job.url) if self.replay else job.url, tests=job.checks,
+                    check_options=check_options, engine=self.args.engine, static_driver=static_driver,
+                    history=history,
+                )
+            job.results = {name: ResultTable.concat(tables) for name, tables in collected.items()}
+            job.check_errors = [str(error) for error in errors]
+            job.status = "done"
+            if history:
+                history.flush()
+        except Exception as e:
+            logging.error(f"Job {job.id} failed: {e}", exc_info=True)
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self.lock:
+                self.running -= 1
+                self.counters["completed" if job.status == "done" else "failed"] += 1
+                if job.check_errors:
+                    self.counters["check_errors"] += 1
+                self.latencies["wait"].append(job.started_at - job.queued_at)
+                self.latencies["run"].append(job.finished_at - job.started_at)
+                self.latencies["total"].append(job.finished_at - job.queued_at)
+            job.done.set()
+        if job.check_errors:
+            logging.warning(f"Job {job.id}: {len(job.check_errors)} check(s) failed with an error.")
+        logging.info(f"Job {job.id} {job.status} in {job.finished_at - job.started_at:.2f}s: {job.url}")
+
+    def metrics(self):
+        """Return queue depth, job counters and latency percentiles (seconds)."""
+        with self.lock:
+            latencies = {
+                name: {
+                    "p50": percentile(values, 0.5),
+                    "p90": percentile(values, 0.9),
+                    "p99": percentile(values, 0.99),
+                    "max": max(values) if values else None,
+                    "samples": len(values),
+                }
+                for name, values in self.latencies.items()
+            }
+            return {
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "pool_size": self.pool_size,
+                "warm_sessions": self._warm,
+                "queue_depth": self.queue.qsize(),
+                "queue_capacity": self.queue.maxsize,
+                "running": self.running,
+                "jobs": dict(self.counters),
+                "latency_s": latencies,
+            }
+
+    def stop(self):
+        """Let the workers finish their current job and quit their sessions."""
+        self._stopping.set()
+        for _ in self.threads:
+            # Workers still waiting for a browser exit on the event and never read the queue,
+            # so stop offering sentinels once every worker is gone
+            while any(thread.is_alive() for thread in self.threads):
+                try:
+                    self.queue.put(None, timeout=1)
+                    break
+                except queue.Full:
+                    pass
+        for thread in self.threads:
+            thread.join()
+
+
+def _driver_alive(driver):
+    # A dead browser or driver process raises connection errors rather than WebDriverException
+    try:
+        driver.title
+        return True
+    except Exception:
+        return False
+
+
+def _stop_driver(driver):
+    if driver is None:
+        return
+    try:
+        quit_driver(driver)
+    except Exception as e:
+        logging.warning(f"Could not quit a browser session cleanly: {e}")
+
+
+class AuditRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API of the daemon.
+
+    GET  /health        200 once every session is warm, 503 before
+    GET  /checks        names of the available checks
+    GET  /metrics       queue depth, job counters and latency percentiles
+    POST /jobs          {"url": ..., "checks": [...], "wait": seconds}; 202 with the job,
+                        200 with its results when it finished within `wait`,
+                        429 when the queue is full
+    GET  /jobs/<id>     status and, once finished, results of a job
+    """
+
+    daemon = None
+
+    def do_GET(self):
+        path = urlsplit(self.path).path.rstrip("/")
+        if path == "/health":
+            ready = self.daemon.ready.is_set()
+            self._send(200 if ready else 503, {"status": "ready" if ready else "starting"})
+        elif path == "/checks":
+            self._send(200, {"checks": [name for name, _ in TESTS]})
+        elif path == "/metrics":
+            self._send(200, self.daemon.metrics())
+        elif path.startswith("/jobs/"):
+            job = self.daemon.get(path[len("/jobs/"):])
+            if job is None:
+                self._send(404, {"error": "Unknown job."})
+            else:
+                self._send(200, job.to_dict())
+        else:
+            self._send(404, {"error": "Not found."})
+
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip("/") != "/jobs":
+            self._send(404, {"error": "Not found."})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            url = body["url"]
+            checks = _select_checks(body.get("checks"), self.daemon.args)
+            wait = float(body.get("wait") or 0)
+        except (KeyError, TypeError, ValueError) as e:
+            self._send(400, {"error": f"Invalid job: {e}"})
+            return
+
+        job = self.daemon.submit(url, checks)
+        if job is None:
+            self._send(429, {"error": "Queue full, retry later."}, headers={"Retry-After": "5"})
+            return
+        if wait and job.done.wait(wait):
+            self._send(200, job.to_dict())
+        else:
+            self._send(202, job.to_dict(), headers={"Location": f"/jobs/{job.id}"})
+
+    def _send(self, status, data, headers=None):
+        body = json.dumps(data, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"API: {format % args}")
+
+
+def _select_checks(names, args=None):
+    """Return the TESTS entries named in `names` (the default checks of `args` when it is empty)."""
+    if not names:
+        return default_tests(args)
+    available = dict(TESTS)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"unknown checks {unknown}; see GET /checks")
+    # Keep the TESTS order, which runs the page-mutating checks last
+    return [(name, test) for name, test in TESTS if name in names]
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects an (address, port) client address
+        return request, ("local", 0)
+
+
+def serve(daemon, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None):
+    """
+    Serve the job API until interrupted (Ctrl+C or SIGTERM), then stop the workers.
+
+    Args:
+        daemon (AuditDaemon): Started daemon.
+        host (str): Address to listen on (TCP).
+        port (int): Port to listen on (TCP).
+        socket_path (str | None): Listen on this Unix socket instead of TCP.
+    """
+    handler = type("Handler", (AuditRequestHandler,), {"daemon": daemon})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, handler)
+        address = f"unix:{socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        address = f"http://{host}:{server.server_address[1]}"
+
+    if threading.current_thread() is threading.main_thread():
+        # SIGTERM (e.g. from a service manager) shuts down like Ctrl+C
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    logging.info(f"Audit daemon listening on {address} with {daemon.pool_size} browser session(s).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+        logging.info("Stopping the audit daemon...")
+        daemon.stop()
+
+
+def main():
+    """Entry point for running the audit daemon."""
+    parser = argparse.ArgumentParser(description="Keep warm browser sessions and audit URLs submitted over HTTP.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT}).")
+    parser.add_argument("--socket", type=str, default=None, help="Listen on this Unix socket instead of TCP.")
+    parser.add_argument("--pool", type=int, default=2, help="Number of warm browser sessions (default: 2).")
+    parser.add_argument("--queue-size", type=int, default=32,
+                        help="Jobs that may wait for a session; more are rejected with 429 (default: 32).")
+    parser.add_argument("--recycle-after", type=int, default=50,
+                        help="Restart a browser session after this many jobs (default: 50).")
+    add_common_arguments(parser)
+    args = parser.parse_args()
+    if args.stream:
+        logging.warning("--stream is not used by the daemon: job results are returned with each job.")
+
+    replay = open_replay(args)
+    daemon = AuditDaemon(
+        args, pool_size=args.pool, queue_size=args.queue_size, recycle_after=args.recycle_after, replay=replay,
+    )
+    daemon.start()
+    try:
+        serve(daemon, host=args.host, port=args.port, socket_path=args.socket)
+    finally:
+        if replay:
+            replay.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import logging
+
+
+# Collects attributes and texts for every element matching a selector in a single
+# round-trip. URL attributes (href, src) are resolved to absolute URLs, like
+# WebElement.get_attribute does; missing attributes come back as None.
+BULK_EXTRACT_JS = """
+var selector = arguments[0], attributes = arguments[1], withText = arguments[2];
+var children = arguments[3] || {}, root = arguments[4] || document, withTag = arguments[5];
+var URL_PROPERTIES = {href: true, src: true};
+
+function readAttribute(el, name) {
+    var value = el.getAttribute(name);
+    if (value !== null && URL_PROPERTIES[name] && typeof el[name] === "string") {
+        return el[name];
+    }
+    return value;
+}
+
+function readText(el) {
+    return el ? (el.innerText || el.textContent || "").trim() : null;
+}
+
+return Array.prototype.map.call(root.querySelectorAll(selector), function (el) {
+    var row = {};
+    attributes.forEach(function (name) { row[name] = readAttribute(el, name); });
+    if (withText) { row.text = readText(el); }
+    if (withTag) { row.tag = el.tagName.toLowerCase(); }
+    Object.keys(children).forEach(function (key) {
+        row[key] = readText(el.querySelector(children[key]));
+    });
+    return row;
+});
+"""
+
+
+def bulk_extract(driver, selector, attributes=(), text=False, children=None, root=None, tag=False):
+    """
+    Extract attributes and texts of all elements matching `selector` in one execute_script call.
+
+    Args:
+        driver (webdriver): Selenium WebDriver instance.
+        selector (str): CSS selector of the elements to extract.
+        attributes (iterable): Attribute names to read from each element.
+        text (bool): Also return the visible text of each element under the 'text' key.
+        children (dict | None): Key mapped to a CSS selector; the text of the first matching
+            descendant of each element is returned under that key (None if there is none).
+        root (WebElement | None): Restrict the search to this element's descendants.
+        tag (bool): Also return the lower-case tag name of each element under the 'tag' key.
+
+    Returns:
+        list: One dict per element, in document order, with plain JSON values.
+    """
+    if getattr(driver, "is_static", False):
+        return driver.extract(selector, attributes, text, children, root, tag)
+
+    rows = driver.execute_script(BULK_EXTRACT_JS, selector, list(attributes), text, children or {}, root, tag)
+    logging.debug(f"Extracted {len(rows)} elements for selector '{selector}'.")
+    return rows
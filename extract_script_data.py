@@ -1,59 +1,116 @@
+import os
+import json
+import time
 import logging
-import pandas as pd
+import argparse
+import multiprocessing
+import multiprocessing.util
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import WebDriverException
+
+from utils import save_result, note_check_error
+from records import ResultTable
+from page_session import load_page
+from network_log import discard_network_log
+from report import RowStream, STREAM_FORMATS, output_format
+from log_pipeline import worker_logs, forward_logging
+from setup import setup_driver, quit_driver, apply_page_load_profile
+
+
+# Report column mapped to the path of its value in window.ScriptData
+DEFAULT_SCHEMA = {
+    "SiteURL": "config.SiteUrl",
+    "CampaignID": "pageData.CampaignId",
+    "SiteName": "config.SiteName",
+    "Browser": "userInfo.Browser",
+    "Country": "userInfo.CountryCode",
+    "IP": "userInfo.IP",
+}
+
+MISSING = "N/A"
+
+# Per-process state of a bulk extraction worker: its browser session and how many pages it served
+_worker = {}
+
+
+def load_schema(path=None):
+    """
+    Load a ScriptData field schema.
+
+    The schema is a JSON object mapping each output column to a dotted path into
+    `window.ScriptData`; numeric segments index lists, e.g.
+    {"SiteURL": "config.SiteUrl", "FirstOffer": "pageData.Offers.0.Id"}.
+
+    Args:
+        path (str | None): Path of the JSON schema file; None returns DEFAULT_SCHEMA.
+
+    Returns:
+        dict: Column name mapped to its path.
+    """
+    if path is None:
+        return dict(DEFAULT_SCHEMA)
+    with open(path, encoding="utf-8") as f:
+        schema = json.load(f)
+    if not isinstance(schema, dict) or not all(isinstance(value, str) for value in schema.values()):
+        raise ValueError(f"Invalid ScriptData schema in {path}: expected an object of column -> path.")
+    return schema
+
+
+def resolve_path(data, path, default=MISSING):
+    """Return the value at the dotted `path` in `data`, or `default` when any segment is missing."""
+    value = data
+    for segment in path.split("."):
+        if isinstance(value, dict) and segment in value:
+            value = value[segment]
+        elif isinstance(value, list) and segment.lstrip("-").isdigit() and -len(value) <= int(segment) < len(value):
+            value = value[int(segment)]
+        else:
+            return default
+    return value
 
-from utils import save_result
 
+def extract_fields(script_data, schema):
+    """Return the schema columns mapped to their values in `script_data`."""
+    return {column: resolve_path(script_data, path) for column, path in schema.items()}
 
-def extract_script_data(driver, url):
+
+def extract_script_data(driver, url, session=None, schema=None):
     """
     Extract data from the JavaScript script tag or window object on the page and save it to a report.
 
     Args:
         driver (webdriver): Selenium WebDriver instance.
         url (str): URL of the page to test.
+        session (PageSession): Optional page session shared between checks.
+        schema (dict | None): Column name mapped to its path in ScriptData (see load_schema);
+            defaults to DEFAULT_SCHEMA.
 
     Returns:
-        DataFrame: Extracted script data as a pandas DataFrame with specific columns.
+        ResultTable: Extracted script data with one column per schema field.
     """
     logging.info(f"Starting Script Data Extraction for URL: {url}")
     testcase = "Script Data Extraction Test"
+    schema = schema or DEFAULT_SCHEMA
 
     try:
-        # Navigate to the page
-        driver.get(url)
-        logging.info("Page loaded successfully.")
-        
-        # Wait until the page is fully loaded
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-
-        # Extract ScriptData from the JavaScript context
-        script_data = driver.execute_script("return window.ScriptData;")  # Modify as needed
+        # ScriptData is captured together with the page snapshot
+        snapshot = load_page(driver, url, session)
+        script_data = snapshot.script_data
 
         if not script_data:
             logging.warning("Script data not found on the page.")
-            return pd.DataFrame([{
-                "SiteURL": "N/A", "CampaignID": "N/A", "SiteName": "N/A",
-                "Browser": "N/A", "Country": "N/A", "IP": "N/A", "result": "Fail",
+            return ResultTable.from_records([{
+                **{column: MISSING for column in schema}, "result": "Fail",
                 "comment": "Script data not found."
             }])
 
         # Parse and structure the data
-        extracted_data = {
-            "SiteURL": script_data["config"].get("SiteUrl", "N/A"),
-            "CampaignID": script_data["pageData"].get("CampaignId", "N/A"),
-            "SiteName": script_data["config"].get("SiteName", "N/A"),
-            "Browser": script_data["userInfo"].get("Browser", "N/A"),
-            "Country": script_data["userInfo"].get("CountryCode", "N/A"),
-            "IP": script_data["userInfo"].get("IP", "N/A"),
-            # "result": "Pass",
-            # "comment": "Data extracted successfully."
-        }
-
-        # Convert to DataFrame
-        result_df = pd.DataFrame([extracted_data])
+        extracted_data = extract_fields(script_data, schema)
+
+        # Convert to a result table
+        result_df = ResultTable.from_records([extracted_data])
 
         # Save the result
         save_result(result_df, testcase)
@@ -62,11 +119,164 @@ def extract_script_data(driver, url):
 
     except Exception as e:
         logging.error(f"Error during Script Data Extraction: {e}")
-        error_data = {
-            "SiteURL": "N/A", "CampaignID": "N/A", "SiteName": "N/A",
-            "Browser": "N/A", "Country": "N/A", "IP": "N/A", "result": "Fail",
-            "comment": f"Error: {e}"
-        }
-        error_df = pd.DataFrame([error_data])
+        note_check_error(e)
+        error_data = {**{column: MISSING for column in schema}, "result": "Fail", "comment": f"Error: {e}"}
+        error_df = ResultTable.from_records([error_data])
         save_result(error_df, testcase)
-        return error_df
\ No newline at end of file
+        return error_df
+
+
+def read_script_data(driver, url, wait_timeout=10):
+    """
+    Navigate to `url` and return `window.ScriptData` (None when the page has none).
+
+    Unlike load_page, no snapshot of the DOM or network log is kept, so a page costs one
+    navigation and one small execute_script call.
+    """
+    apply_page_load_profile(driver, "lean")
+    discard_network_log(driver)
+    driver.get(url)
+    WebDriverWait(driver, wait_timeout).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+    return driver.execute_script("return window.ScriptData || null;")
+
+
+def _init_worker(options, log_queue):
+    """Process initializer: remember the options; the driver is started lazily."""
+    forward_logging(log_queue)
+    multiprocessing.util.Finalize(None, _stop_driver, exitpriority=10)
+    _worker["options"] = options
+    _worker["driver"] = None
+    _worker["pages"] = 0
+
+
+def _stop_driver():
+    driver = _worker.get("driver")
+    _worker["driver"] = None
+    if driver is not None:
+        try:
+            quit_driver(driver)
+        except WebDriverException as e:
+            logging.warning(f"Worker {os.getpid()} could not quit its session cleanly: {e}")
+
+
+def _extract_url(url):
+    """
+    Extract the schema fields of one URL in a worker process, reusing its browser session.
+
+    Returns:
+        dict: The row for `url`: 'url', one column per schema field and 'error'.
+    """
+    options = _worker["options"]
+    if _worker["driver"] is not None and _worker["pages"] >= options["recycle_after"]:
+        _stop_driver()
+
+    row = {"url": url}
+    try:
+        if _worker["driver"] is None:
+            _worker["driver"] = setup_driver(
+                browser=options["browser"], headless=options["headless"],
+                page_load="lean", block_images=True,
+            )
+            _worker["pages"] = 0
+        script_data = read_script_data(_worker["driver"], url)
+        _worker["pages"] += 1
+        if script_data:
+            row.update(extract_fields(script_data, options["schema"]))
+            row["error"] = None
+        else:
+            row.update({column: MISSING for column in options["schema"]})
+            row["error"] = "Script data not found."
+    except Exception as e:
+        logging.error(f"Worker {os.getpid()} failed to extract ScriptData from {url}: {e}")
+        row.update({column: MISSING for column in options["schema"]})
+        row["error"] = str(e)
+        # Start a fresh session for the next page
+        _stop_driver()
+    return row
+
+
+def extract_many(urls, out, schema=None, workers=1, browser="chrome", headless=False, recycle_after=100,
+                 row_group_size=1000):
+    """
+    Extract ScriptData fields from many URLs over a pool of reused browser sessions.
+
+    Each row is streamed to `out` as soon as its page finishes, so memory stays flat however
+    many pages are processed.
+
+    Args:
+        urls (list): URLs to extract from.
+        out (str): Output file; the format follows the extension (.jsonl or .parquet).
+        schema (dict | None): Column name mapped to its ScriptData path (see load_schema).
+        workers (int): Number of parallel browser sessions.
+        browser (str): Browser to use ("chrome" or "firefox").
+        headless (bool): Run the browsers without a window.
+        recycle_after (int): Restart a browser session after this many pages.
+        row_group_size (int): Rows per Parquet row group.
+
+    Returns:
+        int: Number of pages whose ScriptData could not be extracted.
+    """
+    schema = schema or DEFAULT_SCHEMA
+    workers = max(1, min(workers, len(urls)))
+    options = {"schema": schema, "browser": browser, "headless": headless, "recycle_after": recycle_after}
+    logging.info(f"Extracting ScriptData from {len(urls)} URLs with {workers} browser sessions.")
+
+    failed = 0
+    started = time.time()
+    columns = ["url", *schema, "error"]
+    context = multiprocessing.get_context("spawn")
+    with worker_logs(context) as log_queue, RowStream(out, columns, row_group_size=row_group_size) as stream:
+        pool = context.Pool(processes=workers, initializer=_init_worker, initargs=(options, log_queue))
+        try:
+            for i, row in enumerate(pool.imap_unordered(_extract_url, urls), start=1):
+                stream.write(row)
+                failed += row["error"] is not None
+                if i % 100 == 0 or i == len(urls):
+                    logging.info(f"[{i}/{len(urls)}] pages extracted ({i / (time.time() - started):.1f} pages/s)")
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    return failed
+
+
+def main():
+    """Entry point for extracting ScriptData from a list of URLs."""
+    from batch import read_urls
+
+    parser = argparse.ArgumentParser(description="Extract window.ScriptData fields from many URLs.")
+    parser.add_argument("urls", type=str, help="File with one URL per line, or '-' to read URLs from stdin.")
+    parser.add_argument("--out", type=str, default=os.path.join("reports", "script_data.jsonl"),
+                        help=f"Output file, {' or '.join(f'.{fmt}' for fmt in STREAM_FORMATS)} "
+                             "(default: reports/script_data.jsonl).")
+    parser.add_argument("--schema", type=str, default=None,
+                        help="JSON file mapping each column to its path in ScriptData (default: built-in fields).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of parallel browser sessions (default: number of CPUs).")
+    parser.add_argument("--browser", type=str, default="chrome", help="Browser to use: 'chrome' (default) or 'firefox'.")
+    parser.add_argument("--headless", action="store_true", help="Run the browsers in headless mode.")
+    parser.add_argument("--recycle-after", type=int, default=100,
+                        help="Restart a browser session after this many pages (default: 100).")
+    args = parser.parse_args()
+    try:
+        output_format(os.path.splitext(args.out)[1].lstrip("."))
+    except argparse.ArgumentTypeError as e:
+        parser.error(f"--out: {e}")
+
+    urls = read_urls(args.urls)
+    if not urls:
+        logging.warning("No URLs to extract.")
+        return
+    failed = extract_many(
+        urls, args.out, schema=load_schema(args.schema), workers=args.workers, browser=args.browser,
+        headless=args.headless, recycle_after=args.recycle_after,
+    )
+    if failed:
+        logging.warning(f"ScriptData could not be extracted from {failed} of {len(urls)} page(s).")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
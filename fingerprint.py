@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+
+from utils import save_result, collect_results, capture_check_errors
+from records import ResultTable
+
+
+DEFAULT_FINGERPRINT_PATH = os.path.join("reports", "fingerprints.sqlite")
+
+
+def _headings(document, levels):
+    tags = {f"h{level}" for level in levels}
+    return [
+        (element.tag, " ".join(element.text_content().split()))
+        for element in document.iter(*tags)
+    ]
+
+
+def _images(document):
+    return [(element.get("src"), element.get("alt")) for element in document.iter("img")]
+
+
+# Check name (as in test_automation.TESTS) mapped to a function returning the normalized
+# page data the check depends on. Checks that are missing here always run: the currency filter
+# interacts with the page, and link statuses change without the page changing (the link cache
+# reuses them within its TTLs instead).
+CHECK_INPUTS = {
+    "H1 Tag Test": lambda snapshot: _headings(snapshot.document(), [1]),
+    "HTML Sequence Test": lambda snapshot: _headings(snapshot.document(), range(1, 7)),
+    "Image Alt Test": lambda snapshot: [snapshot.current_url, _images(snapshot.document())],
+    "Scrape data from script data": lambda snapshot: snapshot.script_data,
+}
+
+
+def _plain_options(options):
+    # Options that change what a check reports (e.g. the ScriptData schema) are part of the
+    # fingerprint; shared objects such as the link cache are not
+    plain = (str, int, float, bool, dict, list, tuple, type(None))
+    return {key: value for key, value in sorted((options or {}).items()) if isinstance(value, plain)}
+
+
+def fingerprint(check_name, snapshot, options=None):
+    """
+    Hash the page sections a check depends on, together with the check's plain options.
+
+    Args:
+        check_name (str): Name of the check.
+        snapshot (PageSnapshot): Loaded page.
+        options (dict | None): Keyword arguments the check is run with.
+
+    Returns:
+        str | None: Hex digest, or None if the check cannot be fingerprinted.
+    """
+    inputs = CHECK_INPUTS.get(check_name)
+    if inputs is None:
+        return None
+    payload = json.dumps(
+        [inputs(snapshot), _plain_options(options)], sort_keys=True, default=str, ensure_ascii=False,
+    )
+    return hashlib.blake2b(f"{check_name}\0{payload}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+class FingerprintStore:
+    """
+    SQLite store of the last fingerprint and result sheets of every (URL, check) pair.
+    """
+
+    def __init__(self, path=DEFAULT_FINGERPRINT_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS check_fingerprints (
+                url TEXT NOT NULL,
+                check_name TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                sheets TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (url, check_name)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get(self, url, check_name):
+        """Return (fingerprint, stored results) of the last run, or (None, None)."""
+        row = self.conn.execute(
+            "SELECT fingerprint, sheets FROM check_fingerprints WHERE url = ? AND check_name = ?",
+            (url, check_name),
+        ).fetchone()
+        if row is None:
+            return None, None
+        return row[0], json.loads(row[1])
+
+    def put(self, url, check_name, digest, sheets):
+        """Store the fingerprint and results ({'result_sheet': name, 'sheets': {sheet: rows}}) of a run."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO check_fingerprints (url, check_name, fingerprint, sheets, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (url, check_name, digest, json.dumps(sheets, default=str), time.time()),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def run_incremental(store, check_name, url, snapshot, run_check, force=False, options=None):
+    """
+    Run a check, or reuse its previous result when the page data it depends on is unchanged.
+
+    Every sheet saved by the check gets a 'cached' column telling whether its rows were
+    reused from the last run. A result the check produced from a caught exception (e.g. a
+    timeout) is not stored, so the next run tries again.
+
+    Args:
+        store (FingerprintStore): Fingerprint store.
+        check_name (str): Name of the check.
+        url (str): URL of the page.
+        snapshot (PageSnapshot): Loaded page used to compute the fingerprint.
+        run_check (callable): Runs the check and returns its ResultTable.
+        force (bool): Always run the check (the stored fingerprint is still refreshed).
+        options (dict | None): Keyword arguments the check is run with.
+
+    Returns:
+        ResultTable: Result of the check (reused or fresh).
+    """
+    digest = fingerprint(check_name, snapshot, options)
+    if digest is None:
+        return run_check()
+
+    previous, stored = store.get(url, check_name)
+    if not force and previous == digest:
+        logging.info(f"{check_name}: page content unchanged, reusing the previous result.")
+        result = ResultTable()
+        for sheet_name, rows in stored["sheets"].items():
+            df = ResultTable.from_records(rows)
+            df.add_column("cached", True)
+            save_result(df, sheet_name)
+            if sheet_name == stored["result_sheet"]:
+                result = df
+        return result
+
+    with collect_results() as collected, capture_check_errors() as errors:
+        result = run_check()
+    fresh = {"result_sheet": None, "sheets": {}}
+    for sheet_name, frames in collected.items():
+        if any(frame is result for frame in frames):
+            fresh["result_sheet"] = sheet_name
+        df = ResultTable.concat(frames)
+        fresh["sheets"][sheet_name] = df.to_dict("records")
+        df.add_column("cached", False)
+        save_result(df, sheet_name)
+    if errors:
+        logging.info(f"{check_name}: not storing the fingerprint of a run that failed with: {errors[0]}")
+    else:
+        store.put(url, check_name, digest, fresh)
+    return result
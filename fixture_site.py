@@ -0,0 +1,248 @@
+import json
+import time
+import random
+import logging
+import threading
+from html import escape
+from urllib.parse import urlsplit, parse_qs, urlencode
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+# Currencies offered by the synthetic currency dropdown: (country, symbol, code)
+CURRENCIES = [
+    ("US", "$", "USD"), ("ES", "€", "EUR"), ("GB", "£", "GBP"), ("JP", "¥", "JPY"),
+    ("IN", "₹", "INR"), ("BD", "৳", "BDT"), ("CH", "CHF", "CHF"), ("BR", "R$", "BRL"),
+    ("KR", "₩", "KRW"), ("TR", "₺", "TRY"), ("PL", "zł", "PLN"), ("TH", "฿", "THB"),
+]
+
+# Default parameters of a generated property page
+PAGE_DEFAULTS = {
+    "links": 50,        # number of <a> tags
+    "images": 20,       # number of <img> tags
+    "headings": 6,      # deepest heading level present (1-6)
+    "currencies": 5,    # currency options in the dropdown
+    "tiles": 10,        # price tiles rendered up front
+    "lazy": 10,         # extra price tiles appended when scrolled to the bottom
+    "broken": 0.05,     # share of links that return 404
+    "slow": 0.02,       # share of links that answer after SLOW_DELAY seconds
+    "missing_alt": 0.1, # share of images without alt
+    "seed": 1,
+}
+
+SLOW_DELAY = 1.0
+
+PAGE_SCRIPT = """
+document.addEventListener("DOMContentLoaded", function () {
+    var dropdown = document.getElementById("js-currency-sort-footer");
+    var list = dropdown.querySelector(".select-ul");
+    dropdown.addEventListener("click", function () {
+        list.style.display = list.style.display === "none" ? "block" : "none";
+    });
+    Array.prototype.forEach.call(list.children, function (option) {
+        option.addEventListener("click", function (event) {
+            event.stopPropagation();
+            list.style.display = "none";
+            var symbol = option.getAttribute("data-symbol");
+            // Simulate the price refresh request of the real site
+            setTimeout(function () {
+                document.querySelectorAll(".js-price-value").forEach(function (tile) {
+                    tile.textContent = symbol + " " + tile.getAttribute("data-amount");
+                });
+            }, 150);
+        });
+    });
+
+    var lazyLeft = window.LAZY_TILES;
+    window.addEventListener("scroll", function () {
+        if (lazyLeft <= 0 || window.innerHeight + window.scrollY < document.body.scrollHeight - 50) { return; }
+        var batch = Math.min(lazyLeft, 5);
+        lazyLeft -= batch;
+        setTimeout(function () {
+            var container = document.getElementById("tiles");
+            var symbol = container.getAttribute("data-symbol");
+            for (var i = 0; i < batch; i++) {
+                var tile = document.createElement("div");
+                tile.className = "tile";
+                tile.innerHTML = '<span class="js-price-value" data-amount="99">' + symbol + ' 99</span>';
+                container.appendChild(tile);
+            }
+        }, 200);
+    });
+});
+"""
+
+
+def page_params(query):
+    """Merge a parsed query string over PAGE_DEFAULTS, keeping the default types."""
+    params = dict(PAGE_DEFAULTS)
+    for key, default in PAGE_DEFAULTS.items():
+        if key in query:
+            params[key] = type(default)(query[key][0])
+    return params
+
+
+def page_path(page_id=1, **params):
+    """Return the path of a generated property page with the given parameters."""
+    return f"/property/{page_id}?{urlencode(params)}"
+
+
+def render_property_page(page_id, params):
+    """
+    Generate the HTML of a synthetic property page.
+
+    Args:
+        page_id (str): Identifier used in texts and ScriptData.
+        params (dict): Page parameters (see PAGE_DEFAULTS).
+
+    Returns:
+        str: HTML document.
+    """
+    rng = random.Random(f"{params['seed']}-{page_id}")
+    currencies = CURRENCIES[:max(1, min(params["currencies"], len(CURRENCIES)))]
+    symbol = currencies[0][1]
+
+    headings = "\n".join(
+        f"<h{level}>Section level {level} of property {escape(page_id)}</h{level}>"
+        for level in range(1, max(1, min(params["headings"], 6)) + 1)
+    )
+
+    images = []
+    for i in range(params["images"]):
+        alt = "" if rng.random() < params["missing_alt"] else f' alt="Photo {i}"'
+        images.append(f'<img src="/static/img/{page_id}-{i}.png"{alt}>')
+
+    links = []
+    for i in range(params["links"]):
+        roll = rng.random()
+        if roll < params["broken"]:
+            href = f"/broken/{i}"
+        elif roll < params["broken"] + params["slow"]:
+            href = f"/slow/{i}"
+        else:
+            # Shared footer/nav style links repeat across pages
+            href = f"/ok/{i % 25}"
+        links.append(f'<a href="{href}">Link {i}</a>')
+
+    options = "\n".join(
+        f'<li data-currency-country="{country}" data-symbol="{escape(sym)}">'
+        f'<div class="option"><p>{escape(sym)} {code}</p></div></li>'
+        for country, sym, code in currencies
+    )
+
+    tiles = "\n".join(
+        f'<div class="tile"><span class="js-price-value" data-amount="{100 + i}">{escape(symbol)} {100 + i}</span></div>'
+        for i in range(params["tiles"])
+    )
+
+    script_data = {
+        "config": {"SiteUrl": "http://fixture.local", "SiteName": "fixture"},
+        "pageData": {"CampaignId": f"FIXTURE-{page_id}"},
+        "userInfo": {"Browser": "Benchmark", "CountryCode": "BD", "IP": "127.0.0.1"},
+    }
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<title>Property {escape(page_id)}</title>
+<script>window.ScriptData = {json.dumps(script_data)}; window.LAZY_TILES = {int(params["lazy"])};</script>
+<script>{PAGE_SCRIPT}</script>
+</head>
+<body>
+{headings}
+<div id="gallery">{"".join(images)}</div>
+<div id="tiles" data-symbol="{escape(symbol)}">
+{tiles}
+</div>
+<nav>{"".join(links)}</nav>
+<footer>
+<div id="js-currency-sort-footer" class="select">
+<ul class="select-ul" style="display: none">
+{options}
+</ul>
+</div>
+</footer>
+</body>
+</html>"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves generated property pages, link targets (ok, broken, slow) and images."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logging.debug(f"Fixture site: {format % args}")
+
+    def _send(self, status, body=b"", content_type="text/plain", head=False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _route(self, head=False):
+        parts = urlsplit(self.path)
+        path = parts.path
+        if path.startswith("/property/"):
+            params = page_params(parse_qs(parts.query))
+            html = render_property_page(path.rsplit("/", 1)[-1], params)
+            self._send(200, html.encode("utf-8"), "text/html; charset=utf-8", head)
+        elif path.startswith("/broken/"):
+            self._send(404, b"not found", head=head)
+        elif path.startswith("/slow/"):
+            time.sleep(SLOW_DELAY)
+            self._send(200, b"slow", head=head)
+        elif path.startswith("/ok/"):
+            self._send(200, b"ok", head=head)
+        elif path.startswith("/static/img/"):
+            # 1x1 transparent GIF
+            self._send(200, b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\x00\x00\x00!\xf9\x04\x01"
+                            b"\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;",
+                       "image/gif", head)
+        else:
+            self._send(404, b"not found", head=head)
+
+    def do_GET(self):
+        self._route()
+
+    def do_HEAD(self):
+        self._route(head=True)
+
+
+class FixtureSite:
+    """
+    Local HTTP server with synthetic property pages, running in a background thread.
+
+    Usage:
+        with FixtureSite() as site:
+            url = site.url(page_path(1, links=300))
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), FixtureHandler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path):
+        return f"{self.base_url}{path}"
+
+    def start(self):
+        self.thread.start()
+        logging.info(f"Fixture site running at {self.base_url}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
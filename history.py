@@ -0,0 +1,346 @@
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import argparse
+from datetime import datetime
+
+from records import as_table
+
+
+DEFAULT_HISTORY_PATH = os.path.join("reports", "history.sqlite")
+
+# Columns holding the comment of a result row, depending on the check
+COMMENT_COLUMNS = ("comments", "comment", "alt")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    host TEXT,
+    command TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    url TEXT NOT NULL,
+    check_name TEXT NOT NULL,
+    item TEXT,
+    result TEXT,
+    comments TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_check_url_ts ON results (check_name, url, ts);
+CREATE INDEX IF NOT EXISTS idx_results_check_item_ts ON results (check_name, item, ts);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results (run_id, check_name);
+"""
+
+
+def new_run_id():
+    """Return a unique, time-sortable run id."""
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def _text(value):
+    # Missing cells come back from pandas as NaN
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return str(value)
+
+
+def parse_since(value):
+    """
+    Turn "7d", "12h", "30m", an ISO date ("2024-05-01") or a Unix timestamp into a timestamp.
+
+    Args:
+        value (str): Point in time, absolute or relative to now.
+
+    Returns:
+        float: Unix timestamp.
+    """
+    units = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+    if value[-1:] in units and value[:-1].isdigit():
+        return time.time() - int(value[:-1]) * units[value[-1]]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class HistoryStore:
+    """
+    Append-only SQLite store of every result row of every run.
+
+    Rows are keyed by run id, page URL, check name and timestamp, and buffered in memory so
+    they are written in large batches (one transaction per `batch_size` rows). Several batch
+    workers can append to the same file.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, batch_size=5000):
+        self.path = path
+        self.batch_size = batch_size
+        self.run_id = None
+        self._pending = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Safe with WAL: a crash can lose the last transactions but never corrupts the file
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def start_run(self, run_id=None, command=None):
+        """
+        Register a run and make it the run that appended rows belong to.
+
+        Batch workers pass the run id of the parent process, so all their rows share one run.
+
+        Returns:
+            str: Run id.
+        """
+        run_id = run_id or new_run_id()
+        self.run_id = run_id
+        self.conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, started_at, host, command) VALUES (?, ?, ?, ?)",
+            (run_id, time.time(), socket.gethostname(), command or " ".join(sys.argv)),
+        )
+        self.conn.commit()
+        return run_id
+
+    def append(self, url, check_name, df, ts=None):
+        """
+        Buffer the rows of one check result for the current run (see start_run).
+
+        The first column of each row is stored as its item (the link, image, tag, ...), and
+        the whole row as JSON.
+
+        Args:
+            url (str): Audited page URL.
+            check_name (str): Name of the check.
+            df (ResultTable | DataFrame): Result of the check.
+            ts (float | None): Timestamp of the result (default: now).
+        """
+        if df is None or df.empty:
+            return
+        ts = ts or time.time()
+        table = as_table(df)
+        columns = table.columns
+        values = [table[column] for column in columns]
+        result_index = columns.index("result") if "result" in columns else None
+        comment_index = next((columns.index(c) for c in COMMENT_COLUMNS if c in columns), None)
+        for row in zip(*values):
+            self._pending.append((
+                self.run_id, ts, url, check_name,
+                _text(row[0]),
+                None if result_index is None else _text(row[result_index]),
+                None if comment_index is None else _text(row[comment_index]),
+                json.dumps(dict(zip(columns, row)), default=str),
+            ))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows in one transaction."""
+        if not self._pending:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO results (run_id, ts, url, check_name, item, result, comments, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                self._pending,
+            )
+        logging.debug(f"Wrote {len(self._pending)} rows to the history store.")
+        self._pending = []
+
+    def query(self, sql, params=()):
+        """Run a read query and return a DataFrame."""
+        import pandas as pd
+
+        self.flush()
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def runs(self, limit=20):
+        """Return the latest runs with their number of rows and failures."""
+        return self.query(
+            """
+            SELECT r.run_id, datetime(r.started_at, 'unixepoch', 'localtime') AS started, r.host,
+                   COUNT(DISTINCT s.url) AS pages, COUNT(s.id) AS rows, SUM(s.result = 'Fail') AS failures
+            FROM runs r LEFT JOIN results s ON s.run_id = r.run_id
+            GROUP BY r.run_id ORDER BY r.started_at DESC LIMIT ?
+            """,
+            (limit,),
+        )
+
+    def trend(self, check_name, since=0.0):
+        """Return, per run, how many pages and rows of a check were checked and failed."""
+        return self.query(
+            """
+            SELECT run_id, datetime(MIN(ts), 'unixepoch', 'localtime') AS ts, COUNT(DISTINCT url) AS pages,
+                   COUNT(*) AS rows, SUM(result = 'Fail') AS failures,
+                   COUNT(DISTINCT CASE WHEN result = 'Fail' THEN url END) AS failing_pages
+            FROM results WHERE check_name = ? AND ts >= ?
+            GROUP BY run_id ORDER BY MIN(ts)
+            """,
+            (check_name, since),
+        )
+
+    def newly_failing(self, check_name, since):
+        """
+        Return the pages where a check fails in the latest run but passed in the last run before `since`.
+
+        Args:
+            check_name (str): Name of the check, e.g. "H1 Tag Test".
+            since (float): Timestamp, e.g. parse_since("7d") for "started failing this week".
+
+        Returns:
+            DataFrame: url, first_failed (first failing run since `since`) and latest run id.
+        """
+        return self.query(
+            """
+            WITH page_runs AS (
+                SELECT url, run_id, MIN(ts) AS ts, MAX(result = 'Fail') AS failed
+                FROM results WHERE check_name = ? GROUP BY url, run_id
+            ),
+            ranked AS (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY url ORDER BY ts DESC) AS recent,
+                       ROW_NUMBER() OVER (PARTITION BY url, ts < ? ORDER BY ts DESC) AS recent_in_period
+                FROM page_runs
+            )
+            SELECT latest.url,
+                   datetime((SELECT MIN(ts) FROM page_runs p WHERE p.url = latest.url AND p.ts >= ? AND p.failed),
+                            'unixepoch', 'localtime') AS first_failed,
+                   latest.run_id AS latest_run
+            FROM ranked latest
+            JOIN ranked before ON before.url = latest.url AND before.ts < ? AND before.recent_in_period = 1
+            WHERE latest.recent = 1 AND latest.ts >= ? AND latest.failed = 1 AND before.failed = 0
+            ORDER BY first_failed
+            """,
+            (check_name, since, since, since, since),
+        )
+
+    def persistent_failures(self, check_name, runs=3):
+        """
+        Return the items (links, images, ...) of a check that failed in each of their last `runs` runs.
+
+        Args:
+            check_name (str): Name of the check, e.g. "URL Status Code Test".
+            runs (int): Number of consecutive failing runs.
+
+        Returns:
+            DataFrame: item, number of pages it failed on in the latest run, last comment and
+            when it was last seen.
+        """
+        return self.query(
+            """
+            WITH item_runs AS (
+                SELECT item, run_id, MAX(ts) AS ts, MAX(result = 'Fail') AS failed,
+                       COUNT(DISTINCT url) AS pages, MAX(comments) AS comments
+                FROM results WHERE check_name = ? AND item IS NOT NULL GROUP BY item, run_id
+            ),
+            ranked AS (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY item ORDER BY ts DESC) AS recent FROM item_runs
+            )
+            SELECT item, MAX(CASE WHEN recent = 1 THEN pages END) AS pages,
+                   MAX(CASE WHEN recent = 1 THEN comments END) AS comments,
+                   datetime(MAX(ts), 'unixepoch', 'localtime') AS last_seen
+            FROM ranked WHERE recent <= ?
+            GROUP BY item HAVING COUNT(*) = ? AND SUM(failed) = ?
+            ORDER BY pages DESC, item
+            """,
+            (check_name, runs, runs, runs),
+        )
+
+    def run_summary(self, run_id=None):
+        """
+        Return one row per check of a run (default: the latest) with the overall result.
+
+        Returns:
+            DataFrame: testcase, result and comments, like reports/test_report.csv.
+        """
+        if run_id is None:
+            latest = self.conn.execute("SELECT run_id FROM runs ORDER BY started_at DESC LIMIT 1").fetchone()
+            if latest is None:
+                import pandas as pd
+
+                return pd.DataFrame(columns=["testcase", "result", "comments"])
+            run_id = latest[0]
+        df = self.query(
+            """
+            SELECT check_name AS testcase, SUM(result = 'Fail') AS failures, COUNT(*) AS rows,
+                   COUNT(DISTINCT url) AS pages
+            FROM results WHERE run_id = ? GROUP BY check_name ORDER BY MIN(id)
+            """,
+            (run_id,),
+        )
+        df["result"] = df["failures"].map(lambda failures: "Fail" if failures else "Pass")
+        df["comments"] = [
+            f"{failures} of {rows} rows failed on {pages} page(s)" if failures else f"All {rows} rows passed"
+            for failures, rows, pages in zip(df["failures"], df["rows"], df["pages"])
+        ]
+        return df[["testcase", "result", "comments"]]
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def main():
+    """Entry point for querying the results history."""
+    parser = argparse.ArgumentParser(description="Query the history of audit results.")
+    parser.add_argument("--history", type=str, default=DEFAULT_HISTORY_PATH,
+                        help=f"Path of the history store (default: {DEFAULT_HISTORY_PATH}).")
+    parser.add_argument("--out", type=str, default=None, help="Write the result to this CSV file instead of printing it.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runs = commands.add_parser("runs", help="List the latest runs.")
+    runs.add_argument("--limit", type=int, default=20)
+
+    trend = commands.add_parser("trend", help="Failures of a check per run.")
+    trend.add_argument("--check", required=True, help="Check name, e.g. 'H1 Tag Test'.")
+    trend.add_argument("--since", default="30d", help="Start of the period: 7d, 12h, 2024-05-01, ... (default: 30d).")
+
+    new = commands.add_parser("new-failures", help="Pages where a check started failing.")
+    new.add_argument("--check", required=True, help="Check name, e.g. 'H1 Tag Test'.")
+    new.add_argument("--since", default="7d", help="Start of the period (default: 7d).")
+
+    persistent = commands.add_parser("persistent", help="Items failing in each of their last N runs.")
+    persistent.add_argument("--check", default="URL Status Code Test", help="Check name (default: URL Status Code Test).")
+    persistent.add_argument("--runs", type=int, default=3, help="Consecutive failing runs (default: 3).")
+
+    summary = commands.add_parser("summary", help="Overall result per check of a run.")
+    summary.add_argument("--run", default=None, help="Run id (default: the latest run).")
+
+    args = parser.parse_args()
+
+    store = HistoryStore(args.history)
+    try:
+        if args.command == "runs":
+            df = store.runs(args.limit)
+        elif args.command == "trend":
+            df = store.trend(args.check, parse_since(args.since))
+        elif args.command == "new-failures":
+            df = store.newly_failing(args.check, parse_since(args.since))
+        elif args.command == "persistent":
+            df = store.persistent_failures(args.check, args.runs)
+        else:
+            df = store.run_summary(args.run)
+    finally:
+        store.close()
+
+    if args.out:
+        df.to_csv(args.out, index=False)
+        logging.info(f"Query result saved to {args.out}")
+    else:
+        print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import cProfile
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlsplit
+
+
+# Returned by span() while tracing is off, so disabled instrumentation costs one attribute
+# check and no allocation.
+_NULL_SPAN = nullcontext()
+
+
+class Tracer:
+    """
+    Record timed spans for checks and phases, and count WebDriver commands and HTTP requests.
+
+    Spans are kept in memory and can be exported as a JSON summary or in the Chrome
+    trace-event format (open it in chrome://tracing or https://ui.perfetto.dev).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.profile_dir = None
+        self.spans = []
+        self.webdriver = {}
+        self.http = {}
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def enable(self, profile_dir=None):
+        """Start recording; with `profile_dir`, every check is also run under cProfile."""
+        self.enabled = True
+        self.profile_dir = profile_dir
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    def span(self, name, category="phase", **args):
+        """Context manager timing the enclosed block as a span."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, category, args)
+
+    @contextmanager
+    def _span(self, name, category, args):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, category, started, time.perf_counter() - started, args)
+
+    def record(self, name, category, started, duration, args=None):
+        """Store a finished span (`started` is a time.perf_counter() value)."""
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "cat": category,
+                "start": started - self.origin,
+                "dur": duration,
+                "tid": threading.get_ident(),
+                "args": args or {},
+            })
+
+    def _count(self, table, key, duration):
+        with self._lock:
+            stats = table.setdefault(key, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            stats["count"] += 1
+            stats["total_s"] += duration
+            stats["max_s"] = max(stats["max_s"], duration)
+
+    def profile(self, name):
+        """Context manager running the block under cProfile when a profile directory is set."""
+        if not self.enabled or not self.profile_dir:
+            return _NULL_SPAN
+        return self._profile(name)
+
+    @contextmanager
+    def _profile(self, name):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            file_name = "".join(c if c.isalnum() else "_" for c in name)
+            path = os.path.join(self.profile_dir, f"{file_name}-{os.getpid()}.prof")
+            profiler.dump_stats(path)
+            logging.info(f"Profile of '{name}' saved to {path}")
+
+    def instrument_driver(self, driver):
+        """Time every command the WebDriver sends to the browser driver."""
+        if not self.enabled or getattr(driver, "_traced", False):
+            return driver
+        execute = driver.execute
+
+        def traced_execute(driver_command, params=None):
+            started = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                duration = time.perf_counter() - started
+                self._count(self.webdriver, driver_command, duration)
+                self.record(driver_command, "webdriver", started, duration)
+
+        driver.execute = traced_execute
+        driver._traced = True
+        return driver
+
+    def instrument_session(self, session):
+        """Time every request sent through a requests Session."""
+        if not self.enabled or getattr(session, "_traced", False):
+            return session
+        request = session.request
+
+        def traced_request(method, url, *args, **kwargs):
+            started = time.perf_counter()
+            status = None
+            try:
+                response = request(method, url, *args, **kwargs)
+                status = response.status_code
+                return response
+            finally:
+                duration = time.perf_counter() - started
+                self._count(self.http, f"{method} {urlsplit(url).netloc}", duration)
+                self.record(f"{method} {url}", "http", started, duration, {"status": status})
+
+        session.request = traced_request
+        session._traced = True
+        return session
+
+    def summary(self):
+        """Return per-span-name totals plus WebDriver and HTTP statistics."""
+        totals = {}
+        for span in self.spans:
+            if span["cat"] in ("webdriver", "http"):
+                continue
+            stats = totals.setdefault(span["name"], {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            stats["count"] += 1
+            stats["total_s"] += span["dur"]
+            stats["max_s"] = max(stats["max_s"], span["dur"])
+        return {"spans": totals, "webdriver": self.webdriver, "http": self.http}
+
+    def export_json(self, path):
+        """Write the summary and every span to `path` as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"summary": self.summary(), "spans": self.spans}, f, indent=2, default=str)
+        logging.info(f"Trace summary saved to {path}")
+
+    def export_chrome_trace(self, path):
+        """Write the spans to `path` in the Chrome trace-event format."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": span["name"],
+                "cat": span["cat"],
+                "ph": "X",
+                "ts": round(span["start"] * 1e6, 1),
+                "dur": round(span["dur"] * 1e6, 1),
+                "pid": pid,
+                "tid": span["tid"],
+                "args": span["args"],
+            }
+            for span in self.spans
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+        logging.info(f"Chrome trace saved to {path}")
+
+    def export(self, directory, suffix=""):
+        """Write trace{suffix}.json and trace{suffix}.chrome.json to `directory`."""
+        os.makedirs(directory, exist_ok=True)
+        self.export_json(os.path.join(directory, f"trace{suffix}.json"))
+        self.export_chrome_trace(os.path.join(directory, f"trace{suffix}.chrome.json"))
+
+
+# Process-wide tracer, disabled by default
+TRACER = Tracer()
+
+
+def span(name, category="phase", **args):
+    """Shortcut for TRACER.span()."""
+    return TRACER.span(name, category, **args)
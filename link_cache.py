@@ -0,0 +1,169 @@
+import os
+import time
+import sqlite3
+import logging
+
+
+# Seconds a cached result stays valid, by status class. Healthy links are stable across
+# runs; broken links and network errors are re-checked much sooner.
+DEFAULT_TTLS = {
+    "2xx": 7 * 24 * 3600,
+    "3xx": 3 * 24 * 3600,
+    "404": 24 * 3600,
+    "4xx": 12 * 3600,
+    "5xx": 3600,
+    "error": 1800,
+}
+
+DEFAULT_CACHE_PATH = os.path.join("reports", "link_cache.sqlite")
+
+
+def status_class(status_code):
+    """
+    Map an HTTP status code (or None for a network error) to a key of the TTL table.
+
+    Args:
+        status_code (int | None): HTTP status code.
+
+    Returns:
+        str: One of '2xx', '3xx', '404', '4xx', '5xx' or 'error'.
+    """
+    if status_code is None:
+        return "error"
+    if status_code == 404:
+        return "404"
+    if 200 <= status_code < 600:
+        return f"{status_code // 100}xx"
+    return "error"
+
+
+class LinkStatusCache:
+    """
+    On-disk cache of link check results keyed by normalized URL.
+
+    Entries expire after a TTL that depends on the status they recorded, and the least
+    recently used entries are evicted once the cache holds more than `max_entries` rows.
+    Counting the rows scans the table, so eviction only runs after every `max_entries / 20`
+    written rows (and on close); in between the cache may briefly hold a few more rows.
+    With `revalidate=True` cached entries are ignored on read but still refreshed on write.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttls=None, max_entries=200_000, revalidate=False):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_entries = max_entries
+        self.revalidate = revalidate
+        self.hits = 0
+        self.misses = 0
+        self.evict_every = max(1, max_entries // 20)
+        self._written = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Batch workers share the file, so wait for locks instead of failing
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS link_status (
+                url TEXT PRIMARY KEY,
+                status INTEGER,
+                result TEXT NOT NULL,
+                comments TEXT NOT NULL,
+                checked_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_link_status_access ON link_status (last_access)")
+        self.conn.commit()
+
+    def get_many(self, urls):
+        """
+        Look up fresh cached results for the given normalized URLs.
+
+        Args:
+            urls (iterable): Normalized URLs.
+
+        Returns:
+            dict: URL mapped to a (result, comments, status) tuple for every cache hit.
+        """
+        urls = list(urls)
+        found = {}
+        if not self.revalidate:
+            now = time.time()
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT url, result, comments, status FROM link_status "
+                    f"WHERE url IN ({placeholders}) AND expires_at > ?",
+                    (*chunk, now),
+                )
+                for url, result, comments, status in rows:
+                    found[url] = (result, comments, status)
+            if found:
+                self.conn.executemany(
+                    "UPDATE link_status SET last_access = ? WHERE url = ?",
+                    [(now, url) for url in found],
+                )
+                self.conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(urls) - len(found)
+        return found
+
+    def put_many(self, outcomes):
+        """
+        Store freshly checked results and evict least recently used entries if needed.
+
+        Args:
+            outcomes (dict): Normalized URL mapped to a (result, comments, status) tuple.
+        """
+        if not outcomes:
+            return
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO link_status "
+            "(url, status, result, comments, checked_at, expires_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (url, status, result, comments, now, now + self.ttls[status_class(status)], now)
+                for url, (result, comments, status) in outcomes.items()
+            ],
+        )
+        self.conn.commit()
+        self._written += len(outcomes)
+        if self._written >= self.evict_every:
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used entries beyond `max_entries`."""
+        self._written = 0
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM link_status").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            logging.info(f"Evicting {excess} least recently used link cache entries.")
+            self.conn.execute(
+                "DELETE FROM link_status WHERE url IN "
+                "(SELECT url FROM link_status ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+            self.conn.commit()
+
+    def stats(self):
+        """Return hit/miss counters as a dict."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def close(self):
+        if self._written:
+            self.evict()
+        self.conn.close()
@@ -0,0 +1,333 @@
+import time
+import logging
+import threading
+import contextvars
+from urllib.parse import urlsplit, urlunsplit
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import TRACER, span
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Outcome for links that were not checked before the time budget ran out (never cached)
+BUDGET_EXCEEDED = ("Fail", "Skipped: time budget exceeded", None)
+
+# iter_link_rows checks this many hrefs at a time, and remembers the outcomes of this many links
+LINK_BATCH_SIZE = 500
+MEMO_SIZE = 5000
+
+
+def normalize_url(url):
+    """
+    Normalize a URL so that trivially different spellings of the same link are checked once.
+
+    Lowercases the scheme and host, drops default ports and the fragment, and uses "/" for
+    an empty path. The query string is kept as-is.
+
+    Args:
+        url (str): URL to normalize.
+
+    Returns:
+        str: Normalized URL.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    netloc = host
+    try:
+        port = parts.port
+    except ValueError:
+        # Malformed port: keep the original netloc untouched
+        port = None
+        netloc = parts.netloc.lower()
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    if parts.username:
+        netloc = f"{parts.username}@{netloc}"
+    path = parts.path or "/"
+    return urlunsplit((scheme, netloc, path, parts.query, ""))
+
+
+def build_session(pool_size=32):
+    """
+    Create a requests Session with keep-alive connection pools sized for concurrent checks.
+
+    Args:
+        pool_size (int): Maximum number of pooled connections per host.
+
+    Returns:
+        requests.Session: Configured session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return TRACER.instrument_session(session)
+
+
+def classify_status(status_code):
+    """
+    Turn an HTTP status code into the (result, comments) pair used by the URL Status Test.
+
+    Args:
+        status_code (int): HTTP status code.
+
+    Returns:
+        tuple: ("Pass" | "Fail", comment string).
+    """
+    if status_code == 404:
+        return "Fail", "404 Not Found"
+    return "Pass", f"Status Code: {status_code}"
+
+
+class LinkChecker:
+    """
+    Check many links concurrently over shared keep-alive connections.
+
+    Each distinct (normalized) URL is requested once. Requests to the same host are limited
+    to `per_host` at a time, a HEAD rejected with 405/501 is retried as a streamed GET, and
+    the whole run is bounded by an optional `budget` in seconds. When a `cache`
+    (link_cache.LinkStatusCache) is given, fresh cached results are used instead of requests.
+    `known` maps normalized URLs to status codes already observed (e.g. by the browser while
+    loading the page); those URLs are not requested again.
+
+    Pass a long-lived `http_session` (see build_session) to reuse its connections across
+    pages; a checker without one creates its own session and closes it in close().
+    """
+
+    def __init__(self, max_workers=16, per_host=4, timeout=5, budget=None, http_session=None, cache=None,
+                 known=None):
+        self.max_workers = max_workers
+        self.cache = cache
+        self.known = known or {}
+        self.per_host = per_host
+        self.timeout = timeout
+        self.budget = budget
+        self._owns_session = http_session is None
+        self.session = http_session or build_session(pool_size=max(max_workers, per_host))
+        self._deadline = None
+        self._host_limits = {}
+        self._lock = threading.Lock()
+
+    def close(self):
+        """Close the HTTP session if the checker created it."""
+        if self._owns_session:
+            self.session.close()
+
+    def _host_semaphore(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.Semaphore(self.per_host)
+            return self._host_limits[host]
+
+    def _request(self, url, timeout):
+        response = self.session.head(url, timeout=timeout)
+        if response.status_code in (405, 501):
+            logging.debug("HEAD rejected with %s, retrying with GET: %s", response.status_code, url)
+            response = self.session.get(url, timeout=timeout, stream=True)
+            response.close()
+        return response
+
+    def check_one(self, url, deadline=None):
+        """
+        Check a single URL.
+
+        Args:
+            url (str): URL to request.
+            deadline (float | None): time.monotonic() value after which no request is made.
+
+        Returns:
+            tuple: ("Pass" | "Fail", comment string, status code or None).
+        """
+        with self._host_semaphore(url):
+            timeout = self.timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return BUDGET_EXCEEDED
+                timeout = min(timeout, remaining)
+            try:
+                response = self._request(url, timeout)
+            except requests.RequestException as e:
+                # One message per link: logged lazily and sampled (see log_pipeline)
+                logging.error("Error checking URL %s: %s", url, e, extra={"sample": "link_error"})
+                return "Fail", f"Error: {str(e)}", None
+
+        result, comments = classify_status(response.status_code)
+        if result == "Fail":
+            logging.warning("Broken URL found: %s", url, extra={"sample": "broken_url"})
+        return result, comments, response.status_code
+
+    def check(self, urls):
+        """
+        Check a collection of URLs concurrently.
+
+        Args:
+            urls (iterable): URLs to check; duplicates are requested only once.
+
+        Returns:
+            dict: Normalized URL mapped to a ("Pass" | "Fail", comment, status) tuple.
+        """
+        return dict(self.iter_check(urls))
+
+    def iter_check(self, urls):
+        """
+        Check a collection of URLs concurrently, yielding each outcome as soon as it is known.
+
+        Outcomes from the network log and the cache come first, then the requested URLs in
+        the order their checks complete. The time budget runs from the checker's first call,
+        so it bounds all the calls of one page together.
+
+        Args:
+            urls (iterable): URLs to check; duplicates are requested only once.
+
+        Yields:
+            tuple: (normalized URL, ("Pass" | "Fail", comment, status)).
+        """
+        if self.budget and self._deadline is None:
+            self._deadline = time.monotonic() + self.budget
+        unique = {}
+        for url in urls:
+            unique.setdefault(normalize_url(url), url)
+
+        observed = {}
+        for key in unique.keys() & self.known.keys():
+            status = self.known[key]
+            observed[key] = (*classify_status(status), status)
+        if observed:
+            unique = {key: url for key, url in unique.items() if key not in observed}
+            logging.info(f"{len(observed)} link results taken from the browser's network log.")
+            yield from observed.items()
+        if self.cache is not None:
+            cached = self.cache.get_many(unique)
+            unique = {key: url for key, url in unique.items() if key not in cached}
+            logging.info(f"{len(cached)} link results served from cache.")
+            yield from cached.items()
+        logging.info(f"Checking {len(unique)} unique URLs with {self.max_workers} workers.")
+
+        fresh = dict(observed)
+        with span("check links", urls=len(unique)):
+            for key, outcome in self._iter_unique(unique):
+                if outcome is not BUDGET_EXCEEDED:
+                    fresh[key] = outcome
+                yield key, outcome
+        if self.cache is not None:
+            self.cache.put_many(fresh)
+
+    def _iter_unique(self, unique):
+        deadline = self._deadline
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = {}
+        reported = set()
+        try:
+            # Each check runs in a copy of the caller's context, so its log records keep the page and check ids
+            futures = {
+                executor.submit(contextvars.copy_context().run, self.check_one, url, deadline): key
+                for key, url in unique.items()
+            }
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                for future in as_completed(futures, timeout=timeout):
+                    reported.add(future)
+                    error = future.exception()
+                    yield futures[future], ("Fail", f"Error: {error}", None) if error else future.result()
+            except FuturesTimeout:
+                for future, key in futures.items():
+                    if future in reported:
+                        continue
+                    if future.done() and not future.exception():
+                        yield key, future.result()
+                    else:
+                        future.cancel()
+                        yield key, BUDGET_EXCEEDED
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_link_rows(hrefs, batch_size=LINK_BATCH_SIZE, **kwargs):
+    """
+    Check the given hrefs and yield one row per href as the checks complete.
+
+    The hrefs are checked `batch_size` at a time and each row is yielded as soon as its link
+    is checked, so only one batch of links is in flight or held at a time. Rows therefore
+    come in completion order, not page order. Outcomes of the last MEMO_SIZE distinct links
+    are remembered, so a link repeated further down the page is not requested again.
+
+    Args:
+        hrefs (iterable): href values collected from the page (may contain None and duplicates).
+        batch_size (int): Number of hrefs checked together.
+        **kwargs: Options forwarded to LinkChecker.
+
+    Yields:
+        dict: A row with 'url', 'result' and 'comments' keys.
+    """
+    checker = LinkChecker(**kwargs)
+    memo = OrderedDict()
+    try:
+        for batch in _batches(hrefs, batch_size):
+            waiting = {}
+            for href in batch:
+                if not href:
+                    yield {"url": href, "result": "Fail", "comments": "No href attribute"}
+                    continue
+                key = normalize_url(href)
+                if key in memo:
+                    memo.move_to_end(key)
+                    result, comments, _ = memo[key]
+                    yield {"url": href, "result": result, "comments": comments}
+                else:
+                    waiting.setdefault(key, []).append(href)
+
+            for key, outcome in checker.iter_check(urls[0] for urls in waiting.values()):
+                memo[key] = outcome
+                if len(memo) > MEMO_SIZE:
+                    memo.popitem(last=False)
+                result, comments, _ = outcome
+                for href in waiting.get(key, ()):
+                    yield {"url": href, "result": result, "comments": comments}
+    finally:
+        checker.close()
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def check_links(hrefs, **kwargs):
+    """
+    Check the given hrefs and return one row per href, in the original order.
+
+    Args:
+        hrefs (list): href values collected from the page (may contain None and duplicates).
+        **kwargs: Options forwarded to LinkChecker.
+
+    Returns:
+        list: Dicts with 'url', 'result' and 'comments' keys.
+    """
+    checker = LinkChecker(**kwargs)
+    try:
+        outcomes = checker.check(href for href in hrefs if href)
+    finally:
+        checker.close()
+
+    rows = []
+    for href in hrefs:
+        if href:
+            result, comments, _ = outcomes[normalize_url(href)]
+        else:
+            result, comments = "Fail", "No href attribute"
+        rows.append({"url": href, "result": result, "comments": comments})
+    return rows
@@ -0,0 +1,261 @@
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+import multiprocessing.util
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+DEFAULT_LOG_FILE = "automation_test.log"
+DEFAULT_JSONL_FILE = "automation_test.jsonl"
+
+# Messages of the same sample key (per page and check) logged before the rest are only counted
+DEFAULT_SAMPLE_LIMIT = 20
+
+# Identifiers stamped on every record logged while they are set
+_run_id = None
+_url = contextvars.ContextVar("log_url", default=None)
+_check = contextvars.ContextVar("log_check", default=None)
+
+_pipeline = {}
+
+
+def set_run_id(run_id):
+    """Tag every record of this process with `run_id`."""
+    global _run_id
+    _run_id = run_id
+
+
+@contextmanager
+def log_context(url=None, check=None):
+    """
+    Tag the records logged inside the block with a page URL and/or check name.
+
+    The values follow the context, so they are also set in threads started with a copy of it
+    (see link_checker). When a check block ends, the messages sampled away inside it are
+    summarized in one record per sample key.
+    """
+    tokens = []
+    if url is not None:
+        tokens.append((_url, _url.set(url)))
+    if check is not None:
+        tokens.append((_check, _check.set(check)))
+    try:
+        yield
+    finally:
+        if check is not None and "sampler" in _pipeline:
+            _pipeline["sampler"].summarize(_url.get(), check)
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Stamp the run id, page URL and check name on each record.
+
+    Filters run on the thread that logs the record, so the page and check of that thread's
+    log_context are the ones stamped.
+    """
+
+    def filter(self, record):
+        record.run_id = _run_id
+        record.url = _url.get()
+        record.check = _check.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep the first `limit` records of each repetitive message and count the rest.
+
+    Repetitive messages (one per link, image or currency) are logged with
+    extra={"sample": "<key>"}. Per key, page and check only the first `limit` records go
+    through; summarize() then logs how many were dropped. Records without a sample key are
+    never dropped.
+    """
+
+    def __init__(self, limit=DEFAULT_SAMPLE_LIMIT):
+        super().__init__()
+        self.limit = limit
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, "sample", None)
+        if key is None or self.limit is None:
+            return True
+        counter = (key, record.url, record.check)
+        with self._lock:
+            seen, levelno = self.counts.get(counter, (0, record.levelno))
+            self.counts[counter] = (seen + 1, max(levelno, record.levelno))
+        return seen < self.limit
+
+    def summarize(self, url, check):
+        """Log one summary per sample key whose records were dropped for this page and check."""
+        with self._lock:
+            done = [counter for counter in self.counts if counter[1:] == (url, check)]
+            counts = {counter[0]: self.counts.pop(counter) for counter in done}
+        for key, (seen, levelno) in counts.items():
+            if seen > self.limit:
+                logging.log(
+                    levelno, f"{seen - self.limit} more '{key}' message(s) not logged ({seen} in total).",
+                    extra={"sample_summary": key, "suppressed": seen - self.limit},
+                )
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves the formatting to the listener thread.
+
+    The stock QueueHandler formats every message before queueing it, on the thread that
+    logged it. Records only travel within this process, so they are queued as they are and
+    the listener formats them.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format a record as one JSON object per line."""
+
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "run_id": getattr(record, "run_id", None),
+            "url": getattr(record, "url", None),
+            "check": getattr(record, "check", None),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        for key in ("sample", "sample_summary", "suppressed"):
+            if hasattr(record, key):
+                data[key] = getattr(record, key)
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def setup_logging(level=None, log_file=None, jsonl_file=None, sample_limit=None):
+    """
+    Route all logging through a queue to a listener thread that writes the console, the text
+    log and a JSONL log, so checks never wait for formatting or disk writes.
+
+    Defaults come from the environment: LOG_LEVEL (INFO), LOG_FILE (automation_test.log),
+    LOG_JSONL (automation_test.jsonl; empty disables it) and LOG_SAMPLE_LIMIT (20; 0 keeps
+    every message). Calling it again replaces the previous pipeline.
+
+    Returns:
+        QueueListener: The running listener (stopped automatically at exit).
+    """
+    stop_logging()
+    level = level or os.getenv("LOG_LEVEL", "INFO").upper()
+    log_file = log_file or os.getenv("LOG_FILE", DEFAULT_LOG_FILE)
+    jsonl_file = jsonl_file if jsonl_file is not None else os.getenv("LOG_JSONL", DEFAULT_JSONL_FILE)
+    if sample_limit is None:
+        sample_limit = int(os.getenv("LOG_SAMPLE_LIMIT", DEFAULT_SAMPLE_LIMIT))
+
+    text_formatter = logging.Formatter(LOG_FORMAT)
+    # The files are only opened on the first record, so pool workers that forward their
+    # records to the parent (see forward_logging) never open them
+    handlers = [logging.StreamHandler(), logging.FileHandler(log_file, delay=True)]
+    for handler in handlers:
+        handler.setFormatter(text_formatter)
+    if jsonl_file:
+        jsonl_handler = logging.FileHandler(jsonl_file, encoding="utf-8", delay=True)
+        jsonl_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(jsonl_handler)
+
+    records = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(records)
+    sampler = SamplingFilter(sample_limit or None)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(sampler)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    _pipeline.update(listener=listener, handler=queue_handler, handlers=handlers, sampler=sampler, records=records)
+    # Pool workers leave through multiprocessing's exit function, which skips atexit
+    atexit.register(stop_logging)
+    multiprocessing.util.Finalize(None, stop_logging, exitpriority=0)
+    return listener
+
+
+@contextmanager
+def worker_logs(context):
+    """
+    Write the records of pool worker processes through this process's pipeline.
+
+    Yields a queue of the multiprocessing `context` to pass to the workers, which call
+    forward_logging with it in their initializer. Only this process writes the log files, so
+    workers never append to the same files through their own handles.
+    """
+    log_queue = context.Queue()
+    if "records" in _pipeline:
+        # Worker records are already stamped and sampled; skip the filters of this process
+        handlers = [DeferredQueueHandler(_pipeline["records"])]
+    else:
+        handlers = logging.getLogger().handlers
+    receiver = QueueListener(log_queue, *handlers)
+    receiver.start()
+    try:
+        yield log_queue
+    finally:
+        receiver.stop()
+
+
+def forward_logging(log_queue, level=None, sample_limit=None):
+    """
+    Send the records of this worker process to the parent's `log_queue` (see worker_logs).
+
+    Records are stamped and sampled in the worker, formatted into plain messages and written
+    by the parent's listener. Calling it replaces the pipeline of setup_logging.
+    """
+    stop_logging()
+    level = level or os.getenv("LOG_LEVEL", "INFO").upper()
+    if sample_limit is None:
+        sample_limit = int(os.getenv("LOG_SAMPLE_LIMIT", DEFAULT_SAMPLE_LIMIT))
+
+    # The stock QueueHandler merges arguments and tracebacks into the message, so the
+    # records can be pickled to the parent
+    queue_handler = QueueHandler(log_queue)
+    sampler = SamplingFilter(sample_limit or None)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(sampler)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    _pipeline.update(handler=queue_handler, handlers=[], sampler=sampler)
+
+
+def stop_logging():
+    """Write out every queued record and close the log files."""
+    listener = _pipeline.pop("listener", None)
+    if listener is not None:
+        listener.stop()
+    handler = _pipeline.pop("handler", None)
+    if handler is None:
+        return
+    logging.getLogger().removeHandler(handler)
+    for handler in _pipeline.pop("handlers"):
+        handler.close()
+    _pipeline.pop("sampler", None)
+    _pipeline.pop("records", None)
@@ -0,0 +1,126 @@
+import json
+import logging
+
+from link_checker import normalize_url
+
+
+# Chrome capability that records DevTools Network events in the "performance" log
+PERFORMANCE_LOGGING = {"performance": "ALL"}
+
+
+def enable_network_log(options):
+    """
+    Make Chrome record the DevTools Network events of every page load.
+
+    Args:
+        options (ChromeOptions): Options of the driver being created.
+    """
+    options.set_capability("goog:loggingPrefs", PERFORMANCE_LOGGING)
+
+
+def supports_network_log(driver):
+    return getattr(driver, "network_log", False)
+
+
+def _read_events(driver):
+    """Read (and clear) the buffered performance log of `driver` as DevTools messages."""
+    events = []
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        if message.get("method", "").startswith("Network."):
+            events.append(message)
+    return events
+
+
+def discard_network_log(driver):
+    """Drop the events buffered so far, so the next collection only covers the next page load."""
+    if supports_network_log(driver):
+        driver.get_log("performance")
+
+
+def collect_resources(driver):
+    """
+    Turn the Network events recorded since the last call into one record per fetched URL.
+
+    Args:
+        driver (webdriver): Chrome WebDriver created with enable_network_log().
+
+    Returns:
+        dict | None: URL mapped to a dict with 'url', 'type', 'status', 'mime', 'size' (bytes
+        on the wire), 'duration' (seconds) and 'error'; None if the driver records no
+        network log (Firefox, static engine).
+    """
+    if not supports_network_log(driver):
+        return None
+
+    requests = {}
+    for event in _read_events(driver):
+        method, params = event["method"], event.get("params", {})
+        request_id = params.get("requestId")
+
+        if method == "Network.requestWillBeSent":
+            redirect = params.get("redirectResponse")
+            if redirect and request_id in requests:
+                # The same request id continues with the redirect target; keep the hop separately
+                hop = requests.pop(request_id)
+                hop["status"] = redirect.get("status")
+                hop["mime"] = redirect.get("mimeType")
+                hop["duration"] = params.get("timestamp", hop["started"]) - hop["started"]
+                requests[f"{request_id}:{hop['url']}"] = hop
+            requests[request_id] = {
+                "url": params["request"]["url"],
+                "type": params.get("type"),
+                "status": None,
+                "mime": None,
+                "size": None,
+                "duration": None,
+                "error": None,
+                "started": params.get("timestamp", 0.0),
+            }
+        elif request_id not in requests:
+            continue
+        elif method == "Network.responseReceived":
+            response = params.get("response", {})
+            record = requests[request_id]
+            record["status"] = response.get("status")
+            record["mime"] = response.get("mimeType")
+            record["type"] = params.get("type") or record["type"]
+        elif method == "Network.loadingFinished":
+            record = requests[request_id]
+            record["size"] = params.get("encodedDataLength")
+            record["duration"] = params.get("timestamp", record["started"]) - record["started"]
+        elif method == "Network.loadingFailed":
+            record = requests[request_id]
+            record["error"] = params.get("errorText") or "Loading failed"
+            record["duration"] = params.get("timestamp", record["started"]) - record["started"]
+
+    resources = {}
+    for record in requests.values():
+        if record["url"].startswith(("data:", "blob:")):
+            continue
+        del record["started"]
+        resources[record["url"]] = record
+    logging.info(f"Network log: {len(resources)} resources fetched during the page load.")
+    return resources
+
+
+def known_statuses(resources):
+    """
+    Return the status codes the browser received for the URLs it fetched during the page load.
+
+    Args:
+        resources (dict | None): Output of collect_resources().
+
+    Returns:
+        dict: Normalized URL mapped to the HTTP status code the browser received.
+    """
+    if not resources:
+        return {}
+    return {
+        normalize_url(record["url"]): record["status"]
+        for record in resources.values()
+        if record["status"] and record["url"].startswith(("http://", "https://"))
+    }
@@ -0,0 +1,162 @@
+import time
+import logging
+import lxml.html
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from instrumentation import span
+from network_log import collect_resources, discard_network_log
+from setup import apply_page_load_profile, covers_profile
+
+
+class PageSnapshot:
+    """
+    Rendered state of a page captured right after navigation.
+
+    Attributes:
+        url (str): URL that was requested.
+        current_url (str): URL the browser ended up on (after redirects).
+        html (str): Rendered DOM serialized as HTML.
+        script_data (dict | None): Value of `window.ScriptData`, if any.
+        loaded_at (float): Timestamp of the navigation.
+        load_time (float): Seconds spent navigating and capturing.
+        resources (dict | None): Responses recorded in the browser's network log during the
+            navigation (see network_log.collect_resources); None when not available.
+        profile (str): Page-load profile the page was loaded with ("lean" or "full").
+    """
+
+    def __init__(self, url, current_url, html, script_data, loaded_at, load_time, resources=None,
+                 profile="full"):
+        self.url = url
+        self.current_url = current_url
+        self.html = html
+        self.script_data = script_data
+        self.loaded_at = loaded_at
+        self.load_time = load_time
+        self.resources = resources
+        self.profile = profile
+        self._document = None
+
+    def document(self):
+        """Return the snapshot's HTML parsed with lxml (parsed once, on first use)."""
+        if self._document is None:
+            self._document = lxml.html.fromstring(self.html or "<html></html>", base_url=self.current_url)
+        return self._document
+
+
+class PageSession:
+    """
+    Navigate a driver once per URL and share the resulting snapshot between checks.
+
+    Read-only checks call `open(url)` and reuse the page the driver is already on.
+    Checks that mutate the page (e.g. switching currency) call `open(url, fresh=True)`
+    and `mark_dirty()` afterwards, so the next reader gets a clean navigation.
+
+    Pages are loaded with the session's page-load `profile` unless a check asks for a more
+    complete one; a fully loaded page also serves checks that only need the lean profile.
+    """
+
+    def __init__(self, driver, wait_timeout=10, profile="lean"):
+        self.driver = driver
+        self.wait_timeout = wait_timeout
+        self.profile = profile
+        self.snapshot = None
+        self.navigations = 0
+        self._dirty = False
+
+    def open(self, url, fresh=False, profile=None):
+        """
+        Return a snapshot of `url`, navigating only when needed.
+
+        Args:
+            url (str): URL of the page.
+            fresh (bool): Force a new navigation even if the page is already loaded.
+            profile (str | None): Page-load profile the caller needs ("lean" or "full").
+
+        Returns:
+            PageSnapshot: Snapshot of the loaded page.
+        """
+        if profile is None or not covers_profile(profile, self.profile):
+            profile = self.profile
+        if (not fresh and not self._dirty and self.snapshot is not None and self.snapshot.url == url
+                and covers_profile(self.snapshot.profile, profile)):
+            logging.debug(f"Reusing loaded page for {url}")
+            return self.snapshot
+
+        self.snapshot = capture_snapshot(self.driver, url, self.wait_timeout, profile)
+        self.navigations += 1
+        self._dirty = False
+        return self.snapshot
+
+    def mark_dirty(self):
+        """Flag the loaded page as modified so the next `open` navigates again."""
+        self._dirty = True
+
+
+def capture_snapshot(driver, url, wait_timeout=10, profile="full"):
+    """
+    Navigate to `url` and capture the rendered DOM, `window.ScriptData` and, in Chrome, the
+    status of every resource fetched by the page.
+
+    Args:
+        driver (webdriver): Selenium WebDriver instance.
+        url (str): URL of the page.
+        wait_timeout (int): Seconds to wait for the <body> element (and, with the full profile
+            on a lean-loading driver, for the load event).
+        profile (str): Page-load profile ("lean" or "full").
+
+    Returns:
+        PageSnapshot: Snapshot of the loaded page.
+    """
+    if getattr(driver, "is_static", False):
+        with span("fetch", url=url):
+            return driver.snapshot(url)
+
+    started = time.time()
+    logging.info(f"Navigating to {url}")
+    with span("navigate", url=url, profile=profile):
+        profile = apply_page_load_profile(driver, profile)
+        discard_network_log(driver)
+        driver.get(url)
+        WebDriverWait(driver, wait_timeout).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        if profile == "full" and getattr(driver, "lean_loading", False):
+            # The eager strategy returned at DOMContentLoaded; wait for the load event as well
+            WebDriverWait(driver, wait_timeout).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+
+    with span("capture snapshot", url=url):
+        script_data = driver.execute_script("return window.ScriptData || null;")
+        snapshot = PageSnapshot(
+            url=url,
+            current_url=driver.current_url,
+            html=driver.page_source,
+            script_data=script_data,
+            loaded_at=started,
+            load_time=time.time() - started,
+            resources=collect_resources(driver),
+            profile=profile,
+        )
+    logging.info(f"Page loaded in {snapshot.load_time:.2f}s ({profile} profile): {url}")
+    return snapshot
+
+
+def load_page(driver, url, session=None, fresh=False, profile="lean"):
+    """
+    Load `url` through `session` when one is given, otherwise navigate directly.
+
+    Args:
+        driver (webdriver): Selenium WebDriver instance.
+        url (str): URL of the page.
+        session (PageSession | None): Shared page session, if any.
+        fresh (bool): Force a new navigation.
+        profile (str): Page-load profile the check needs: "lean" (default) for checks that only
+            read the DOM, "full" for checks that need every resource or interact with the page.
+
+    Returns:
+        PageSnapshot: Snapshot of the loaded page.
+    """
+    if session is None:
+        return capture_snapshot(driver, url, profile=profile)
+    return session.open(url, fresh=fresh, profile=profile)
@@ -0,0 +1,111 @@
+class ResultTable:
+    """
+    Column-oriented table of check results, much lighter than a DataFrame.
+
+    Checks return a ResultTable; it is only turned into a pandas DataFrame when something
+    needs pandas (Parquet output, ad-hoc analysis). Columns are plain lists, so a one-row
+    result costs a few small objects instead of a DataFrame with its index and blocks, and
+    tables pickle compactly between batch workers.
+    """
+
+    __slots__ = ("columns", "data")
+
+    def __init__(self, columns=(), data=None):
+        self.columns = list(columns)
+        self.data = data if data is not None else {column: [] for column in self.columns}
+
+    @classmethod
+    def from_records(cls, records):
+        """Build a table from a list of dicts; columns appear in first-seen order."""
+        columns = {}
+        for record in records:
+            for key in record:
+                columns.setdefault(key, None)
+        return cls(columns, {column: [record.get(column) for record in records] for column in columns})
+
+    @classmethod
+    def from_dataframe(cls, df):
+        columns = [str(column) for column in df.columns]
+        return cls(columns, {name: df[column].tolist() for name, column in zip(columns, df.columns)})
+
+    @classmethod
+    def concat(cls, tables):
+        """Stack tables vertically; missing columns are filled with None."""
+        tables = [as_table(table) for table in tables]
+        columns = {}
+        for table in tables:
+            for column in table.columns:
+                columns.setdefault(column, None)
+        data = {column: [] for column in columns}
+        for table in tables:
+            rows = len(table)
+            for column in columns:
+                data[column].extend(table.data[column] if column in table.data else [None] * rows)
+        return cls(columns, data)
+
+    def __len__(self):
+        return len(self.data[self.columns[0]]) if self.columns else 0
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def __getitem__(self, column):
+        return self.data[column]
+
+    def __contains__(self, column):
+        return column in self.data
+
+    def __repr__(self):
+        rows = [self.columns] + [[str(value) for value in row] for row in self.rows()]
+        widths = [max(len(str(row[i])) for row in rows) for i in range(len(self.columns))]
+        return "\n".join("  ".join(str(value).ljust(width) for value, width in zip(row, widths)) for row in rows)
+
+    def rows(self):
+        """Iterate over the rows as tuples, in column order."""
+        return zip(*(self.data[column] for column in self.columns))
+
+    def to_dict(self, orient="records"):
+        """Return the rows as a list of dicts (the only orient used here, as in DataFrame.to_dict)."""
+        if orient != "records":
+            raise ValueError(f"Unsupported orient: {orient}")
+        return [dict(zip(self.columns, row)) for row in self.rows()]
+
+    def to_dataframe(self):
+        import pandas as pd
+
+        return pd.DataFrame({column: self.data[column] for column in self.columns}, columns=self.columns)
+
+    def copy(self):
+        return ResultTable(self.columns, {column: list(values) for column, values in self.data.items()})
+
+    def insert(self, position, column, value):
+        """Add a column holding `value` in every row at `position`, like DataFrame.insert."""
+        rows = len(self)
+        self.columns.insert(position, column)
+        self.data[column] = [value] * rows
+
+    def add_column(self, column, value):
+        """Add (or overwrite) a column holding `value` in every row, at the end."""
+        rows = len(self)
+        if column not in self.data:
+            self.columns.append(column)
+        self.data[column] = [value] * rows
+
+    def count(self, column, value):
+        """Return how many rows hold `value` in `column`."""
+        return self.data[column].count(value) if column in self.data else 0
+
+
+def as_table(result):
+    """Return `result` (a ResultTable or a pandas DataFrame) as a ResultTable."""
+    if isinstance(result, ResultTable):
+        return result
+    return ResultTable.from_dataframe(result)
+
+
+def to_dataframe(result):
+    """Return `result` (a ResultTable or a pandas DataFrame) as a pandas DataFrame."""
+    if isinstance(result, ResultTable):
+        return result.to_dataframe()
+    return result
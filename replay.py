@@ -0,0 +1,481 @@
+import os
+import re
+import gzip
+import json
+import time
+import base64
+import logging
+import argparse
+import tempfile
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urljoin
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import lxml.html
+import requests
+
+from link_checker import normalize_url, build_session
+
+
+DEFAULT_REPLAY_PORT = 8766
+
+# Bodies larger than this are recorded without content (the status and headers are kept)
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+# Headers that describe the recorded transfer rather than the resource
+SKIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+# Content types whose absolute URLs are rewritten to the replay server
+REWRITTEN_TYPES = ("text/html", "text/css")
+
+# Subresources referenced by the HTML, for recordings made without Chrome's network log
+SUBRESOURCE_XPATH = (
+    "//img/@src | //script/@src | //source/@src | //iframe/@src"
+    " | //link[contains(' stylesheet icon preload modulepreload ', concat(' ', @rel, ' '))]/@href"
+)
+INLINE_SCRIPT = re.compile(r"(<script\b[^>]*>.*?</script\s*>)", re.IGNORECASE | re.DOTALL)
+CSS_URL = re.compile(r"""url\(\s*['"]?([^'")]+?)['"]?\s*\)|@import\s+['"]([^'"]+)['"]""")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _is_http(url):
+    return urlsplit(url).scheme in ("http", "https")
+
+
+def _charset(mime_type):
+    match = re.search(r"charset=([\w-]+)", mime_type)
+    return match.group(1) if match else "utf-8"
+
+
+def _entry(method, url, response, pageref, body=True):
+    """Turn a requests response into a HAR entry (the body is stored when `body` is True)."""
+    content = {"size": 0, "mimeType": response.headers.get("Content-Type", "")}
+    if body and method == "GET":
+        data = response.content
+        content["size"] = len(data)
+        if len(data) > MAX_BODY_SIZE:
+            content["comment"] = "Body not recorded (too large)"
+            return _har_entry(method, url, response, pageref, content)
+        if content["mimeType"].startswith(("text/", "application/json", "application/javascript")):
+            try:
+                content["text"] = data.decode(_charset(content["mimeType"]))
+            except (UnicodeDecodeError, LookupError):
+                pass
+        if "text" not in content:
+            content["text"] = base64.b64encode(data).decode("ascii")
+            content["encoding"] = "base64"
+    return _har_entry(method, url, response, pageref, content)
+
+
+def _har_entry(method, url, response, pageref, content):
+    return {
+        "pageref": pageref,
+        "startedDateTime": _now(),
+        "time": round(response.elapsed.total_seconds() * 1000, 1),
+        "request": {"method": method, "url": url},
+        "response": {
+            "status": response.status_code,
+            "headers": [
+                {"name": name, "value": value}
+                for name, value in response.headers.items() if name.lower() not in SKIPPED_HEADERS
+            ],
+            "content": content,
+        },
+    }
+
+
+class Recorder:
+    """
+    Record pages into a HAR-like archive: the page HTML, its subresources, its ScriptData
+    and the responses of its links, as the URL Status Test requests them.
+
+    With a driver, the page is also loaded in the browser: its ScriptData is kept and every
+    resource in Chrome's network log is recorded, including the ones requested by JavaScript.
+    Without a driver, the subresources referenced by the HTML (and by its stylesheets) are
+    recorded instead.
+    """
+
+    def __init__(self, driver=None, links=True, workers=16, timeout=15):
+        self.driver = driver
+        self.links = links
+        self.workers = workers
+        self.timeout = timeout
+        self.session = build_session(pool_size=workers)
+        self.pages = []
+        self.entries = []
+        self._recorded = set()
+        self._lock = threading.Lock()
+
+    def _fetch(self, method, url, pageref, body=True, follow=True):
+        key = (method, normalize_url(url))
+        with self._lock:
+            if key in self._recorded:
+                return None
+            self._recorded.add(key)
+        try:
+            if method == "HEAD":
+                response = self.session.head(url, timeout=self.timeout)
+            else:
+                # Subresources are recorded with their final response under the requested URL
+                response = self.session.get(url, timeout=self.timeout, allow_redirects=follow)
+        except requests.RequestException as e:
+            logging.warning(f"Could not record {method} {url}: {e}")
+            return None
+        entry = _entry(method, url, response, pageref, body)
+        with self._lock:
+            self.entries.append(entry)
+        return response
+
+    def _record_link(self, url, pageref):
+        # Same requests as LinkChecker: HEAD, and GET when the server rejects HEAD
+        response = self._fetch("HEAD", url, pageref)
+        if response is not None and response.status_code in (405, 501):
+            self._fetch("GET", url, pageref, body=False, follow=False)
+
+    def record_page(self, url):
+        """Record one page, its subresources and its links."""
+        pageref = f"page_{len(self.pages) + 1}"
+        started = time.time()
+        logging.info(f"Recording {url}")
+
+        script_data = None
+        resources = []
+        if self.driver is not None:
+            from page_session import capture_snapshot
+
+            snapshot = capture_snapshot(self.driver, url, profile="full")
+            script_data = snapshot.script_data
+            resources = [resource for resource in (snapshot.resources or {}) if _is_http(resource)]
+
+        # Follow redirects of the page itself, recording every hop
+        location = url
+        document = None
+        for _ in range(10):
+            response = self._fetch("GET", location, pageref, follow=False)
+            if response is None or not response.is_redirect:
+                break
+            location = urljoin(location, response.headers["Location"])
+        if response is not None and "html" in response.headers.get("Content-Type", ""):
+            document = lxml.html.fromstring(response.content, base_url=location)
+            document.make_links_absolute(location, resolve_base_href=True)
+
+        if document is not None:
+            resources += [str(value) for value in document.xpath(SUBRESOURCE_XPATH)]
+        resources = [resource for resource in dict.fromkeys(resources) if _is_http(resource)]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            responses = list(executor.map(lambda resource: self._fetch("GET", resource, pageref), resources))
+            # One level of url()/@import references from the recorded stylesheets
+            nested = []
+            for response in responses:
+                if response is not None and "css" in response.headers.get("Content-Type", ""):
+                    for match in CSS_URL.finditer(response.text):
+                        nested.append(urljoin(response.url, match.group(1) or match.group(2)))
+            list(executor.map(lambda resource: self._fetch("GET", resource, pageref),
+                              [resource for resource in nested if _is_http(resource)]))
+
+            if self.links and document is not None:
+                links = [str(href) for href in document.xpath("//a/@href")]
+                links = {normalize_url(link): link for link in links if _is_http(link)}
+                list(executor.map(lambda link: self._record_link(link, pageref), links.values()))
+
+        self.pages.append({
+            "id": pageref,
+            "title": url,
+            "startedDateTime": datetime.fromtimestamp(started, timezone.utc).isoformat(),
+            "url": url,
+            "finalUrl": location,
+            "scriptData": script_data,
+            "pageTimings": {"onLoad": round((time.time() - started) * 1000, 1)},
+        })
+        logging.info(f"Recorded {url} ({len(self.entries)} responses so far).")
+
+    def save(self, path):
+        """Write the archive as gzip-compressed HAR JSON, atomically."""
+        archive = {
+            "log": {
+                "version": "1.2",
+                "creator": {"name": "assignment-7 replay", "version": "1"},
+                "pages": self.pages,
+                "entries": self.entries,
+            }
+        }
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".har.gz.tmp")
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+            f.write(json.dumps(archive, ensure_ascii=False).encode("utf-8"))
+        os.replace(tmp_path, path)
+        logging.info(f"Archive of {len(self.pages)} page(s) and {len(self.entries)} responses saved to {path}")
+
+
+def record(urls, path, driver=None, links=True, workers=16):
+    """
+    Record `urls` into the archive at `path`.
+
+    Args:
+        urls (list): Pages to record.
+        path (str): Archive path (.har.gz).
+        driver (webdriver | None): Browser used to capture ScriptData and the network log.
+        links (bool): Also record the responses of the links on each page.
+        workers (int): Concurrent requests.
+    """
+    recorder = Recorder(driver=driver, links=links, workers=workers)
+    for url in urls:
+        try:
+            recorder.record_page(url)
+        except Exception as e:
+            logging.error(f"Could not record {url}: {e}", exc_info=True)
+    recorder.save(path)
+
+
+def load_archive(path):
+    """Read an archive written by Recorder.save and return its 'log' object."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)["log"]
+
+
+class ReplayArchive:
+    """Recorded responses looked up by method and normalized URL."""
+
+    def __init__(self, path):
+        log = load_archive(path)
+        self.pages = log["pages"]
+        self.responses = {}
+        for entry in log["entries"]:
+            key = (entry["request"]["method"], normalize_url(entry["request"]["url"]))
+            self.responses.setdefault(key, entry["response"])
+        self.origins = sorted({_origin(entry["request"]["url"]) for entry in log["entries"]})
+
+    def find(self, method, url):
+        """
+        Return the recorded response for a request, or None.
+
+        A HEAD is answered from a recorded GET (without the body) and a GET from a recorded
+        HEAD (link targets are only recorded with HEAD).
+        """
+        key = normalize_url(url)
+        fallback = "GET" if method == "HEAD" else "HEAD"
+        return self.responses.get((method, key)) or self.responses.get((fallback, key))
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class ReplayServer:
+    """
+    Serve an archive from a local server, so checks rerun offline and deterministically.
+
+    A recorded URL such as https://example.com/p/1?x=1 is served at
+    http://127.0.0.1:<port>/https/example.com/p/1?x=1 (see url_for). Links and resource URLs
+    in recorded HTML and CSS are rewritten the same way, so the browser and the link checker
+    only ever talk to this server. Requests that were not recorded get a 404 with an
+    'X-Replay: miss' header and are logged.
+    """
+
+    def __init__(self, path, host="127.0.0.1", port=DEFAULT_REPLAY_PORT):
+        self.archive = ReplayArchive(path)
+        handler = type("Handler", (ReplayRequestHandler,), {"replay": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.misses = 0
+        hosts = "|".join(re.escape(urlsplit(origin).netloc) for origin in self.archive.origins) or "(?!)"
+        # Absolute (scheme://host) and protocol-relative (//host) URLs, also JSON-escaped (\/\/)
+        self._absolute_url = re.compile(rf"(?<![\w:])(?:(https?):)?(//|\\/\\/)({hosts})(?=[/\\\"'?#)\s]|$)")
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, url):
+        """Return the replay URL of a recorded URL."""
+        parts = urlsplit(url)
+        rest = parts.path or "/"
+        if parts.query:
+            rest += f"?{parts.query}"
+        return f"{self.base_url}/{parts.scheme}/{parts.netloc}{rest}"
+
+    def live_url(self, path, referer=None):
+        """Return the recorded URL a request path stands for."""
+        scheme, _, rest = path.lstrip("/").partition("/")
+        if scheme in ("http", "https") and rest:
+            return f"{scheme}://{rest}"
+        # Root-relative request made by a script: resolve it against the referring page
+        if referer and referer.startswith(self.base_url):
+            base = self.live_url(referer[len(self.base_url):])
+        else:
+            base = self.archive.pages[0]["finalUrl"] if self.archive.pages else "http://localhost/"
+        return urljoin(base, path)
+
+    def rewrite(self, text, html=False):
+        """
+        Point absolute URLs of recorded origins in `text` to the replay server.
+
+        In HTML the content of inline scripts is left alone, so ScriptData keeps its recorded
+        values; only the opening <script> tag (its src) is rewritten.
+        """
+        def replace(match):
+            scheme, slashes, host = match.groups()
+            scheme = scheme or "https"
+            prefix = self.base_url if slashes == "//" else self.base_url.replace("/", "\\/")
+            separator = "/" if slashes == "//" else "\\/"
+            return f"{prefix}{separator}{scheme}{separator}{host}"
+
+        if not html:
+            return self._absolute_url.sub(replace, text)
+        parts = []
+        for i, chunk in enumerate(INLINE_SCRIPT.split(text)):
+            if i % 2:
+                tag_end = chunk.index(">") + 1
+                chunk = self._absolute_url.sub(replace, chunk[:tag_end]) + chunk[tag_end:]
+            else:
+                chunk = self._absolute_url.sub(replace, chunk)
+            parts.append(chunk)
+        return "".join(parts)
+
+    def start(self):
+        self.thread.start()
+        logging.info(f"Replaying {len(self.archive.pages)} recorded page(s) at {self.base_url}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.misses:
+            logging.warning(f"Replay: {self.misses} request(s) were not in the archive.")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class ReplayRequestHandler(BaseHTTPRequestHandler):
+    """Answers requests from the archive of the ReplayServer it belongs to."""
+
+    protocol_version = "HTTP/1.1"
+    replay = None
+
+    def log_message(self, format, *args):
+        logging.debug(f"Replay: {format % args}")
+
+    def _respond(self, head):
+        url = self.replay.live_url(self.path, self.headers.get("Referer"))
+        recorded = self.replay.archive.find(self.command, url)
+        if recorded is None:
+            self.replay.misses += 1
+            logging.warning(f"Replay miss: {self.command} {url}")
+            body = b"not recorded"
+            self.send_response(404)
+            self.send_header("X-Replay", "miss")
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+            return
+
+        content = recorded["content"]
+        if content.get("encoding") == "base64":
+            body = base64.b64decode(content.get("text", ""))
+        else:
+            text = content.get("text", "")
+            if content["mimeType"].startswith(REWRITTEN_TYPES):
+                text = self.replay.rewrite(text, html=content["mimeType"].startswith("text/html"))
+            body = text.encode(_charset(content["mimeType"]), errors="replace")
+
+        self.send_response(recorded["status"])
+        for header in recorded["headers"]:
+            value = header["value"]
+            if header["name"].lower() == "location":
+                value = self.replay.url_for(urljoin(url, value))
+            self.send_header(header["name"], value)
+        self.send_header("X-Replay", "hit")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(head=False)
+
+    def do_HEAD(self):
+        self._respond(head=True)
+
+
+def main():
+    """Entry point for recording pages and serving recorded archives."""
+    parser = argparse.ArgumentParser(description="Record pages into an archive and replay them offline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="Record pages into an archive.")
+    record_parser.add_argument("urls", nargs="*", help="Pages to record (default: TEST_URL).")
+    record_parser.add_argument("--urls-file", type=str, default=None, help="File with one URL per line, or '-'.")
+    record_parser.add_argument("--out", type=str, required=True, help="Archive to write (.har.gz).")
+    record_parser.add_argument("--static", action="store_true",
+                               help="Record without a browser (no ScriptData, only subresources referenced by the HTML).")
+    record_parser.add_argument("--browser", type=str, default="chrome", help="Browser to use: 'chrome' (default) or 'firefox'.")
+    record_parser.add_argument("--headless", action="store_true", help="Run the browser in headless mode.")
+    record_parser.add_argument("--no-links", action="store_true", help="Do not record the responses of the links.")
+    record_parser.add_argument("--workers", type=int, default=16, help="Concurrent requests (default: 16).")
+
+    serve_parser = commands.add_parser("serve", help="Serve an archive until interrupted.")
+    serve_parser.add_argument("archive", type=str, help="Archive to serve (.har.gz).")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_REPLAY_PORT,
+                              help=f"Port to listen on (default: {DEFAULT_REPLAY_PORT}).")
+
+    list_parser = commands.add_parser("list", help="List the pages and responses of an archive.")
+    list_parser.add_argument("archive", type=str, help="Archive to list (.har.gz).")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        urls = list(args.urls)
+        if args.urls_file:
+            from batch import read_urls
+
+            urls += read_urls(args.urls_file)
+        if not urls and os.getenv("TEST_URL"):
+            urls = [os.getenv("TEST_URL")]
+        if not urls:
+            parser.error("No URLs to record.")
+        driver = None
+        if not args.static:
+            from setup import setup_driver, quit_driver
+
+            driver = setup_driver(browser=args.browser, headless=args.headless)
+        try:
+            record(urls, args.out, driver=driver, links=not args.no_links, workers=args.workers)
+        finally:
+            if driver is not None:
+                quit_driver(driver)
+
+    elif args.command == "serve":
+        with ReplayServer(args.archive, port=args.port) as server:
+            for page in server.archive.pages:
+                logging.info(f"{page['url']} -> {server.url_for(page['finalUrl'])}")
+            try:
+                server.thread.join()
+            except KeyboardInterrupt:
+                pass
+
+    else:
+        log = load_archive(args.archive)
+        for page in log["pages"]:
+            entries = [entry for entry in log["entries"] if entry["pageref"] == page["id"]]
+            print(f"{page['url']}  ({len(entries)} responses, ScriptData: {'yes' if page['scriptData'] else 'no'})")
+            for entry in entries:
+                print(f"    {entry['response']['status']}  {entry['request']['method']:4}  {entry['request']['url']}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
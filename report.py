@@ -0,0 +1,413 @@
+import os
+import re
+import csv
+import json
+import logging
+import argparse
+import tempfile
+import importlib.util
+
+from instrumentation import span
+from records import as_table, to_dataframe
+
+
+REPORT_DIRECTORY = "reports"
+REPORT_NAME = "test_report"
+REPORT_FORMATS = ("xlsx", "csv", "parquet")
+STREAM_FORMATS = ("csv", "jsonl", "parquet")
+
+# Excel limits sheet titles to 31 characters and forbids some characters
+INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+# Sheet files written by several processes at once (see RowSink) end in ".part-<n>"
+PART_SUFFIX = re.compile(r"\.part-[^.]+$")
+
+
+def output_format(value):
+    """
+    argparse type of the report and stream format options.
+
+    Parquet output needs pyarrow, so selecting it without pyarrow installed fails when the
+    arguments are parsed instead of when the first sheet is written.
+    """
+    if value == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise argparse.ArgumentTypeError("the parquet format needs pyarrow (pip install pyarrow).")
+    return value
+
+
+def excel_sheet_title(name):
+    """Return `name` as a valid Excel sheet title."""
+    return INVALID_SHEET_CHARS.sub("_", name)[:31]
+
+
+def _cell_value(value):
+    # openpyxl only accepts scalars; NaN becomes an empty cell like DataFrame.to_excel does
+    if value is None:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, (dict, list, tuple, set)):
+        return str(value)
+    return value
+
+
+def _parquet_safe(df):
+    # Parquet columns need one type; stringify anything in object columns that is not a str
+    df = df.copy()
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].map(lambda v: v if v is None or isinstance(v, str) else str(v))
+    return df
+
+
+def read_report(path):
+    """
+    Read a report written by ReportSink or RowSink back into DataFrames.
+
+    Args:
+        path (str): Path of an .xlsx workbook, or of a directory of .csv/.parquet sheets.
+
+    Returns:
+        dict: Sheet name mapped to its DataFrame.
+    """
+    import pandas as pd
+
+    if os.path.isdir(path):
+        sheets = {}
+        for file_name in sorted(os.listdir(path)):
+            name, extension = os.path.splitext(file_name)
+            file_path = os.path.join(path, file_name)
+            if extension == ".csv":
+                df = pd.read_csv(file_path)
+            elif extension == ".parquet":
+                df = pd.read_parquet(file_path)
+            else:
+                continue
+            name = PART_SUFFIX.sub("", name)
+            sheets[name] = pd.concat([sheets[name], df], ignore_index=True) if name in sheets else df
+        return sheets
+    return pd.read_excel(path, sheet_name=None, engine="openpyxl")
+
+
+class ReportSink:
+    """
+    Collect result sheets in memory during a run and write the report once at the end.
+
+    Formats:
+        xlsx:    one workbook (reports/test_report.xlsx) written with openpyxl's write-only
+                 mode. Sheets of the previous workbook that were not produced in this run
+                 are streamed over unchanged, so ad-hoc runs of a single check keep the rest.
+        csv:     one file per sheet in reports/test_report/.
+        parquet: one file per sheet in reports/test_report/ (requires pyarrow).
+    """
+
+    def __init__(self, fmt="xlsx", directory=REPORT_DIRECTORY, name=REPORT_NAME, keep_existing=True):
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unsupported report format: {fmt}. Use one of {', '.join(REPORT_FORMATS)}.")
+        self.fmt = fmt
+        self.directory = directory
+        self.name = name
+        self.keep_existing = keep_existing
+        self.sheets = {}
+
+    @property
+    def path(self):
+        if self.fmt == "xlsx":
+            return os.path.join(self.directory, f"{self.name}.xlsx")
+        return os.path.join(self.directory, self.name)
+
+    def add(self, sheet_name, df):
+        """
+        Store the results of a sheet, replacing any earlier results for the same sheet.
+
+        Args:
+            sheet_name (str): Name of the sheet (test case).
+            df (ResultTable | DataFrame): Results to write.
+        """
+        logging.info(f"Buffering {len(df)} rows for sheet: {sheet_name}")
+        self.sheets[sheet_name] = df
+
+    def flush(self):
+        """Write every buffered sheet to the report and clear the buffer."""
+        if not self.sheets:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with span("write report", format=self.fmt, sheets=len(self.sheets)):
+            if self.fmt == "xlsx":
+                self._write_xlsx()
+            else:
+                self._write_files()
+        logging.info(f"Test results saved to {self.path}")
+        self.sheets = {}
+
+    def _write_xlsx(self):
+        from openpyxl import Workbook, load_workbook
+
+        path = self.path
+        titles = {excel_sheet_title(name): as_table(df) for name, df in self.sheets.items()}
+
+        workbook = Workbook(write_only=True)
+        existing = None
+        if self.keep_existing and os.path.exists(path):
+            try:
+                existing = load_workbook(path, read_only=True)
+            except Exception as e:
+                logging.error(f"Could not read the existing report, it will be replaced: {str(e)}")
+
+        try:
+            # Keep the order of the existing workbook and append new sheets at the end
+            order = list(existing.sheetnames) if existing else []
+            order += [title for title in titles if title not in order]
+            for title in order:
+                sheet = workbook.create_sheet(title)
+                if title in titles:
+                    table = titles[title]
+                    sheet.append([str(column) for column in table.columns])
+                    for row in table.rows():
+                        sheet.append([_cell_value(value) for value in row])
+                else:
+                    for row in existing[title].iter_rows(values_only=True):
+                        sheet.append(row)
+        finally:
+            if existing:
+                existing.close()
+
+        # Write next to the target and swap it in, so a crash never leaves a truncated report
+        fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=self.directory)
+        os.close(fd)
+        try:
+            workbook.save(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def _write_files(self):
+        os.makedirs(self.path, exist_ok=True)
+        for name, df in self.sheets.items():
+            file_path = os.path.join(self.path, f"{name.replace(os.sep, '_')}.{self.fmt}")
+            if self.fmt == "csv":
+                table = as_table(df)
+                with open(file_path, "w", encoding="utf-8", newline="") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(table.columns)
+                    writer.writerows([_cell_value(value) for value in row] for row in table.rows())
+            else:
+                # DataFrame.to_parquet needs pyarrow (or fastparquet) installed
+                _parquet_safe(to_dataframe(df)).to_parquet(file_path, index=False)
+
+
+class RowStream:
+    """
+    Append rows to a CSV, JSONL or Parquet file as they are produced, instead of buffering a sheet.
+
+    Memory stays flat however many rows are written: CSV and JSONL rows are written and
+    flushed as they arrive (write) or once per chunk (write_many), so a crash loses at most
+    the chunk being written. Parquet rows are written as a row group every `row_group_size`
+    rows (requires pyarrow; the file is only readable once closed). Values that are not
+    strings are stored JSON-encoded in Parquet, so every column has one type.
+    """
+
+    def __init__(self, path, columns, fmt=None, row_group_size=1000):
+        self.fmt = fmt or os.path.splitext(path)[1].lstrip(".")
+        if self.fmt not in STREAM_FORMATS:
+            raise ValueError(f"Unsupported stream format: {self.fmt}. Use one of {', '.join(STREAM_FORMATS)}.")
+        self.path = path
+        self.columns = list(columns)
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._pending = []
+        self._writer = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.fmt == "jsonl":
+            self._file = open(path, "w", encoding="utf-8")
+        elif self.fmt == "csv":
+            self._file = open(path, "w", encoding="utf-8", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.columns)
+            self._file.flush()
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self._schema = pa.schema([(column, pa.string()) for column in self.columns])
+            self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, row):
+        """Append one row (a dict; missing columns are written as null)."""
+        self.write_many([row])
+
+    def write_many(self, rows):
+        """Append a chunk of rows; CSV and JSONL are flushed once per chunk."""
+        if self.fmt == "jsonl":
+            for row in rows:
+                self._file.write(json.dumps({column: row.get(column) for column in self.columns}, default=str) + "\n")
+                self.rows += 1
+            self._file.flush()
+        elif self.fmt == "csv":
+            for row in rows:
+                self._writer.writerow([_cell_value(row.get(column)) for column in self.columns])
+                self.rows += 1
+            self._file.flush()
+        else:
+            for row in rows:
+                self._pending.append(row)
+                self.rows += 1
+                if len(self._pending) >= self.row_group_size:
+                    self._write_row_group()
+
+    def _write_row_group(self):
+        import pyarrow as pa
+
+        def text(value):
+            return value if value is None or isinstance(value, str) else json.dumps(value, default=str)
+
+        data = {column: [text(row.get(column)) for row in self._pending] for column in self.columns}
+        self._writer.write_table(pa.Table.from_pydict(data, schema=self._schema))
+        self._pending = []
+
+    def close(self):
+        if self.fmt in ("jsonl", "csv"):
+            self._file.close()
+        else:
+            if self._pending:
+                self._write_row_group()
+            self._writer.close()
+        logging.info(f"{self.rows} rows streamed to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RowSink:
+    """
+    Write result rows to the report while the checks produce them, with a bounded buffer.
+
+    Unlike ReportSink, no sheet is ever held in memory: each sheet buffers at most
+    `buffer_rows` rows before they are written out.
+
+    Formats:
+        csv:     one file per sheet in reports/test_report/, flushed every chunk, so the rows
+                 written before a crash survive it.
+        parquet: one file per sheet, one row group per chunk (requires pyarrow; readable once
+                 closed).
+        xlsx:    reports/test_report.xlsx in openpyxl's write-only mode, which keeps the rows
+                 in temporary files; the workbook is saved when the sink is closed.
+
+    The columns of a sheet are those declared with its first rows plus the keys of its first
+    chunk; keys first seen later are dropped.
+    With `part` (e.g. the process id of a batch worker) sheet files are named
+    "<sheet>.part-<part>.<fmt>", so several processes can write the same report; read_report
+    joins the parts again.
+    """
+
+    def __init__(self, fmt="csv", directory=REPORT_DIRECTORY, name=REPORT_NAME, buffer_rows=500, part=None):
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unsupported report format: {fmt}. Use one of {', '.join(REPORT_FORMATS)}.")
+        if fmt == "xlsx" and part is not None:
+            raise ValueError("A streamed xlsx report cannot be written by several processes; use csv or parquet.")
+        self.fmt = fmt
+        self.directory = directory
+        self.name = name
+        self.buffer_rows = buffer_rows
+        self.part = part
+        self.buffers = {}
+        self.columns = {}
+        self.streams = {}
+        self._workbook = None
+        self._dropped = set()
+
+    @property
+    def path(self):
+        return ReportSink(fmt=self.fmt, directory=self.directory, name=self.name).path
+
+    def clear(self):
+        """Remove the sheet files of an earlier report at `path` (csv and parquet only)."""
+        if self.fmt == "xlsx" or not os.path.isdir(self.path):
+            return
+        for file_name in os.listdir(self.path):
+            if file_name.endswith(f".{self.fmt}"):
+                os.remove(os.path.join(self.path, file_name))
+
+    def write_many(self, sheet_name, rows, columns=None):
+        """
+        Buffer rows of a sheet, writing them out whenever `buffer_rows` are pending.
+
+        Args:
+            sheet_name (str): Name of the sheet (test case).
+            rows (iterable): Result rows (dicts).
+            columns (list | None): Columns of the sheet, when known before its first rows are
+                written (e.g. when the first rows are an error row with fewer columns).
+        """
+        if columns and sheet_name not in self.columns:
+            self.columns[sheet_name] = list(columns)
+        buffer = self.buffers.setdefault(sheet_name, [])
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= self.buffer_rows:
+                self._write(sheet_name)
+                buffer = self.buffers[sheet_name]
+
+    def _write(self, sheet_name):
+        rows, self.buffers[sheet_name] = self.buffers.get(sheet_name, []), []
+        if not rows:
+            return
+        if sheet_name not in self.streams:
+            declared = self.columns.get(sheet_name, [])
+            columns = list(dict.fromkeys([*declared, *(key for row in rows for key in row)]))
+            self.streams[sheet_name] = self._open(sheet_name, columns)
+        stream = self.streams[sheet_name]
+        columns = stream.columns
+        extra = {key for row in rows for key in row} - set(columns) - self._dropped
+        if extra:
+            self._dropped |= extra
+            logging.warning(f"Sheet {sheet_name}: columns {sorted(extra)} are not in the streamed report.")
+        if self.fmt == "xlsx":
+            for row in rows:
+                stream.append([_cell_value(row.get(column)) for column in columns])
+        else:
+            stream.write_many(rows)
+
+    def _open(self, sheet_name, columns):
+        if self.fmt == "xlsx":
+            if self._workbook is None:
+                from openpyxl import Workbook
+
+                self._workbook = Workbook(write_only=True)
+            sheet = self._workbook.create_sheet(excel_sheet_title(sheet_name))
+            sheet.columns = columns
+            sheet.append(columns)
+            return sheet
+        suffix = f".part-{self.part}" if self.part is not None else ""
+        file_name = f"{sheet_name.replace(os.sep, '_')}{suffix}.{self.fmt}"
+        return RowStream(os.path.join(self.path, file_name), columns, fmt=self.fmt, row_group_size=self.buffer_rows)
+
+    def flush(self):
+        """Write out the rows buffered for every sheet."""
+        for sheet_name in list(self.buffers):
+            self._write(sheet_name)
+
+    def close(self):
+        """Write the remaining rows and close every file (saves the xlsx workbook)."""
+        self.flush()
+        if self.fmt == "xlsx":
+            if self._workbook is not None:
+                os.makedirs(self.directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=self.directory)
+                os.close(fd)
+                try:
+                    self._workbook.save(tmp_path)
+                    os.replace(tmp_path, self.path)
+                except Exception:
+                    os.remove(tmp_path)
+                    raise
+        else:
+            for stream in self.streams.values():
+                stream.close()
+        if self.streams:
+            logging.info(f"Streamed test results saved to {self.path}")
+        self.streams = {}
+        self._workbook = None
@@ -1,21 +1,282 @@
 import os
-import pandas as pd
+import json
+import time
+import shutil
+import logging
+import tempfile
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.firefox import GeckoDriverManager
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.firefox.service import Service as FirefoxService
 
+from instrumentation import TRACER
+from network_log import enable_network_log
+
+
+try:
+    import fcntl
+except ImportError:  # Windows: profile slots fall back to one directory per process
+    fcntl = None
+
 
 load_dotenv()
 # CHROME_DRIVER_PATH = os.getenv("CHROME_DRIVER_PATH")
 # FIREFOX_DRIVER_PATH = os.getenv("FIREFOX_DRIVER_PATH")
 
+# Resolved driver binaries and reusable browser profiles live here between runs
+CACHE_DIR = os.path.expanduser(os.getenv("DRIVER_CACHE_DIR", "~/.cache/assignment-7"))
+
+# Parallel sessions on one machine; beyond this, sessions start from a throwaway profile
+MAX_PROFILE_SLOTS = 16
+
+# Site state inside a reused profile (relative paths; Chrome keeps it under Default/). It is
+# removed before each session starts, so only the caches survive and no cookie or stored
+# setting (e.g. a selected currency) leaks from one audit into the next.
+PROFILE_STATE_PATHS = {
+    "chrome": [
+        os.path.join("Default", name) for name in (
+            "Cookies", "Cookies-journal", os.path.join("Network", "Cookies"),
+            os.path.join("Network", "Cookies-journal"), "Local Storage", "Session Storage",
+            "IndexedDB", "Service Worker", "Sessions", "Current Session", "Current Tabs",
+            "Last Session", "Last Tabs", "Web Data", "Web Data-journal",
+        )
+    ],
+    "firefox": [
+        "cookies.sqlite", "cookies.sqlite-wal", "webappsstore.sqlite", "webappsstore.sqlite-wal",
+        "storage", "sessionstore.jsonlz4", "sessionstore-backups", "formhistory.sqlite",
+    ],
+}
+
+# Storage of an origin cleared by clear_site_state; the HTTP cache is kept
+SITE_STORAGE_TYPES = "cookies,local_storage,session_storage,indexeddb,websql,service_workers,cache_storage"
+
+DRIVERS = {
+    "chrome": {"env": "CHROME_DRIVER_PATH", "binary": "chromedriver"},
+    "firefox": {"env": "FIREFOX_DRIVER_PATH", "binary": "geckodriver"},
+}
+
+
+# Page-load profiles, from the cheapest to the most complete. "lean" returns as soon as the
+# DOM is ready (eager page-load strategy) and blocks resources that DOM-only checks never
+# need; "full" waits for the load event with every resource, like a regular visit.
+PAGE_LOAD_PROFILES = ("lean", "full")
+
+# URL patterns (Network.setBlockedURLs syntax) blocked by the lean profile
+LEAN_BLOCKED_URLS = [
+    # Web fonts
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    # Analytics, tag managers, ads and tracking pixels
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*adservice.google.*", "*connect.facebook.net*", "*facebook.com/tr*", "*hotjar.com*",
+    "*clarity.ms*", "*bat.bing.com*", "*criteo.*", "*taboola.com*", "*outbrain.com*",
+]
+
+# Additionally blocked by the lean profile when images are disabled
+IMAGE_BLOCKED_URLS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico"]
+
+
+def covers_profile(loaded, requested):
+    """Return True if a page loaded with the `loaded` profile satisfies a check needing `requested`."""
+    return PAGE_LOAD_PROFILES.index(loaded) >= PAGE_LOAD_PROFILES.index(requested)
+
+
+def _enable_lean_loading(driver, block_images):
+    """Remember the lean profile settings of `driver` (created with the eager page-load strategy)."""
+    driver.lean_loading = True
+    driver.page_load_profile = None
+    driver.lean_blocked_urls = LEAN_BLOCKED_URLS + (IMAGE_BLOCKED_URLS if block_images else [])
+    if hasattr(driver, "execute_cdp_cmd"):
+        driver.execute_cdp_cmd("Network.enable", {})
+
+
+def apply_page_load_profile(driver, profile):
+    """
+    Prepare `driver` to load the next page with the given profile.
+
+    Drivers created without lean loading (and the static engine) always load fully, so the
+    call returns "full" for them. URL blocking needs the DevTools protocol (Chrome); Firefox
+    only gets the eager page-load strategy.
+
+    Args:
+        driver (webdriver): Selenium WebDriver instance.
+        profile (str): "lean" or "full".
+
+    Returns:
+        str: Profile the next page load will actually use.
+    """
+    if not getattr(driver, "lean_loading", False):
+        return "full"
+    if driver.page_load_profile != profile:
+        if hasattr(driver, "execute_cdp_cmd"):
+            blocked = driver.lean_blocked_urls if profile == "lean" else []
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked})
+        driver.page_load_profile = profile
+    return profile
+
+
+def _driver_cache_file():
+    return os.path.join(CACHE_DIR, "drivers.json")
+
+
+def _read_driver_cache():
+    try:
+        with open(_driver_cache_file(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_driver_cache(browser, path):
+    cache = _read_driver_cache()
+    cache[browser] = path
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(_driver_cache_file(), "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+
+
+def resolve_driver_path(browser):
+    """
+    Find the driver executable for `browser` without a network lookup whenever possible.
+
+    Resolution order: the CHROME_DRIVER_PATH / FIREFOX_DRIVER_PATH environment variable,
+    the binary on PATH, the path cached by a previous run, and finally webdriver-manager
+    (whose result is cached for the next run).
+
+    Args:
+        browser (str): "chrome" or "firefox".
+
+    Returns:
+        tuple: (driver path, source of the path).
+    """
+    spec = DRIVERS[browser]
+
+    path = os.getenv(spec["env"])
+    if path and os.path.isfile(path):
+        return path, spec["env"]
+
+    path = shutil.which(spec["binary"])
+    if path:
+        return path, "PATH"
+
+    path = _read_driver_cache().get(browser)
+    if path and os.path.isfile(path):
+        return path, "cache"
+
+    # webdriver-manager is only imported when it is actually needed (a cold machine)
+    if browser == "chrome":
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+    else:
+        from webdriver_manager.firefox import GeckoDriverManager
+        path = GeckoDriverManager().install()
+    _write_driver_cache(browser, path)
+    return path, "webdriver-manager"
+
+
+class _TemporaryProfile:
+    """Stands in for the slot lock of a throwaway profile; close() removes the directory."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def close(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def clear_profile_state(path, browser):
+    """Remove the cookies, site storage and saved sessions of a reused profile, keeping its caches."""
+    for relative in PROFILE_STATE_PATHS[browser]:
+        target = os.path.join(path, relative)
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        elif os.path.exists(target):
+            os.remove(target)
+
+
+def acquire_profile_dir(browser):
+    """
+    Reserve a reusable profile directory for a new browser session.
+
+    Profiles are kept between runs so the browser starts with a warm disk cache; their
+    cookies and site storage are cleared first (see PROFILE_STATE_PATHS), so results do not
+    depend on earlier audits. A browser cannot share its profile with another running
+    instance, so parallel sessions each take one of MAX_PROFILE_SLOTS numbered slots, guarded
+    by an exclusive lock held for the life of the session. When every slot is taken the
+    session gets a throwaway profile instead.
+
+    Args:
+        browser (str): "chrome" or "firefox".
+
+    Returns:
+        tuple: (profile directory, lock (closed by quit_driver) or None, True if the profile was warm).
+    """
+    root = os.path.join(CACHE_DIR, "profiles")
+    os.makedirs(root, exist_ok=True)
 
-def get_chrome_driver(headless=False):
+    if fcntl is None:
+        path = os.path.join(root, f"{browser}-{os.getpid()}")
+        warm = os.path.isdir(path) and bool(os.listdir(path))
+        os.makedirs(path, exist_ok=True)
+        clear_profile_state(path, browser)
+        return path, None, warm
+
+    for slot in range(MAX_PROFILE_SLOTS):
+        path = os.path.join(root, f"{browser}-{slot}")
+        lock = open(f"{path}.lock", "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            continue
+        warm = os.path.isdir(path) and bool(os.listdir(path))
+        os.makedirs(path, exist_ok=True)
+        clear_profile_state(path, browser)
+        return path, lock, warm
+
+    logging.warning(f"All {MAX_PROFILE_SLOTS} {browser} profile slots are in use; starting from a throwaway profile.")
+    path = tempfile.mkdtemp(prefix=f"{browser}-profile-")
+    return path, _TemporaryProfile(path), False
+
+
+def clear_site_state(driver, url):
+    """
+    Clear the cookies and storage `driver` holds for the origin of `url`, keeping the HTTP cache.
+
+    Reused sessions (batch workers, the daemon) call this before each audit, so a setting
+    stored by one audit (e.g. the selected currency) does not change the next one. Needs the
+    DevTools protocol (Chrome); other drivers only have their cookies deleted.
+    """
+    parts = urlsplit(url)
+    if not parts.scheme.startswith("http"):
+        return
+    try:
+        if hasattr(driver, "execute_cdp_cmd"):
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {
+                "origin": f"{parts.scheme}://{parts.netloc}", "storageTypes": SITE_STORAGE_TYPES,
+            })
+        else:
+            driver.delete_all_cookies()
+    except Exception as e:
+        logging.warning(f"Could not clear the site state for {url}: {e}")
+
+
+def _log_startup(driver, browser, started, driver_source, profile_dir, warm):
+    elapsed = time.time() - started
+    state = "no profile" if profile_dir is None else ("warm" if warm else "cold")
+    driver.startup_info = {
+        "browser": browser,
+        "seconds": round(elapsed, 3),
+        "profile": state,
+        "driver_source": driver_source,
+    }
+    logging.info(f"Started {browser} in {elapsed:.2f}s ({state} start, driver from {driver_source}).")
+
+
+def get_chrome_driver(headless=False, reuse_profile=True, page_load="full", block_images=False):
     """Set up and return a Chrome WebDriver."""
+    started = time.time()
     # service = ChromeService(CHROME_DRIVER_PATH)
     options = webdriver.ChromeOptions()
     if headless:
@@ -24,18 +285,36 @@ def get_chrome_driver(headless=False):
         options.add_argument("--disable-dev-shm-usage")  # Prevents /dev/shm issues
         options.add_argument("--disable-gpu")  # Optional: Disable GPU acceleration
         options.add_argument("--window-size=1920,1080")  # Set a large window size for headless mode
-        options.add_argument("--remote-debugging-port=9222")  # Enable remote debugging
+        options.add_argument("--remote-debugging-port=0")  # Enable remote debugging (any free port, so sessions can run in parallel)
+
+    # Record the responses of every page load, so fetched resources need no second request
+    enable_network_log(options)
+    if page_load == "lean":
+        options.page_load_strategy = "eager"  # driver.get returns at DOMContentLoaded
+
+    profile_dir, profile_lock, warm = (None, None, False)
+    if reuse_profile:
+        profile_dir, profile_lock, warm = acquire_profile_dir("chrome")
+        options.add_argument(f"--user-data-dir={profile_dir}")
+
     # driver = webdriver.Chrome(service=service, options=options)
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    driver_path, driver_source = resolve_driver_path("chrome")
+    driver = webdriver.Chrome(service=Service(driver_path), options=options)
+    driver.profile_lock = profile_lock
+    driver.network_log = True
+    if page_load == "lean":
+        _enable_lean_loading(driver, block_images)
     driver.maximize_window()
+    _log_startup(driver, "chrome", started, driver_source, profile_dir, warm)
     return driver
 
 
-def get_firefox_driver(headless=False):
+def get_firefox_driver(headless=False, reuse_profile=True, page_load="full", block_images=False):
     """Set up and return a Firefox WebDriver."""
+    started = time.time()
 
     # Create tmp_dir
-    temp_dir = "~/_tmp"
+    temp_dir = os.path.expanduser("~/_tmp")
     if not os.path.exists(temp_dir):
         os.makedirs(temp_dir)
     os.environ["TMPDIR"] = temp_dir
@@ -47,30 +326,63 @@ def get_firefox_driver(headless=False):
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
         options.add_argument("--window-size=1920,1080") 
+    if page_load == "lean":
+        options.page_load_strategy = "eager"  # driver.get returns at DOMContentLoaded
+
+    profile_dir, profile_lock, warm = (None, None, False)
+    if reuse_profile:
+        profile_dir, profile_lock, warm = acquire_profile_dir("firefox")
+        options.add_argument("-profile")
+        options.add_argument(profile_dir)
+
     # driver = webdriver.Firefox(service=service, options=options)
-    driver = webdriver.Firefox(service=FirefoxService(GeckoDriverManager().install()), options=options)
+    driver_path, driver_source = resolve_driver_path("firefox")
+    driver = webdriver.Firefox(service=FirefoxService(driver_path), options=options)
+    driver.profile_lock = profile_lock
+    if page_load == "lean":
+        _enable_lean_loading(driver, block_images)
     driver.maximize_window()
+    _log_startup(driver, "firefox", started, driver_source, profile_dir, warm)
     return driver
 
 
-def setup_driver(browser="chrome", headless=False):
+def quit_driver(driver):
+    """Quit `driver` and release its profile slot so another session can reuse it (or remove its throwaway profile)."""
+    try:
+        driver.quit()
+    finally:
+        lock = getattr(driver, "profile_lock", None)
+        if lock is not None:
+            lock.close()
+
+
+def setup_driver(browser="chrome", headless=False, reuse_profile=True, page_load="full", block_images=False):
     """
     Set up the WebDriver based on the specified browser.
 
     Args:
         browser (str): Browser to use ("chrome" or "firefox").
+        headless (bool): Run the browser without a window.
+        reuse_profile (bool): Start from the warm profile kept between runs.
+        page_load (str): "full" loads every page completely; "lean" lets checks that only read
+            the DOM load pages with the lean profile (see PAGE_LOAD_PROFILES).
+        block_images (bool): With page_load="lean", also block image downloads.
 
     Returns:
         WebDriver: Selenium WebDriver instance.
     """
+    if page_load not in PAGE_LOAD_PROFILES:
+        raise ValueError(f"Unsupported page-load profile: {page_load}. Use 'lean' or 'full'.")
     if browser.lower() == "chrome":
-        return get_chrome_driver(headless)
+        return TRACER.instrument_driver(get_chrome_driver(headless, reuse_profile, page_load, block_images))
     elif browser.lower() == "firefox":
-        return get_firefox_driver(headless)
+        return TRACER.instrument_driver(get_firefox_driver(headless, reuse_profile, page_load, block_images))
     else:
         raise ValueError(f"Unsupported browser: {browser}. Use 'chrome' or 'firefox'.")
 
 def save_report(test_results):
+    import pandas as pd
+
     # Define the directory and file path for the Excel report
     directory = "reports"
     file_path = os.path.join(directory, "test_report.xlsx")
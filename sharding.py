@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import argparse
+import tempfile
+
+from records import as_table
+from link_checker import normalize_url
+from report import ReportSink, REPORT_FORMATS, read_report, output_format
+from utils import save_result, report_sink
+
+
+SHARD_DIRECTORY = os.path.join("reports", "shards")
+
+
+def parse_shard(spec):
+    """
+    Parse a shard specification "i/N" (0 <= i < N).
+
+    Args:
+        spec (str): Shard specification, e.g. "2/4".
+
+    Returns:
+        tuple: (index, count).
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard: {spec}. Use 'i/N', e.g. '0/4'.")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard: {spec}. The index must be between 0 and N-1.")
+    return index, count
+
+
+def shard_from_env():
+    """Return the (index, count) set by the SHARD ("i/N") or SHARD_INDEX/SHARD_COUNT variables, or None."""
+    if os.getenv("SHARD"):
+        return parse_shard(os.getenv("SHARD"))
+    if os.getenv("SHARD_INDEX") and os.getenv("SHARD_COUNT"):
+        return parse_shard(f"{os.getenv('SHARD_INDEX')}/{os.getenv('SHARD_COUNT')}")
+    return None
+
+
+def shard_of(url, count):
+    """
+    Return the shard a URL belongs to.
+
+    The shard only depends on the (normalized) URL itself, so every machine computes the same
+    assignment from its own copy of the list, and adding URLs never moves existing ones.
+    """
+    digest = hashlib.blake2b(normalize_url(url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def select_shard(urls, index, count):
+    """Return the URLs of shard `index` out of `count`, in their original order."""
+    return [url for url in urls if shard_of(url, count) == index]
+
+
+def shard_name(index, count):
+    return f"shard-{index}-of-{count}"
+
+
+def _manifest_path(directory, index, count):
+    return os.path.join(directory, f"{shard_name(index, count)}.json")
+
+
+def write_manifest(index, count, urls, results=None, fmt="xlsx", error=None, directory=SHARD_DIRECTORY):
+    """
+    Record the outcome of a shard run next to its report, for merge_shards.
+
+    Args:
+        index (int): Shard index.
+        count (int): Number of shards.
+        urls (list): URLs assigned to the shard.
+        results (dict | None): Merged batch results (sheet name mapped to DataFrame).
+        fmt (str): Format the shard report was written in.
+        error (str | None): Error that aborted the run, if any.
+        directory (str): Directory of the shard reports.
+    """
+    summary = (results or {}).get("Batch Summary")
+    failed = 0 if summary is None else as_table(summary).count("result", "Fail")
+    manifest = {
+        "shard": index,
+        "count": count,
+        "status": "failed" if error else "finished",
+        "error": error,
+        "urls": len(urls),
+        "audited": 0 if summary is None else len(summary),
+        "failed_urls": failed,
+        "report": ReportSink(fmt=fmt, directory=directory, name=shard_name(index, count)).path,
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    os.makedirs(directory, exist_ok=True)
+    # Written atomically, so a half-written manifest never looks like a finished shard
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json.tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, _manifest_path(directory, index, count))
+    logging.info(f"Shard {index}/{count} manifest saved ({manifest['status']}).")
+
+
+def merge_shards(count, directory=SHARD_DIRECTORY):
+    """
+    Combine the reports of all shards into one DataFrame per sheet.
+
+    A page audited by more than one shard (e.g. when the machines ran with different URL
+    lists) is kept only from the lowest shard. A 'Shard Summary' sheet lists every shard
+    with its status: finished, failed (aborted run or unreadable report) or missing.
+
+    Args:
+        count (int): Number of shards.
+        directory (str): Directory of the shard reports and manifests.
+
+    Returns:
+        dict: Sheet name mapped to the merged DataFrame.
+    """
+    import pandas as pd
+
+    frames = {}
+    summary = []
+    claimed = set()
+    for index in range(count):
+        row = {"shard": index, "result": "Fail", "comments": "", "urls": None, "audited": None,
+               "failed_urls": None, "duplicates": 0}
+        summary.append(row)
+        path = _manifest_path(directory, index, count)
+        if not os.path.exists(path):
+            row["comments"] = "Missing: no manifest found"
+            logging.warning(f"Shard {index}/{count} is missing.")
+            continue
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        row.update({key: manifest[key] for key in ("urls", "audited", "failed_urls")})
+        if manifest["status"] != "finished":
+            row["comments"] = f"Failed: {manifest['error']}"
+            logging.warning(f"Shard {index}/{count} failed: {manifest['error']}")
+        try:
+            # A shard without any URL assigned writes no report
+            sheets = read_report(manifest["report"]) if manifest["audited"] else {}
+        except (OSError, ValueError) as e:
+            row["comments"] = f"Failed: report unreadable ({e})"
+            logging.warning(f"Shard {index}/{count} report could not be read: {e}")
+            continue
+
+        # Pages this shard audited that no earlier shard already reported
+        pages = set(sheets["Batch Summary"]["page_url"]) if "Batch Summary" in sheets else set()
+        duplicates = pages & claimed
+        claimed |= pages
+        row["duplicates"] = len(duplicates)
+        if duplicates:
+            logging.warning(f"Shard {index}/{count}: {len(duplicates)} page(s) already reported by another shard.")
+        for name, df in sheets.items():
+            if duplicates and "page_url" in df.columns:
+                df = df[~df["page_url"].isin(duplicates)]
+            frames.setdefault(name, []).append(df)
+
+        if manifest["status"] == "finished":
+            row["result"] = "Pass" if not manifest["failed_urls"] else "Fail"
+            row["comments"] = f"{manifest['failed_urls']} page(s) failed" if manifest["failed_urls"] else "Finished"
+
+    merged = {name: pd.concat(dfs, ignore_index=True) for name, dfs in frames.items()}
+    merged["Shard Summary"] = pd.DataFrame(summary)
+    return merged
+
+
+def main():
+    """Entry point for merging the reports of a sharded batch run."""
+    parser = argparse.ArgumentParser(description="Merge the per-shard reports of a sharded batch.py run.")
+    parser.add_argument("--count", type=int, required=True, help="Number of shards the URL list was split into.")
+    parser.add_argument("--dir", type=str, default=SHARD_DIRECTORY,
+                        help=f"Directory of the shard reports (default: {SHARD_DIRECTORY}).")
+    parser.add_argument("--report-format", type=output_format, choices=REPORT_FORMATS, default="xlsx",
+                        help="Format of the merged report (default: xlsx, reports/test_report.xlsx).")
+    args = parser.parse_args()
+
+    merged = merge_shards(args.count, args.dir)
+    with report_sink(fmt=args.report_format):
+        for name, df in merged.items():
+            save_result(df, name)
+
+    incomplete = merged["Shard Summary"]["comments"].str.startswith(("Missing", "Failed")).sum()
+    if incomplete:
+        logging.warning(f"{incomplete} of {args.count} shard(s) are missing or failed.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
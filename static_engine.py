@@ -0,0 +1,147 @@
+import time
+import logging
+import lxml.html
+from urllib.parse import urljoin
+from selenium.webdriver.common.by import By
+
+from records import ResultTable, as_table
+from link_checker import build_session
+from page_session import PageSnapshot
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/131.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml",
+}
+
+# Attributes that WebElement.get_attribute returns as absolute URLs
+URL_ATTRIBUTES = ("href", "src")
+
+
+class StaticDriver:
+    """
+    Browserless stand-in for a WebDriver, for checks that only need the server-rendered HTML.
+
+    Pages are fetched over a pooled keep-alive HTTP session and parsed with lxml. Only the
+    subset of the WebDriver API used by the DOM-only checks is provided (get, page_source,
+    current_url, find_elements, quit); anything that needs JavaScript raises
+    NotImplementedError, so those checks must keep running in a real browser.
+    """
+
+    is_static = True
+
+    def __init__(self, timeout=15, session=None):
+        self.timeout = timeout
+        self.http = session or build_session()
+        self.http.headers.update(DEFAULT_HEADERS)
+        self.current_url = None
+        self.page_source = ""
+        self.document = None
+        self.status_code = None
+
+    def get(self, url):
+        """Fetch and parse `url`, like WebDriver.get."""
+        response = self.http.get(url, timeout=self.timeout)
+        self.status_code = response.status_code
+        self.current_url = response.url
+        self.page_source = response.text
+        self.document = lxml.html.fromstring(response.content, base_url=response.url)
+        # Honour <base href> the same way a browser resolves relative URLs
+        base = self.document.find(".//base[@href]")
+        if base is not None:
+            self.document.base_url = urljoin(response.url, base.get("href"))
+
+    @property
+    def title(self):
+        element = self.document.find(".//title") if self.document is not None else None
+        return element.text_content().strip() if element is not None else ""
+
+    def find_elements(self, by, value):
+        """Return the parsed elements matching a TAG_NAME or CSS_SELECTOR locator."""
+        if by == By.TAG_NAME:
+            return list(self.document.iter(value))
+        if by == By.CSS_SELECTOR:
+            return self.document.cssselect(value)
+        raise NotImplementedError(f"Locator '{by}' is not supported by the static engine.")
+
+    def extract(self, selector, attributes=(), text=False, children=None, root=None, tag=False):
+        """Static counterpart of dom_extract.bulk_extract."""
+        scope = root if root is not None else self.document
+        rows = []
+        for element in scope.cssselect(selector):
+            row = {}
+            for name in attributes:
+                value = element.get(name)
+                if value is not None and name in URL_ATTRIBUTES:
+                    value = urljoin(self.document.base_url, value.strip())
+                row[name] = value
+            if text:
+                row["text"] = element.text_content().strip()
+            if tag:
+                row["tag"] = element.tag.lower()
+            for key, child_selector in (children or {}).items():
+                child = element.cssselect(child_selector)
+                row[key] = child[0].text_content().strip() if child else None
+            rows.append(row)
+        return rows
+
+    def snapshot(self, url):
+        """Fetch `url` and return it as a PageSnapshot (ScriptData is not available)."""
+        started = time.time()
+        logging.info(f"Fetching {url} (static engine)")
+        self.get(url)
+        snapshot = PageSnapshot(
+            url=url,
+            current_url=self.current_url,
+            html=self.page_source,
+            script_data=None,
+            loaded_at=started,
+            load_time=time.time() - started,
+        )
+        logging.info(f"Page fetched in {snapshot.load_time:.2f}s: {url}")
+        return snapshot
+
+    def execute_script(self, script, *args):
+        raise NotImplementedError("JavaScript is not available in the static engine.")
+
+    def quit(self):
+        self.http.close()
+
+
+def compare_results(browser_results, static_results):
+    """
+    Compare the results of the same checks run in the browser and in the static engine.
+
+    A check is reported as 'Fail' when the two engines produced different rows, which
+    usually means client-side rendering changes what the check sees.
+
+    Args:
+        browser_results (dict): Check name mapped to the ResultTable from the browser engine.
+        static_results (dict): Check name mapped to the ResultTable from the static engine.
+
+    Returns:
+        ResultTable: One row per check with columns 'check', 'result' and 'comments'.
+    """
+    rows = []
+    for name, browser_df in browser_results.items():
+        if name not in static_results:
+            continue
+        browser_rows = {tuple(map(str, row)) for row in as_table(browser_df).rows()}
+        static_rows = {tuple(map(str, row)) for row in as_table(static_results[name]).rows()}
+        only_browser = len(browser_rows - static_rows)
+        only_static = len(static_rows - browser_rows)
+        if only_browser or only_static:
+            result = "Fail"
+            comments = (
+                f"Engines differ: {only_browser} row(s) only in the browser, "
+                f"{only_static} row(s) only in the static HTML."
+            )
+            logging.warning(f"{name}: {comments}")
+        else:
+            result = "Pass"
+            comments = f"Both engines produced the same {len(browser_df)} row(s)."
+        rows.append({"check": name, "result": result, "comments": comments})
+    return ResultTable.from_records(rows)
@@ -1,33 +1,180 @@
 import os
 import argparse
 import logging
+from contextlib import nullcontext
 from selenium.webdriver.support import expected_conditions as EC
 
-from setup import setup_driver
-from utils import save_result
+from setup import setup_driver, quit_driver, clear_site_state
+from utils import (
+    save_result, report_sink, collect_results, stream_report, stream_tap, streaming, DEFAULT_STREAM_BUFFER,
+)
+from report import REPORT_FORMATS, output_format
+from records import ResultTable
+from page_session import PageSession
+from static_engine import StaticDriver, compare_results
+from instrumentation import TRACER, span
+from fingerprint import FingerprintStore, DEFAULT_FINGERPRINT_PATH, run_incremental
+from link_cache import LinkStatusCache, DEFAULT_CACHE_PATH
+from link_checker import build_session
+from history import HistoryStore, DEFAULT_HISTORY_PATH, new_run_id
+from replay import ReplayServer, DEFAULT_REPLAY_PORT
+from log_pipeline import setup_logging, log_context, set_run_id
 from test_h1_tag_existence import test_h1_tag_existence
 from test_html_sequence import test_html_sequence
 from test_image_alt import test_image_alt
 from test_url_status import test_url_status
+from test_resource_status import test_resource_status
 from test_currency_filter import test_currency_filter
-from extract_script_data import extract_script_data
+from extract_script_data import extract_script_data, load_schema
 
 
-logging.basicConfig(
-    level=logging.INFO,  # Set the minimum logging level
-    format="%(asctime)s - %(levelname)s - %(message)s",  # Log message format
-    handlers=[
-        logging.FileHandler("automation_test.log"),  # Log to a file
-        logging.StreamHandler()  # Log to the console
-    ]
-)
+# Console, automation_test.log and automation_test.jsonl, written by a background thread
+setup_logging()
 
-# Main Execution
-def main():
-    """Main function to parse arguments and execute tests."""
+# Checks run in this order. Read-only checks share one page load through the
+# PageSession; checks that mutate the page go last and navigate on their own.
+TESTS = [
+    ("H1 Tag Test", test_h1_tag_existence),
+    ("HTML Sequence Test", test_html_sequence),
+    ("Image Alt Test", test_image_alt),
+    ("URL Status Code Test", test_url_status),
+    ("Resource Status Test", test_resource_status),
+    ("Scrape data from script data", extract_script_data),
+    ("Currency Filter Test", test_currency_filter),
+]
+
+# Checks that need JavaScript (or the browser's network log) and therefore always run in the browser
+BROWSER_ONLY_TESTS = {"Scrape data from script data", "Currency Filter Test", "Resource Status Test"}
+
+# Read-only checks that need the full page-load profile (see setup.PAGE_LOAD_PROFILES). They get
+# their own fully loaded page, so the DOM-only checks still share the lean load.
+FULL_LOAD_TESTS = {"Resource Status Test"}
+
+# Checks left out of a default audit. A full-load check costs a second navigation of every page,
+# so it only runs when asked for (--resource-status, or by name in daemon jobs).
+OPT_IN_TESTS = {"Resource Status Test"}
+
+
+def default_tests(args=None):
+    """Return the TESTS entries an audit runs by default, with the opt-in checks enabled in `args`."""
+    enabled = {"Resource Status Test"} if getattr(args, "resource_status", False) else set()
+    return [(name, test) for name, test in TESTS if name not in OPT_IN_TESTS or name in enabled]
+
+ENGINES = ("browser", "static", "compare")
+
+
+def run_audit(driver, url, tests=None, check_options=None, engine="browser", static_driver=None,
+              fingerprints=None, force=False, history=None):
+    """
+    Run the given checks against a single URL, loading the page only once for read-only checks.
+
+    Args:
+        driver (webdriver): Selenium WebDriver instance.
+        url (str): URL of the page to test.
+        tests (list | None): (name, check function) pairs to execute (default: default_tests()).
+        check_options (dict): Optional extra keyword arguments per check name.
+        engine (str): "browser" runs every check in the browser; "static" runs DOM-only checks
+            on the fetched HTML without the browser; "compare" runs DOM-only checks on both
+            engines and adds an 'Engine Comparison' sheet.
+        static_driver (StaticDriver | None): Static engine to use (created if needed).
+        fingerprints (FingerprintStore | None): When given, a read-only check whose page inputs
+            are unchanged since the last run reuses its previous result (incremental re-audit).
+        force (bool): With `fingerprints`, run every check anyway and refresh the store.
+        history (HistoryStore | None): When given, every result row is appended to the history
+            of the store's current run.
+
+    Inside utils.stream_results the rows are written while the checks produce them and each
+    check returns a summary (see utils.save_rows); incremental re-audit, which stores whole
+    results, is then not used.
+
+    Returns:
+        dict: Check name mapped to the ResultTable returned by that check.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unsupported engine: {engine}. Use one of {', '.join(ENGINES)}.")
+    check_options = check_options or {}
+    tests = default_tests() if tests is None else tests
+    if engine != "browser" and static_driver is None:
+        static_driver = StaticDriver()
+
+    # The full session only navigates when an opt-in full-load check is run
+    session = PageSession(driver, profile="lean")
+    full_session = PageSession(driver, profile="full")
+    static_session = PageSession(static_driver) if static_driver else None
+    results = {}
+    static_results = {}
+    if fingerprints is not None and engine == "compare":
+        logging.warning("Incremental re-audit is not used in compare mode; running every check.")
+        fingerprints = None
+    stream = streaming()
+    if stream and engine == "compare":
+        raise ValueError("The compare engine needs whole results and cannot stream them.")
+    if fingerprints is not None and stream:
+        logging.warning("Incremental re-audit is not used with streamed results; running every check.")
+        fingerprints = None
 
+    recorded = {}
+
+    def record_rows(sheet_name, rows):
+        # Streamed rows reach the history chunk by chunk; as with whole results only the check's
+        # own sheet (the first one it saves) is recorded, not side sheets such as the cache stats
+        if recorded.setdefault(name, sheet_name) == sheet_name:
+            history.append(url, name, ResultTable.from_records(rows))
+
+    # Sessions are reused across pages and jobs: start every audit without the site's cookies and storage
+    if driver is not None and not getattr(driver, "is_static", False):
+        clear_site_state(driver, url)
+
+    # Every record logged while auditing the page carries its URL (and the check name)
+    with log_context(url=url):
+        for name, test in tests:
+            options = check_options.get(name, {})
+            tap = stream_tap(record_rows) if history is not None else nullcontext()
+            with span(name, "check", url=url), TRACER.profile(name), log_context(check=name), tap:
+                if engine != "compare":
+                    if name in FULL_LOAD_TESTS:
+                        check_driver, check_session = driver, full_session
+                    elif engine == "browser" or name in BROWSER_ONLY_TESTS:
+                        check_driver, check_session = driver, session
+                    else:
+                        check_driver, check_session = static_driver, static_session
+
+                    def run_check():
+                        return test(check_driver, url, session=check_session, **options)
+
+                    if fingerprints is not None and name != "Currency Filter Test":
+                        snapshot = check_session.open(url)
+                        results[name] = run_incremental(
+                            fingerprints, name, url, snapshot, run_check, force, options=options,
+                        )
+                    else:
+                        results[name] = run_check()
+                else:
+                    browser_session = full_session if name in FULL_LOAD_TESTS else session
+                    results[name] = test(driver, url, session=browser_session, **options)
+                    if name not in BROWSER_ONLY_TESTS:
+                        # The static run is only used for the comparison, not saved over the browser results
+                        with collect_results():
+                            static_results[name] = test(static_driver, url, session=static_session, **options)
+
+            if history is not None and not stream:
+                history.append(url, name, results[name])
+
+        if engine == "compare":
+            save_result(compare_results(results, static_results), "Engine Comparison")
+        navigations = session.navigations + full_session.navigations
+        logging.info(f"Audit of {url} finished with {navigations} browser page load(s).")
+        return results
+
+
+def add_common_arguments(parser):
+    """
+    Add the browser and link checker arguments shared by every entry point.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to extend.
+    """
     # Browser argument
-    parser = argparse.ArgumentParser(description="Run browser-based automation tests.")
     parser.add_argument(
         "--browser",
         type=str,
@@ -42,33 +189,302 @@ def main():
         help="Run the tests in headless mode."
     )
 
+    # Page-load profile arguments
+    parser.add_argument(
+        "--page-load",
+        type=str,
+        choices=("lean", "full"),
+        default="lean",
+        help="'lean' (default) loads pages for DOM-only checks at DOMContentLoaded with fonts, analytics "
+             "and ads blocked; 'full' waits for every resource. Checks that need it always load fully."
+    )
+    parser.add_argument(
+        "--resource-status",
+        action="store_true",
+        help="Also run the Resource Status Test, which loads every page a second time with the full profile."
+    )
+    parser.add_argument(
+        "--block-images",
+        action="store_true",
+        help="With --page-load lean, also block image downloads for DOM-only checks."
+    )
+
+    # Profile argument
+    parser.add_argument(
+        "--fresh-profile",
+        action="store_true",
+        help="Start the browser with a throwaway profile instead of the warm one kept between runs."
+    )
+
+    # Engine argument
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=ENGINES,
+        default="browser",
+        help="'browser' (default) runs every check in the browser; 'static' runs DOM-only checks on "
+             "the fetched HTML without a browser; 'compare' runs them on both and reports differences."
+    )
+
+    # Instrumentation arguments
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        help="Record timing spans, WebDriver commands and HTTP requests and write them to this directory "
+             "(trace.json summary and trace.chrome.json for chrome://tracing)."
+    )
+    parser.add_argument(
+        "--profile-checks",
+        type=str,
+        default=None,
+        help="Run every check under cProfile and write one .prof file per check to this directory."
+    )
+
+    # Incremental re-audit arguments
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse the previous result of a check when the page content it depends on has not changed."
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="With --incremental, run every check anyway and refresh the stored fingerprints."
+    )
+    parser.add_argument(
+        "--history",
+        type=str,
+        default=DEFAULT_HISTORY_PATH,
+        help=f"Path of the append-only results history, queried with history.py (default: {DEFAULT_HISTORY_PATH})."
+    )
+    parser.add_argument(
+        "--no-history",
+        action="store_true",
+        help="Do not record the results in the history store."
+    )
+    parser.add_argument(
+        "--fingerprints",
+        type=str,
+        default=DEFAULT_FINGERPRINT_PATH,
+        help=f"Path of the content fingerprint store (default: {DEFAULT_FINGERPRINT_PATH})."
+    )
+
+    # Report argument
+    parser.add_argument(
+        "--report-format",
+        type=output_format,
+        choices=REPORT_FORMATS,
+        default="xlsx",
+        help="Report output: 'xlsx' (default, reports/test_report.xlsx), or one 'csv'/'parquet' file per sheet."
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write result rows while the checks produce them instead of keeping whole sheets in memory. "
+             "With csv the rows written before a crash are kept."
+    )
+    parser.add_argument(
+        "--stream-buffer",
+        type=int,
+        default=DEFAULT_STREAM_BUFFER,
+        help=f"With --stream, rows buffered per sheet before they are written (default: {DEFAULT_STREAM_BUFFER})."
+    )
+
+    # Currency filter arguments
+    parser.add_argument(
+        "--currency-mode",
+        type=str,
+        choices=("parallel", "click"),
+        default="parallel",
+        help="'parallel' (default) validates each currency in its own tab; 'click' selects them one by one through the dropdown."
+    )
+    parser.add_argument(
+        "--currency-tabs",
+        type=int,
+        default=8,
+        help="Maximum number of tabs open at once with --currency-mode parallel (default: 8)."
+    )
+
+    # Link checker arguments
+    parser.add_argument(
+        "--link-workers",
+        type=int,
+        default=16,
+        help="Number of concurrent link checks (default: 16)."
+    )
+    parser.add_argument(
+        "--link-per-host",
+        type=int,
+        default=4,
+        help="Maximum concurrent link checks against one host (default: 4)."
+    )
+    parser.add_argument(
+        "--link-budget",
+        type=float,
+        default=None,
+        help="Overall time budget in seconds for checking the links of one page."
+    )
+    parser.add_argument(
+        "--link-cache",
+        type=str,
+        default=DEFAULT_CACHE_PATH,
+        help=f"Path of the persistent link status cache (default: {DEFAULT_CACHE_PATH})."
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        default=None,
+        help="Audit the pages recorded in this archive (see replay.py record) instead of the live site. "
+             "The link cache and the history are not used."
+    )
+    parser.add_argument(
+        "--replay-port",
+        type=int,
+        default=DEFAULT_REPLAY_PORT,
+        help=f"Port of the local replay server (default: {DEFAULT_REPLAY_PORT})."
+    )
+    parser.add_argument(
+        "--script-data-schema",
+        type=str,
+        default=None,
+        help="JSON file mapping each ScriptData report column to its path, e.g. "
+             "{\"SiteURL\": \"config.SiteUrl\"} (default: the built-in fields)."
+    )
+    parser.add_argument(
+        "--no-link-cache",
+        action="store_true",
+        help="Do not read or write the persistent link status cache."
+    )
+    parser.add_argument(
+        "--revalidate-links",
+        action="store_true",
+        help="Ignore cached link results and check every link again (the cache is still refreshed)."
+    )
+
+
+def open_link_cache(args):
+    """Return the LinkStatusCache selected by the command line arguments, or None."""
+    if args.no_link_cache:
+        return None
+    return LinkStatusCache(args.link_cache, revalidate=args.revalidate_links)
+
+
+def open_replay(args):
+    """
+    Start the replay server selected by the command line arguments, or return None.
+
+    Replayed results must not end up in the link cache or the history of the live site, so
+    both are switched off on `args`.
+    """
+    if not args.replay:
+        return None
+    args.no_link_cache = True
+    args.no_history = True
+    return ReplayServer(args.replay, port=args.replay_port).start()
+
+
+def open_history(args, run_id=None):
+    """Return the HistoryStore selected by the command line arguments with a started run, or None."""
+    if args.no_history:
+        return None
+    history = HistoryStore(args.history)
+    history.start_run(run_id)
+    return history
+
+
+def open_http_session(args):
+    """Return a pooled HTTP session for the link checks of a run (or of one worker), sized from `args`."""
+    return build_session(pool_size=max(args.link_workers, args.link_per_host))
+
+
+def build_check_options(args, link_cache=None, http_session=None):
+    """
+    Build the per-check keyword arguments passed to run_audit from the command line arguments.
+
+    Args:
+        args (argparse.Namespace): Parsed arguments (see add_common_arguments).
+        link_cache (LinkStatusCache | None): Shared link status cache.
+        http_session (requests.Session | None): HTTP session reused by the link checks of every
+            page (see open_http_session); each page opens its own when None.
+
+    Returns:
+        dict: Check name mapped to extra keyword arguments.
+    """
+    return {
+        "URL Status Code Test": {
+            "max_workers": args.link_workers,
+            "per_host": args.link_per_host,
+            "budget": args.link_budget,
+            "cache": link_cache,
+            "http_session": http_session,
+        },
+        "Currency Filter Test": {
+            "mode": args.currency_mode,
+            "max_tabs": args.currency_tabs,
+        },
+        "Scrape data from script data": {
+            "schema": load_schema(args.script_data_schema),
+        },
+    }
+
+
+# Main Execution
+def main():
+    """Main function to parse arguments and execute tests."""
+
+    parser = argparse.ArgumentParser(description="Run browser-based automation tests.")
+    add_common_arguments(parser)
     args = parser.parse_args()
 
 
     url = os.getenv("TEST_URL")
-    driver = setup_driver(browser=args.browser, headless=args.headless)
+    replay = open_replay(args)
+    if replay:
+        url = replay.url_for(url or replay.archive.pages[0]["url"])
+    if args.trace or args.profile_checks:
+        TRACER.enable(profile_dir=args.profile_checks)
+    link_cache = open_link_cache(args)
+    http_session = open_http_session(args)
+    fingerprints = FingerprintStore(args.fingerprints) if args.incremental else None
+    history = open_history(args)
+    set_run_id(history.run_id if history else new_run_id())
+    driver = setup_driver(
+        browser=args.browser, headless=args.headless, reuse_profile=not args.fresh_profile,
+        page_load=args.page_load, block_images=args.block_images,
+    )
     # test_results = []
 
     try:
-        # Execute tests
-        tests = [
-            ("H1 Tag Test", test_h1_tag_existence),
-            ("HTML Sequence Test", test_html_sequence),
-            ("Image Alt Test", test_image_alt),
-            ("URL Status Code Test", test_url_status),
-            ("Currency Filter Test", test_currency_filter),
-            ("Scrape data from script data", extract_script_data),
-        ]
-        
-        for name, test in tests:
-            result = test(driver, url)
-            # test_results.append(result)
-            # print(test_results)
-        
+        # Execute tests; the report is written once when all checks are done, or row by row
+        # while they run with --stream
+        if args.stream:
+            results = stream_report(fmt=args.report_format, buffer_rows=args.stream_buffer)
+        else:
+            results = report_sink(fmt=args.report_format)
+        with results:
+            run_audit(
+                driver, url, tests=default_tests(args),
+                check_options=build_check_options(args, link_cache, http_session), engine=args.engine,
+                fingerprints=fingerprints, force=args.full, history=history,
+            )
+
         # Save the report
         # save_report(test_results)
     finally:
-        driver.quit()
+        quit_driver(driver)
+        if replay:
+            replay.stop()
+        http_session.close()
+        if link_cache:
+            logging.info(f"Link cache stats: {link_cache.stats()}")
+            link_cache.close()
+        if fingerprints:
+            fingerprints.close()
+        if history:
+            history.close()
+        if args.trace:
+            TRACER.export(args.trace)
 
 if __name__ == "__main__":
     main()
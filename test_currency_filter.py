@@ -1,42 +1,223 @@
 import logging
-import time
-import pandas as pd
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-from utils import save_result
+from utils import save_result, note_check_error
+from records import ResultTable
+from page_session import load_page
+from dom_extract import bulk_extract
+from waits import scroll_until_stable, wait_for_text_change
 
 
-def test_currency_filter(driver, url):
+# Selector of the price shown in each property tile
+PRICE_SELECTOR = ".js-price-value"  # Adjust class name if necessary
+
+CURRENCY_MODES = ("parallel", "click")
+
+# Selects a currency through the page's own option handler, without opening the dropdown
+SELECT_CURRENCY_JS = """
+var country = arguments[0];
+var option = Array.prototype.find.call(
+    document.querySelectorAll('#js-currency-sort-footer .select-ul > li'),
+    function (li) { return li.dataset.currencyCountry === country; }
+);
+if (!option) { return false; }
+window.scrollTo(0, document.body.scrollHeight);
+option.click();
+return true;
+"""
+
+
+def currency_label(currency):
+    return f"{currency['symbol']} {currency['country']}"
+
+
+def validate_prices(currency, prices):
+    """
+    Build the result row of one currency from the price texts shown after selecting it.
+
+    Args:
+        currency (dict): Currency option with 'country' and 'symbol'.
+        prices (list): Texts of the price tiles.
+
+    Returns:
+        dict: Row with 'currency', 'result' and 'comment'.
+    """
+    if not prices:
+        comment = f"No property tiles found after selecting {currency_label(currency)}."
+        logging.warning(comment, extra={"sample": "currency_failed"})
+        return {"currency": currency_label(currency), "result": "Fail", "comment": comment}
+
+    if not all(currency["symbol"] in price for price in prices):
+        comment = f"Currency symbol {currency_label(currency)} not found in all property tiles."
+        logging.warning(comment, extra={"sample": "currency_failed"})
+        return {"currency": currency_label(currency), "result": "Fail", "comment": comment}
+
+    # If successful
+    comment = f"Currency {currency_label(currency)} validated successfully."
+    logging.info(comment, extra={"sample": "currency_validated"})
+    return {"currency": currency_label(currency), "result": "Pass", "comment": comment}
+
+
+def validate_by_clicking(driver, currency_options):
+    """
+    Select every currency through the dropdown in the current tab, one after another.
+
+    This is the slow path that exercises the real UI interaction.
+
+    Args:
+        driver (webdriver): Selenium WebDriver instance, on the loaded page.
+        currency_options (list): Currency options with 'country' and 'symbol'.
+
+    Returns:
+        list: One result row per currency.
+    """
+    results = []
+
+    # Loop through all currency options and select each one
+    for currency in currency_options:
+        logging.info("Selecting currency: %s -> %s", currency["country"], currency["symbol"],
+                     extra={"sample": "currency_select"})
+
+        # Reopen the dropdown
+        dropdown = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.ID, "js-currency-sort-footer"))
+        )
+        dropdown.click()
+        logging.info("Currency dropdown reopened.")
+
+        # Locate the option based on the country
+        option = next(iter(dropdown.find_elements(
+            By.CSS_SELECTOR, f'.select-ul > li[data-currency-country="{currency["country"]}"]'
+        )), None)
+        if not option:
+            comment = f"Option for {currency['country']} not found."
+            logging.warning(comment)
+            results.append({"currency": currency_label(currency), "result": "Fail", "comment": comment})
+            continue
+
+        # Remember the prices before switching, to detect when they are updated
+        previous_prices = [tile["text"] for tile in bulk_extract(driver, PRICE_SELECTOR, text=True)]
+
+        # Scroll the option into view and click
+        driver.execute_script("arguments[0].scrollIntoView();", option)
+        WebDriverWait(driver, 10).until(EC.element_to_be_clickable(option)).click()
+
+        # Wait until the prices are updated (or already show the selected currency)
+        prices = wait_for_text_change(driver, PRICE_SELECTOR, previous_prices, expected=currency["symbol"])
+        results.append(validate_prices(currency, prices))
+
+    return results
+
+
+def _open_tabs(driver, url, count):
+    """Open `count` new tabs loading `url` concurrently and return their window handles."""
+    existing = set(driver.window_handles)
+    # window.open does not wait for the page load, so all tabs load at the same time
+    for _ in range(count):
+        driver.execute_script("window.open(arguments[0], '_blank');", url)
+    handles = [handle for handle in driver.window_handles if handle not in existing]
+
+    # Popups blocked: fall back to opening (and loading) the tabs one by one
+    while len(handles) < count:
+        driver.switch_to.new_window("tab")
+        driver.get(url)
+        handles.append(driver.current_window_handle)
+    return handles
+
+
+def _wait_until_loaded(driver, timeout=20):
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+
+
+def validate_in_tabs(driver, url, currency_options, max_tabs=8):
+    """
+    Validate currencies concurrently: each currency gets its own tab, selected through the page's
+    option handler, so the price updates of all tabs happen at the same time.
+
+    Args:
+        driver (webdriver): Selenium WebDriver instance.
+        url (str): URL of the page.
+        currency_options (list): Currency options with 'country' and 'symbol'.
+        max_tabs (int): Maximum number of tabs open at once.
+
+    Returns:
+        list: One result row per currency, in the order of `currency_options`.
+    """
+    main_handle = driver.current_window_handle
+    results = []
+
+    for start in range(0, len(currency_options), max_tabs):
+        batch = currency_options[start:start + max_tabs]
+        handles = _open_tabs(driver, url, len(batch))
+        logging.info(f"Validating {len(batch)} currencies in parallel tabs.")
+        try:
+            # First pass: trigger the currency switch in every tab
+            previous = {}
+            for handle, currency in zip(handles, batch):
+                driver.switch_to.window(handle)
+                _wait_until_loaded(driver)
+                # Load the lazy tiles too, so both modes validate the same prices
+                scroll_until_stable(driver)
+                previous[handle] = [tile["text"] for tile in bulk_extract(driver, PRICE_SELECTOR, text=True)]
+                if not driver.execute_script(SELECT_CURRENCY_JS, currency["country"]):
+                    previous[handle] = None
+
+            # Second pass: collect the updated prices, which loaded concurrently in the meantime
+            for handle, currency in zip(handles, batch):
+                if previous[handle] is None:
+                    comment = f"Option for {currency['country']} not found."
+                    logging.warning(comment)
+                    results.append({"currency": currency_label(currency), "result": "Fail", "comment": comment})
+                    continue
+                driver.switch_to.window(handle)
+                prices = wait_for_text_change(driver, PRICE_SELECTOR, previous[handle], expected=currency["symbol"])
+                results.append(validate_prices(currency, prices))
+        finally:
+            for handle in handles:
+                # A tab that crashed must not hide the error that is being raised
+                try:
+                    driver.switch_to.window(handle)
+                    driver.close()
+                except Exception as e:
+                    logging.warning(f"Could not close currency tab {handle}: {e}")
+            driver.switch_to.window(main_handle)
+
+    return results
+
+
+def test_currency_filter(driver, url, session=None, mode="parallel", max_tabs=8):
     """
     Test to validate the currency filter functionality on the page.
 
     Args:
         driver (webdriver): Selenium WebDriver instance.
         url (str): URL of the page to test.
+        session (PageSession): Optional page session shared between checks.
+        mode (str): "parallel" validates currencies concurrently in separate tabs;
+            "click" selects them one by one through the dropdown (slower, exercises the UI).
+        max_tabs (int): Maximum number of tabs open at once in parallel mode.
 
     Returns:
-        DataFrame: Test results as a pandas DataFrame with columns 'currency', 'result', and 'comment'.
+        ResultTable: Test results with columns 'currency', 'result', and 'comment'.
     """
-    logging.info(f"Starting Currency Filter Test for URL: {url}")
+    logging.info(f"Starting Currency Filter Test for URL: {url} ({mode} mode)")
     testcase = "Currency Filter Test"
+    if mode not in CURRENCY_MODES:
+        raise ValueError(f"Unsupported currency mode: {mode}. Use one of {', '.join(CURRENCY_MODES)}.")
 
     try:
-        # Navigate to the page
-        driver.get(url)
-        logging.info("Page loaded successfully.")
-        
-        # Wait for the page to load completely
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        
-        # Scroll to the bottom of the page multiple times to ensure lazy-loaded content is visible
-        for _ in range(3):
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)  # Allow time for any lazy-loaded content to appear
-        
+        # This test changes the page state, so always start from a fresh navigation
+        load_page(driver, url, session, fresh=True, profile="full")
+        if session is not None:
+            session.mark_dirty()
+
+        # Scroll to the bottom until no more lazy-loaded content appears
+        scroll_until_stable(driver)
+
         # Try to find and click the currency dropdown
         dropdown = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.ID, "js-currency-sort-footer"))
@@ -44,77 +225,35 @@ def test_currency_filter(driver, url):
         dropdown.click()
         logging.info("Currency dropdown opened.")
 
-        # Locate the dropdown options
-        options = dropdown.find_elements(By.CSS_SELECTOR, ".select-ul > li")
+        # Read all dropdown options (country and label) in a single round-trip
+        options = bulk_extract(
+            driver, ".select-ul > li", attributes=("data-currency-country",),
+            children={"label": ".option > p"}, root=dropdown,
+        )
         logging.info(f"Found {len(options)} currency options.")
 
         # Parse dropdown options into a structured list
         currency_options = []
         for option in options:
-            data_country = option.get_attribute("data-currency-country")
-            currency_element = option.find_element(By.CSS_SELECTOR, ".option > p")
-            currency_symbol = currency_element.text.split(" ")[0].strip()
+            data_country = option["data-currency-country"]
+            currency_symbol = (option["label"] or "").split(" ")[0].strip()
             currency_options.append({"country": data_country, "symbol": currency_symbol})
-            logging.info(f"Currency option: {data_country} -> {currency_symbol}")
+            logging.info("Currency option: %s -> %s", data_country, currency_symbol, extra={"sample": "currency_option"})
 
         dropdown.click()
         if not currency_options:
             comment = "No currency options found in the dropdown."
             logging.warning(f"{testcase} failed: {comment}")
-            return pd.DataFrame([{"currency": "N/A", "result": "Fail", "comment": comment}])
-
-        # Prepare results
-        results = []
-
-        # Loop through all currency options and select each one
-        for currency in currency_options:
-            logging.info(f"Selecting currency: {currency['country']} -> {currency['symbol']}")
-
-            # Reopen the dropdown
-            dropdown = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "js-currency-sort-footer"))
-            )
-            dropdown.click()
-            logging.info("Currency dropdown reopened.")
-
-            # Locate the option based on the country
-            option = next(
-                (opt for opt in options if opt.get_attribute("data-currency-country") == currency["country"]), None
-            )
-            if not option:
-                comment = f"Option for {currency['country']} not found."
-                logging.warning(comment)
-                results.append({"currency": f"{currency["symbol"]} {currency['country']}", "result": "Fail", "comment": comment})
-                continue
-
-            # Scroll the option into view and click
-            driver.execute_script("arguments[0].scrollIntoView();", option)
-            WebDriverWait(driver, 10).until(EC.element_to_be_clickable(option)).click()
-
-            # Wait a bit for the page to update
-            time.sleep(2)
-
-            # Validate that the currency symbol is displayed in property tiles
-            tiles = driver.find_elements(By.CLASS_NAME, "js-price-value")  # Adjust class name if necessary
-            if not tiles:
-                comment = f"No property tiles found after selecting {currency['symbol']} {currency['country']}."
-                logging.warning(comment)
-                results.append({"currency": f"{currency["symbol"]} {currency['country']}", "result": "Fail", "comment": comment})
-                continue
-            
-            if not all(currency["symbol"] in tile.text for tile in tiles):
-                comment = f"Currency symbol {currency['symbol']} {currency['country']} not found in all property tiles."
-                logging.warning(comment)
-                results.append({"currency": f"{currency["symbol"]} {currency['country']}", "result": "Fail", "comment": comment})
-                continue
-
-            # If successful
-            comment = f"Currency {currency['symbol']} {currency['country']} validated successfully."
-            logging.info(comment)
-            results.append({"currency": f"{currency["symbol"]} {currency['country']}", "result": "Pass", "comment": comment})
-
-        # Convert results to a DataFrame
-        result_df = pd.DataFrame(results)
+            return ResultTable.from_records([{"currency": "N/A", "result": "Fail", "comment": comment}])
+
+        # Validate every currency, either in parallel tabs or by clicking through the dropdown
+        if mode == "parallel":
+            results = validate_in_tabs(driver, url, currency_options, max_tabs=max_tabs)
+        else:
+            results = validate_by_clicking(driver, currency_options)
+
+        # Convert results to a result table
+        result_df = ResultTable.from_records(results)
 
         print(result_df)
 
@@ -125,6 +264,7 @@ def test_currency_filter(driver, url):
 
     except Exception as e:
         logging.error(f"Error during Currency Filter Test: {str(e)}", exc_info=True)
-        error_result = pd.DataFrame([{"currency": "N/A", "result": "Fail", "comment": str(e)}])
+        note_check_error(e)
+        error_result = ResultTable.from_records([{"currency": "N/A", "result": "Fail", "comment": str(e)}])
         save_result(error_result, testcase)
         return error_result
\ No newline at end of file
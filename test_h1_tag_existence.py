@@ -1,24 +1,25 @@
 import logging
-import pandas as pd
 from selenium.webdriver.common.by import By
 
-from utils import save_result
+from utils import save_result, note_check_error
+from records import ResultTable
+from page_session import load_page
 
     
-def test_h1_tag_existence(driver, url):
+def test_h1_tag_existence(driver, url, session=None):
     """
     Test to check the existence of an H1 tag on the page.
 
     Args:
         driver: Selenium WebDriver instance.
         url: URL of the webpage to test.
+        session: Optional PageSession shared between checks.
 
     Returns:
-        DataFrame: Test result as a pandas DataFrame with columns 'testcase', 'result', and 'comments'.
+        ResultTable: Test result with columns 'testcase', 'result', and 'comments'.
     """
     try:
-        logging.info(f"Navigating to {url}")
-        driver.get(url)
+        load_page(driver, url, session)
 
         h1_tags = driver.find_elements(By.TAG_NAME, "h1")
         if not h1_tags:
@@ -28,8 +29,8 @@ def test_h1_tag_existence(driver, url):
             logging.info(f"H1 tag found on page: {url}")
             result = {"testcase": "H1 Tag Existence", "result": "Pass", "comments": "H1 tag exists"}
         
-        # Convert result to DataFrame
-        result_df = pd.DataFrame([result])
+        # Convert result to a result table
+        result_df = ResultTable.from_records([result])
         
         # Save the result
         save_result(result_df, "H1 Tag Existence")
@@ -38,7 +39,8 @@ def test_h1_tag_existence(driver, url):
     
     except Exception as e:
         logging.exception(f"An error occurred during the H1 Tag Existence Test: {str(e)}")
+        note_check_error(e)
         result = {"testcase": "H1 Tag Existence", "result": "Fail", "comments": str(e)}
-        result_df = pd.DataFrame([result])
+        result_df = ResultTable.from_records([result])
         save_result(result_df, "H1 Tag Existence")
         return result_df
\ No newline at end of file
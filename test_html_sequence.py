@@ -1,54 +1,102 @@
 import logging
-import pandas as pd
-from selenium.webdriver.common.by import By
 
-from utils import save_result
+from utils import save_rows, note_check_error
+from page_session import load_page
+from dom_extract import bulk_extract
 
 
-def test_html_sequence(driver, url):
+HEADING_SELECTOR = "h1, h2, h3, h4, h5, h6"
+
+COLUMNS = ("position", "tags", "text", "result", "comments")
+
+
+def iter_outline_rows(headings):
     """
-    Test to check the presence and sequence of HTML header tags (H1 to H6) on the page.
+    Validate a heading outline, yielding the result rows as the headings are read.
+
+    Args:
+        headings (iterable): Dicts with 'tag' ('h1'..'h6') and 'text', in document order.
+
+    Yields:
+        dict: One result row per heading with columns 'position', 'tags', 'text', 'result'
+        and 'comments', plus a page-level row when the page has no H1.
+    """
+    position = 0
+    previous_level = None
+    first_h1 = None
+    for position, heading in enumerate(headings, start=1):
+        level = int(heading["tag"][1])
+        text = " ".join((heading.get("text") or "").split())
+        problems = []
+        if not text:
+            problems.append("Empty heading")
+        if level == 1:
+            if first_h1 is None:
+                first_h1 = position
+            else:
+                problems.append(f"Multiple h1: first h1 at position {first_h1}")
+        # The outline has to open with the h1; after that, going deeper may only add one
+        # level at a time and going back up to any level is fine
+        if previous_level is None and level > 1:
+            problems.append(f"Outline starts at h{level}, expected h1")
+        elif previous_level is not None and level > previous_level + 1:
+            problems.append(f"Skipped level: h{previous_level} -> h{level}")
+        previous_level = level
+
+        yield {
+            "position": position,
+            "tags": heading["tag"],
+            "text": text,
+            "result": "Fail" if problems else "Pass",
+            "comments": "; ".join(problems) if problems else "Valid",
+        }
+
+    if first_h1 is None:
+        comment = "No headings found" if not position else "h1 is missing"
+        yield {"position": None, "tags": "h1", "text": None, "result": "Fail", "comments": comment}
+
+
+def test_html_sequence(driver, url, session=None):
+    """
+    Test to check that the HTML header tags (H1 to H6) form a valid outline.
+
+    All headings are read in document order in a single round-trip. A heading fails when it
+    is empty, when it is a second H1, when it skips a level (e.g. h2 -> h4), or when it is
+    the first heading and not an H1; a page without any H1 fails as well.
 
     Args:
         driver: Selenium WebDriver instance.
         url: URL of the webpage to test.
+        session: Optional PageSession shared between checks.
 
     Returns:
-        DataFrame: Test results as a pandas DataFrame with columns 'tags', 'result', and 'comments'.
+        ResultTable: Test results with columns 'position', 'tags', 'text', 'result', and 'comments'
+        (a summary when the results are streamed, see utils.save_rows).
     """
     logging.info(f"Starting HTML Sequence Test for URL: {url}")
     testcase = "HTML Tag Sequence Test"
 
     try:
-        # Navigate to the URL
-        driver.get(url)
-        logging.info("Page loaded successfully.")
-
-        # Generate tags H1 to H6
-        tags = [f"h{i}" for i in range(1, 7)]
-        logging.debug(f"Generated tag list: {tags}")
-
-        # Find elements for each tag
-        elements = {tag: driver.find_elements(By.TAG_NAME, tag) for tag in tags}
-
-        # Check for missing tags
-        results = []
-        for tag, elems in elements.items():
-            if len(elems) == 0:
-                results.append({"tags": tag, "result": "Fail", "comments": f"{tag} is missing"})
-            else:
-                results.append({"tags": tag, "result": "Pass", "comments": f"{tag} is present"})
+        # Navigate to the URL (or reuse the already loaded page)
+        load_page(driver, url, session)
 
-        # Convert results to a DataFrame
-        result_df = pd.DataFrame(results)
+        # Read every heading with its level and text in one call
+        headings = bulk_extract(driver, HEADING_SELECTOR, text=True, tag=True)
+        logging.debug(f"Found {len(headings)} headings.")
 
-        # Save the result
-        save_result(result_df, testcase)
+        # Save one result per heading as it is validated
+        result_df = save_rows(iter_outline_rows(headings), testcase, columns=COLUMNS)
+        # Streamed results come back as a summary row (see utils.save_rows)
+        violations = result_df.count("result", "Fail") if "result" in result_df else result_df["failed"][0]
+        if violations:
+            logging.warning(f"{violations} heading outline problem(s) on page: {url}")
+        else:
+            logging.info(f"Heading outline of {len(headings)} headings is valid.")
 
         return result_df
 
     except Exception as e:
         logging.error(f"Error during {testcase}: {str(e)}", exc_info=True)
-        error_result = pd.DataFrame([{"tags": "N/A", "result": "Fail", "comments": str(e)}])
-        save_result(error_result, testcase)
-        return error_result
\ No newline at end of file
+        note_check_error(e)
+        error_row = {"tags": "N/A", "result": "Fail", "comments": str(e)}
+        return save_rows([error_row], testcase, columns=COLUMNS)
@@ -1,56 +1,55 @@
 import logging
-import pandas as pd
-from selenium.webdriver.common.by import By
 
-from utils import save_result
+from utils import save_result, save_rows, note_check_error
+from records import ResultTable
+from page_session import load_page
+from dom_extract import bulk_extract
 
 
-def test_image_alt(driver, url):
+def iter_image_alt_rows(images):
+    """Yield one result row ('src', 'result', 'alt') per image read from the page."""
+    for img in images:
+        src = img["src"]
+        alt = img["alt"]
+        if alt:
+            result = "Pass"
+            comments = alt
+        else:
+            result = "Fail"
+            comments = "Missing 'alt' attribute"
+        yield {"src": src, "result": result, "alt": comments}
+
+
+def test_image_alt(driver, url, session=None):
     """
     Test to verify that all images on the page have 'alt' attributes.
 
     Args:
         driver: Selenium WebDriver instance.
         url: URL of the page to test.
+        session: Optional PageSession shared between checks.
 
     Returns:
-        DataFrame: Test results as a pandas DataFrame with columns 'src', 'result', and 'alt'.
+        ResultTable: Test results with columns 'src', 'result', and 'alt' (a summary when the
+        results are streamed, see utils.save_rows).
     """
     logging.info(f"Starting Image Alt Attribute Test for URL: {url}")
     testcase = "Image Alt Attribute Test"
 
     try:
-        # Navigate to the page
-        driver.get(url)
-        logging.info("Page loaded successfully.")
+        # Navigate to the page (or reuse the already loaded page)
+        load_page(driver, url, session)
 
-        # Find all <img> tags on the page
-        images = driver.find_elements(By.TAG_NAME, "img")
+        # Read src and alt of all <img> tags in a single round-trip
+        images = bulk_extract(driver, "img", attributes=("src", "alt"))
         logging.info(f"Found {len(images)} images on the page.")
 
-        # Prepare results for each image
-        results = []
-        for img in images:
-            src = img.get_attribute("src")
-            alt = img.get_attribute("alt")
-            if alt:
-                result = "Pass"
-                comments = alt
-            else:
-                result = "Fail"
-                comments = "Missing 'alt' attribute"
-            results.append({"src": src, "result": result, "alt": comments})
-
-        # Convert results to a DataFrame
-        result_df = pd.DataFrame(results)
-
-        # Save the result
-        save_result(result_df, testcase)
-
-        return result_df
+        # Save one result per image as it is produced
+        return save_rows(iter_image_alt_rows(images), testcase)
 
     except Exception as e:
         logging.error(f"Error during {testcase}: {str(e)}", exc_info=True)
-        error_result = pd.DataFrame([{"src": "N/A", "result": "Fail", "alt": str(e)}])
+        note_check_error(e)
+        error_result = ResultTable.from_records([{"src": "N/A", "result": "Fail", "alt": str(e)}])
         save_result(error_result, testcase)
         return error_result
\ No newline at end of file
@@ -0,0 +1,81 @@
+import logging
+
+from utils import save_rows, note_check_error
+from page_session import load_page
+
+
+COLUMNS = ("url", "type", "status", "size", "duration", "result", "comments")
+
+
+def iter_resource_rows(resources, slow_threshold=2.0):
+    """Yield one result row per resource recorded in the network log (see test_resource_status)."""
+    for resource in resources:
+        status = resource["status"]
+        duration = resource["duration"]
+        if resource["error"]:
+            result = "Fail"
+            comments = resource["error"]
+        elif status is not None and status >= 400:
+            result = "Fail"
+            comments = f"Status Code: {status}"
+        elif duration is not None and duration > slow_threshold:
+            result = "Fail"
+            comments = f"Slow: {duration:.2f}s"
+        else:
+            result = "Pass"
+            comments = f"Status Code: {status}"
+        if result == "Fail":
+            logging.warning("Resource problem (%s): %s", comments, resource["url"], extra={"sample": "resource_problem"})
+        yield {
+            "url": resource["url"],
+            "type": resource["type"],
+            "status": status,
+            "size": resource["size"],
+            "duration": None if duration is None else round(duration, 3),
+            "result": result,
+            "comments": comments,
+        }
+
+
+def test_resource_status(driver, url, session=None, slow_threshold=2.0):
+    """
+    Test to verify that every resource fetched by the page (images, scripts, stylesheets, ...)
+    loaded successfully and in time.
+
+    The statuses come from the browser's network log of the page load, so no resource is
+    requested a second time. Only Chrome records the network log.
+
+    Args:
+        driver: Selenium WebDriver instance.
+        url: URL of the page to test.
+        session: Optional PageSession shared between checks.
+        slow_threshold (float): Seconds after which a resource is reported as slow.
+
+    Returns:
+        ResultTable: Test results with columns 'url', 'type', 'status',
+        'size', 'duration', 'result' and 'comments' (a summary when the results are streamed,
+        see utils.save_rows).
+    """
+    logging.info(f"Starting Resource Status Test for URL: {url}")
+    testcase = "Resource Status Test"
+
+    try:
+        # Navigate to the page (or reuse the already loaded page); the full profile is needed
+        # so that no resource is blocked and the load event is reached
+        snapshot = load_page(driver, url, session, profile="full")
+
+        if snapshot.resources is None:
+            comment = "Network log not available (only recorded by Chrome)."
+            logging.warning(f"{testcase} skipped: {comment}")
+            return save_rows([{"url": url, "result": "Skipped", "comments": comment}], testcase, columns=COLUMNS)
+
+        logging.info(f"Checking {len(snapshot.resources)} resources from the network log.")
+
+        # Save one result per fetched resource as it is produced
+        return save_rows(iter_resource_rows(snapshot.resources.values(), slow_threshold), testcase, columns=COLUMNS)
+
+    except Exception as e:
+        logging.error(f"Error during {testcase}: {str(e)}", exc_info=True)
+        note_check_error(e)
+        error_row = {"url": "N/A", "result": "Fail", "comments": str(e)}
+        return save_rows([error_row], testcase, columns=COLUMNS)
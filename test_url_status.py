@@ -1,70 +1,64 @@
 import logging
-import requests
-import pandas as pd
-from selenium.webdriver.common.by import By
 
-from utils import save_result
+from utils import save_result, save_rows, note_check_error
+from records import ResultTable
+from page_session import load_page
+from link_checker import iter_link_rows
+from dom_extract import bulk_extract
+from network_log import known_statuses
 
 
-def test_url_status(driver, url):
+def test_url_status(driver, url, session=None, **checker_options):
     """
     Test to verify that all links on the page are valid (not broken).
 
     Args:
         driver: Selenium WebDriver instance.
         url: URL of the page to test.
+        session: Optional PageSession shared between checks.
+        **checker_options: Options for link_checker.LinkChecker (max_workers, per_host, timeout,
+            budget, cache, http_session).
 
     Returns:
-        DataFrame: Test results as a pandas DataFrame with columns 'url', 'result', and 'comments'.
+        ResultTable: Test results with columns 'url', 'result', and 'comments' (a summary when
+        the results are streamed, see utils.save_rows).
     """
     logging.info(f"Starting URL Status Test for URL: {url}")
     testcase = "URL Status Test"
 
     try:
-        # Navigate to the page
-        driver.get(url)
-        logging.info("Page loaded successfully.")
+        # Navigate to the page (or reuse the already loaded page)
+        snapshot = load_page(driver, url, session)
 
-        # Find all anchor (<a>) tags on the page
-        links = driver.find_elements(By.TAG_NAME, "a")
+        # Read the href of every anchor (<a>) tag in a single round-trip
+        links = bulk_extract(driver, "a", attributes=("href",))
         logging.info(f"Found {len(links)} links on the page.")
 
-        # Prepare results for each URL
-        results = []
-        for link in links:
-            href = link.get_attribute("href")
-            if href:
-                try:
-                    # Make a HEAD request to check the URL
-                    response = requests.head(href, timeout=5)
-                    if response.status_code == 404:
-                        result = "Fail"
-                        comments = "404 Not Found"
-                        logging.warning(f"Broken URL found: {href}")
-                    else:
-                        result = "Pass"
-                        comments = f"Status Code: {response.status_code}"
-                except requests.RequestException as e:
-                    result = "Fail"
-                    comments = f"Error: {str(e)}"
-                    logging.error(f"Error checking URL {href}: {str(e)}")
-            else:
-                result = "Fail"
-                comments = "No href attribute"
-            
-            # Append the result
-            results.append({"url": href, "result": result, "comments": comments})
+        # Check all hrefs concurrently; duplicates are requested only once, and URLs the
+        # browser already fetched while loading the page are not requested at all
+        hrefs = [link["href"] for link in links]
+        cache = checker_options.get("cache")
+        hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+        rows = iter_link_rows(hrefs, known=known_statuses(snapshot.resources), **checker_options)
 
-        # Convert results to a DataFrame
-        result_df = pd.DataFrame(results)
+        # Save one result per link as it is produced
+        result_df = save_rows(rows, testcase)
 
-        # Save the result
-        save_result(result_df, testcase)
+        # Report how many links were answered from the persistent cache
+        if cache:
+            cache_df = ResultTable.from_records([{
+                "url": url,
+                "cache_hits": cache.hits - hits,
+                "cache_misses": cache.misses - misses,
+            }])
+            logging.info(f"Link cache: {cache.hits - hits} hits, {cache.misses - misses} misses.")
+            save_result(cache_df, f"{testcase} Cache")
 
         return result_df
 
     except Exception as e:
         logging.error(f"Error during {testcase}: {str(e)}", exc_info=True)
-        error_result = pd.DataFrame([{"url": "N/A", "result": "Fail", "comments": str(e)}])
+        note_check_error(e)
+        error_result = ResultTable.from_records([{"url": "N/A", "result": "Fail", "comments": str(e)}])
         save_result(error_result, testcase)
         return error_result
\ No newline at end of file
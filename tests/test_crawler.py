@@ -0,0 +1,47 @@
+from crawler import BloomFilter, CrawlFrontier
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=5_000, error_rate=0.01)
+    urls = [f"https://example.com/page/{i}" for i in range(5_000)]
+    for url in urls:
+        bloom.add(url)
+    assert all(url in bloom for url in urls)
+
+
+def test_bloom_filter_false_positive_rate_stays_near_target():
+    bloom = BloomFilter(capacity=5_000, error_rate=0.01)
+    for i in range(5_000):
+        bloom.add(f"https://example.com/page/{i}")
+    false_positives = sum(f"https://example.com/other/{i}" in bloom for i in range(10_000))
+    assert false_positives / 10_000 < 0.03
+
+
+def test_bloom_filter_add_reports_new_items():
+    bloom = BloomFilter(capacity=100)
+    assert bloom.add("https://example.com/")
+    assert not bloom.add("https://example.com/")
+
+
+def test_bloom_filter_survives_a_round_trip_through_its_bits():
+    bloom = BloomFilter(capacity=100, error_rate=0.01)
+    bloom.add("https://example.com/a")
+    restored = BloomFilter(capacity=100, error_rate=0.01, bits=bytes(bloom.bits))
+    assert "https://example.com/a" in restored
+
+
+def test_frontier_resumes_counts_from_checkpoint(tmp_path):
+    path = str(tmp_path / "crawl.sqlite")
+    frontier = CrawlFrontier(path, capacity=100)
+    for i in range(5):
+        frontier.add(f"https://example.com/{i}", 0, True)
+    assert not frontier.add("https://example.com/0", 1, True)
+    for row_id, _, _ in frontier.next_batch(2):
+        frontier.mark(row_id, "done")
+    frontier.checkpoint()
+    frontier.close()
+
+    resumed = CrawlFrontier(path, capacity=100)
+    assert (resumed.pending(), resumed.done()) == (3, 2)
+    assert not resumed.add("https://example.com/4", 0, True)
+    resumed.close()
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from extract_script_data import DEFAULT_SCHEMA, MISSING, extract_fields, load_schema, resolve_path
+
+
+DATA = {
+    "config": {"SiteUrl": "https://example.com", "SiteName": "Example"},
+    "pageData": {"Offers": [{"Id": 1}, {"Id": 2}, {"Id": 3}]},
+}
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("config.SiteUrl", "https://example.com"),
+    ("pageData.Offers.0.Id", 1),
+    ("pageData.Offers.-1.Id", 3),
+    ("pageData.Offers.-3.Id", 1),
+    ("pageData.Offers", [{"Id": 1}, {"Id": 2}, {"Id": 3}]),
+])
+def test_resolve_path(path, expected):
+    assert resolve_path(DATA, path) == expected
+
+
+@pytest.mark.parametrize("path", [
+    "config.Missing",
+    "missing.SiteUrl",
+    "pageData.Offers.3.Id",
+    "pageData.Offers.-4.Id",
+    "pageData.Offers.first.Id",
+    "config.SiteUrl.length",
+])
+def test_resolve_path_returns_the_default_for_missing_segments(path):
+    assert resolve_path(DATA, path) == MISSING
+    assert resolve_path(DATA, path, default=None) is None
+
+
+def test_extract_fields_fills_missing_columns():
+    row = extract_fields(DATA, {"SiteURL": "config.SiteUrl", "Country": "userInfo.CountryCode"})
+    assert row == {"SiteURL": "https://example.com", "Country": MISSING}
+
+
+def test_load_schema_defaults_to_a_copy_of_the_built_in_schema():
+    schema = load_schema()
+    assert schema == DEFAULT_SCHEMA
+    schema["Extra"] = "config.Extra"
+    assert "Extra" not in DEFAULT_SCHEMA
+
+
+def test_load_schema_reads_a_json_file(tmp_path):
+    path = tmp_path / "schema.json"
+    path.write_text(json.dumps({"FirstOffer": "pageData.Offers.0.Id"}))
+    assert load_schema(str(path)) == {"FirstOffer": "pageData.Offers.0.Id"}
+
+
+@pytest.mark.parametrize("content", [["config.SiteUrl"], {"SiteURL": 1}, "config.SiteUrl"])
+def test_load_schema_rejects_anything_but_an_object_of_paths(tmp_path, content):
+    path = tmp_path / "schema.json"
+    path.write_text(json.dumps(content))
+    with pytest.raises(ValueError):
+        load_schema(str(path))
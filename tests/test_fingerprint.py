@@ -0,0 +1,134 @@
+import time
+
+import pytest
+
+import fixture_site
+from fingerprint import FingerprintStore, fingerprint, run_incremental
+from page_session import PageSession, PageSnapshot
+from records import ResultTable
+from static_engine import StaticDriver
+from test_h1_tag_existence import test_h1_tag_existence as h1_check
+from utils import collect_results, note_check_error, save_result
+
+
+URL = "https://example.com/property/1"
+
+
+def _snapshot(html):
+    return PageSnapshot(URL, URL, html, None, time.time(), 0.0)
+
+
+class StubCheck:
+    """Saves one row per h1 of the snapshot, counting its runs."""
+
+    def __init__(self, snapshot, fail=False):
+        self.snapshot = snapshot
+        self.fail = fail
+        self.runs = 0
+
+    def __call__(self):
+        self.runs += 1
+        if self.fail:
+            note_check_error(TimeoutError("page did not load"))
+            df = ResultTable.from_records([{"tags": "h1", "result": "Fail", "comments": "page did not load"}])
+        else:
+            df = ResultTable.from_records([
+                {"tags": "h1", "text": text, "result": "Pass", "comments": "Found"}
+                for text in self.snapshot.document().xpath("//h1/text()")
+            ])
+        save_result(df, "H1 Tag Test")
+        return df
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FingerprintStore(str(tmp_path / "fingerprints.sqlite"))
+    yield store
+    store.close()
+
+
+def _run(store, check, snapshot, force=False):
+    with collect_results() as collected:
+        result = run_incremental(store, "H1 Tag Test", URL, snapshot, check, force=force)
+    return result, collected["H1 Tag Test"][0]
+
+
+def test_fingerprint_only_depends_on_the_checked_section():
+    page = "<html><body><h1>Title</h1><p>{}</p></body></html>"
+    digest = fingerprint("H1 Tag Test", _snapshot(page.format("a")))
+    assert fingerprint("H1 Tag Test", _snapshot(page.format("b"))) == digest
+    assert fingerprint("H1 Tag Test", _snapshot("<h1>Other</h1>")) != digest
+    assert fingerprint("URL Status Code Test", _snapshot(page.format("a"))) is None
+
+
+def test_unchanged_page_reuses_the_stored_result(store):
+    snapshot = _snapshot("<html><body><h1>Title</h1></body></html>")
+    check = StubCheck(snapshot)
+
+    fresh, saved = _run(store, check, snapshot)
+    reused, saved_again = _run(store, check, _snapshot("<html><body><h1>Title</h1><p>New</p></body></html>"))
+
+    assert check.runs == 1
+    assert saved["cached"] == [False]
+    assert saved_again["cached"] == [True]
+    assert reused["text"] == fresh["text"] == ["Title"]
+
+
+def test_changed_section_runs_the_check_again(store):
+    first = _snapshot("<h1>Title</h1>")
+    _run(store, StubCheck(first), first)
+
+    changed = _snapshot("<h1>New title</h1>")
+    check = StubCheck(changed)
+    result, saved = _run(store, check, changed)
+
+    assert check.runs == 1
+    assert result["text"] == ["New title"]
+    assert saved["cached"] == [False]
+
+
+def test_force_runs_the_check_and_refreshes_the_fingerprint(store):
+    snapshot = _snapshot("<h1>Title</h1>")
+    check = StubCheck(snapshot)
+    _run(store, check, snapshot)
+    _run(store, check, snapshot, force=True)
+    assert check.runs == 2
+
+    _run(store, check, snapshot)
+    assert check.runs == 2
+
+
+def test_results_of_a_failed_run_are_not_reused(store):
+    snapshot = _snapshot("<h1>Title</h1>")
+    failing = StubCheck(snapshot, fail=True)
+    _run(store, failing, snapshot)
+    assert store.get(URL, "H1 Tag Test") == (None, None)
+
+    check = StubCheck(snapshot)
+    result, _ = _run(store, check, snapshot)
+    assert check.runs == 1
+    assert result["result"] == ["Pass"]
+
+
+def test_h1_check_on_a_fixture_page_runs_once(store):
+    driver = StaticDriver()
+    runs = []
+    cached = []
+    with fixture_site.FixtureSite() as site:
+        url = site.url(fixture_site.page_path(1, slow=0))
+        for _ in range(2):
+            session = PageSession(driver)
+            snapshot = session.open(url)
+
+            def run_check():
+                runs.append(url)
+                return h1_check(driver, url, session=session)
+
+            with collect_results() as collected:
+                run_incremental(store, "H1 Tag Test", url, snapshot, run_check)
+            cached.append(ResultTable.concat(collected["H1 Tag Existence"])["cached"])
+    driver.quit()
+
+    assert len(runs) == 1
+    assert set(cached[0]) == {False}
+    assert set(cached[1]) == {True}
@@ -0,0 +1,50 @@
+from test_html_sequence import iter_outline_rows
+
+
+def _outline(*tags):
+    return list(iter_outline_rows({"tag": tag, "text": f"Heading {tag}"} for tag in tags))
+
+
+def test_valid_outline_passes():
+    rows = _outline("h1", "h2", "h3", "h2", "h3")
+    assert [row["result"] for row in rows] == ["Pass"] * 5
+    assert [row["position"] for row in rows] == [1, 2, 3, 4, 5]
+
+
+def test_no_headings():
+    assert _outline() == [
+        {"position": None, "tags": "h1", "text": None, "result": "Fail", "comments": "No headings found"}
+    ]
+
+
+def test_multiple_h1():
+    rows = _outline("h1", "h2", "h1")
+    assert rows[2]["result"] == "Fail"
+    assert rows[2]["comments"] == "Multiple h1: first h1 at position 1"
+    assert [row["result"] for row in rows[:2]] == ["Pass", "Pass"]
+
+
+def test_outline_starting_at_h2():
+    rows = _outline("h2", "h1", "h2")
+    assert rows[0]["result"] == "Fail"
+    assert rows[0]["comments"] == "Outline starts at h2, expected h1"
+    assert [row["result"] for row in rows[1:]] == ["Pass", "Pass"]
+
+
+def test_outline_without_h1_gets_a_page_row():
+    rows = _outline("h2", "h3")
+    assert rows[-1]["comments"] == "h1 is missing"
+    assert len(rows) == 3
+
+
+def test_skipped_level():
+    rows = _outline("h1", "h2", "h4", "h2")
+    assert rows[2]["result"] == "Fail"
+    assert rows[2]["comments"] == "Skipped level: h2 -> h4"
+    assert rows[3]["result"] == "Pass"
+
+
+def test_empty_heading_text():
+    rows = list(iter_outline_rows([{"tag": "h1", "text": "  \n "}]))
+    assert rows[0]["text"] == ""
+    assert rows[0]["comments"] == "Empty heading"
@@ -0,0 +1,44 @@
+from history import HistoryStore
+from records import ResultTable
+
+
+def _record(store, run_id, ts, results):
+    store.start_run(run_id)
+    for url, result in results.items():
+        store.append(url, "H1 Tag Test", ResultTable.from_records([{"tags": "h1", "result": result}]), ts=ts)
+    store.flush()
+
+
+def test_newly_failing_lists_pages_that_passed_before_the_period(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite"))
+    _record(store, "run-1", 100.0, {"a": "Pass", "b": "Pass", "c": "Fail"})
+    _record(store, "run-2", 200.0, {"a": "Fail", "b": "Pass", "c": "Fail"})
+    _record(store, "run-3", 300.0, {"a": "Fail", "b": "Pass", "c": "Fail"})
+
+    failing = store.newly_failing("H1 Tag Test", since=150.0)
+
+    # c already failed before the period and b never fails
+    assert failing["url"].tolist() == ["a"]
+    assert failing["latest_run"].tolist() == ["run-3"]
+    store.close()
+
+
+def test_newly_failing_ignores_pages_that_recovered(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite"))
+    _record(store, "run-1", 100.0, {"a": "Pass"})
+    _record(store, "run-2", 200.0, {"a": "Fail"})
+    _record(store, "run-3", 300.0, {"a": "Pass"})
+
+    assert store.newly_failing("H1 Tag Test", since=150.0).empty
+    store.close()
+
+
+def test_newly_failing_only_counts_the_requested_check(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite"))
+    _record(store, "run-1", 100.0, {"a": "Pass"})
+    store.start_run("run-2")
+    store.append("a", "Image Alt Test", ResultTable.from_records([{"image": "x", "result": "Fail"}]), ts=200.0)
+    store.append("a", "H1 Tag Test", ResultTable.from_records([{"tags": "h1", "result": "Pass"}]), ts=200.0)
+
+    assert store.newly_failing("H1 Tag Test", since=150.0).empty
+    store.close()
@@ -0,0 +1,90 @@
+import pytest
+
+import link_cache
+from link_cache import LinkStatusCache, status_class
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(link_cache.time, "time", clock)
+    return clock
+
+
+def _urls(cache):
+    return {row[0] for row in cache.conn.execute("SELECT url FROM link_status")}
+
+
+@pytest.mark.parametrize("status, expected", [
+    (200, "2xx"), (301, "3xx"), (404, "404"), (410, "4xx"), (503, "5xx"), (None, "error"), (999, "error"),
+])
+def test_status_class(status, expected):
+    assert status_class(status) == expected
+
+
+def test_entries_expire_after_the_ttl_of_their_status(tmp_path, clock):
+    cache = LinkStatusCache(str(tmp_path / "links.sqlite"), ttls={"2xx": 60, "404": 10})
+    cache.put_many({
+        "https://example.com/ok": ("Pass", "Status 200", 200),
+        "https://example.com/gone": ("Fail", "Status 404", 404),
+    })
+
+    clock.now += 30
+    assert cache.get_many(["https://example.com/ok", "https://example.com/gone"]) == {
+        "https://example.com/ok": ("Pass", "Status 200", 200),
+    }
+    clock.now += 60
+    assert cache.get_many(["https://example.com/ok"]) == {}
+    assert (cache.hits, cache.misses) == (1, 2)
+    cache.close()
+
+
+def test_revalidate_ignores_cached_entries(tmp_path, clock):
+    path = str(tmp_path / "links.sqlite")
+    cache = LinkStatusCache(path)
+    cache.put_many({"https://example.com/": ("Pass", "Status 200", 200)})
+    cache.close()
+
+    cache = LinkStatusCache(path, revalidate=True)
+    assert cache.get_many(["https://example.com/"]) == {}
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = LinkStatusCache(str(tmp_path / "links.sqlite"), max_entries=3)
+    for url in ("a", "b", "c"):
+        clock.now += 1
+        cache.put_many({url: ("Pass", "Status 200", 200)})
+    # Reading "a" makes "b" the least recently used entry
+    clock.now += 1
+    cache.get_many(["a"])
+    clock.now += 1
+    cache.put_many({"d": ("Pass", "Status 200", 200)})
+
+    assert _urls(cache) == {"a", "c", "d"}
+    cache.close()
+
+
+def test_eviction_is_batched_and_completed_on_close(tmp_path, clock):
+    path = str(tmp_path / "links.sqlite")
+    cache = LinkStatusCache(path, max_entries=100)
+    assert cache.evict_every == 5
+    for i in range(104):
+        clock.now += 1
+        cache.put_many({f"u{i}": ("Pass", "Status 200", 200)})
+    # 104 rows: the last eviction ran at 100 and the next one is due at 105
+    assert len(_urls(cache)) == 104
+    cache.close()
+
+    cache = LinkStatusCache(path, max_entries=100)
+    assert len(_urls(cache)) == 100
+    assert "u0" not in _urls(cache)
+    cache.close()
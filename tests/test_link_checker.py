@@ -0,0 +1,22 @@
+import pytest
+
+from link_checker import normalize_url
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://Example.COM/Path", "https://example.com/Path"),
+    ("https://example.com", "https://example.com/"),
+    ("https://example.com:443/a", "https://example.com/a"),
+    ("http://example.com:80/a", "http://example.com/a"),
+    ("http://example.com:8080/a", "http://example.com:8080/a"),
+    ("https://example.com/a#section", "https://example.com/a"),
+    ("https://example.com/a?b=1&a=2", "https://example.com/a?b=1&a=2"),
+    ("  https://example.com/a  ", "https://example.com/a"),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_normalize_url_is_idempotent():
+    url = normalize_url("HTTP://Example.com:80/a?x=1#top")
+    assert normalize_url(url) == url
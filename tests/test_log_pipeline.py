@@ -0,0 +1,62 @@
+import logging
+
+from log_pipeline import ContextFilter, SamplingFilter, log_context
+
+
+def _record(message, sample=None, url=None, check=None, level=logging.WARNING):
+    record = logging.LogRecord("test", level, __file__, 1, message, None, None)
+    if sample is not None:
+        record.sample = sample
+    record.url, record.check = url, check
+    return record
+
+
+def test_sampling_keeps_the_first_records_of_each_key():
+    sampler = SamplingFilter(limit=3)
+    kept = [sampler.filter(_record(f"Broken link {i}", "broken-link", "page-a", "URL")) for i in range(10)]
+    assert kept == [True] * 3 + [False] * 7
+
+
+def test_sampling_counts_per_key_page_and_check():
+    sampler = SamplingFilter(limit=2)
+    keys = [("broken-link", "page-a", "URL"), ("broken-link", "page-b", "URL"),
+            ("broken-link", "page-a", "Resources"), ("missing-alt", "page-a", "URL")]
+    for _ in range(5):
+        for key in keys:
+            sampler.filter(_record("message", *key))
+    assert {counter: seen for counter, (seen, _) in sampler.counts.items()} == {key: 5 for key in keys}
+    assert sum(sampler.filter(_record("message", *key)) for key in keys) == 0
+
+
+def test_records_without_a_sample_key_are_never_dropped():
+    sampler = SamplingFilter(limit=1)
+    assert all(sampler.filter(_record(f"Step {i}", url="page-a", check="URL")) for i in range(5))
+
+
+def test_no_limit_keeps_every_record():
+    sampler = SamplingFilter(limit=None)
+    assert all(sampler.filter(_record("message", "broken-link", "page-a", "URL")) for _ in range(50))
+
+
+def test_summarize_logs_the_number_of_dropped_records(caplog):
+    sampler = SamplingFilter(limit=2)
+    for _ in range(7):
+        sampler.filter(_record("Broken link", "broken-link", "page-a", "URL", level=logging.ERROR))
+    sampler.filter(_record("Broken link", "broken-link", "page-b", "URL"))
+
+    with caplog.at_level(logging.INFO):
+        sampler.summarize("page-a", "URL")
+
+    [summary] = caplog.records
+    assert summary.levelno == logging.ERROR
+    assert summary.suppressed == 5
+    assert summary.sample_summary == "broken-link"
+    # Only the summarized page and check are reset
+    assert list(sampler.counts) == [("broken-link", "page-b", "URL")]
+
+
+def test_context_filter_stamps_the_callers_context():
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "message", None, None)
+    with log_context(url="https://example.com/", check="H1 Tag Test"):
+        ContextFilter().filter(record)
+    assert (record.url, record.check) == ("https://example.com/", "H1 Tag Test")
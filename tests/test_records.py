@@ -0,0 +1,45 @@
+import pytest
+
+from records import ResultTable, as_table
+
+
+def test_from_records_keeps_first_seen_column_order():
+    table = ResultTable.from_records([{"a": 1, "b": 2}, {"c": 3, "a": 4}])
+    assert table.columns == ["a", "b", "c"]
+    assert table["b"] == [2, None]
+    assert table["c"] == [None, 3]
+
+
+def test_concat_fills_missing_columns_with_none():
+    first = ResultTable.from_records([{"link": "x", "result": "Pass"}])
+    second = ResultTable.from_records([{"link": "y", "status": 404, "result": "Fail"}])
+    merged = ResultTable.concat([first, second, ResultTable()])
+    assert merged.columns == ["link", "result", "status"]
+    assert len(merged) == 2
+    assert merged.to_dict() == [
+        {"link": "x", "result": "Pass", "status": None},
+        {"link": "y", "result": "Fail", "status": 404},
+    ]
+
+
+def test_to_dict_round_trips_records():
+    records = [{"tag": "h1", "result": "Pass"}, {"tag": "h2", "result": "Fail"}]
+    table = ResultTable.from_records(records)
+    assert table.to_dict() == records
+    assert table.to_dict(orient="records") == records
+    assert table.count("result", "Fail") == 1
+
+
+def test_to_dict_rejects_other_orients():
+    with pytest.raises(ValueError):
+        ResultTable.from_records([{"a": 1}]).to_dict(orient="list")
+
+
+def test_empty_table():
+    assert ResultTable().empty
+    assert len(ResultTable(["a"])) == 0
+
+
+def test_dataframe_round_trip():
+    table = ResultTable.from_records([{"url": "x", "result": "Pass"}])
+    assert as_table(table.to_dataframe()).to_dict() == table.to_dict()
@@ -0,0 +1,86 @@
+import pytest
+
+from report import RowSink, read_report
+from utils import save_rows, stream_results
+
+
+COLUMNS = ("link", "status", "result", "comments")
+
+
+def _rows(start, count):
+    for i in range(start, start + count):
+        yield {"link": f"https://example.com/{i}", "status": 200 if i % 3 else 404,
+               "result": "Pass" if i % 3 else "Fail", "comments": f"Status {200 if i % 3 else 404}"}
+
+
+def _stream(sink, rows, prefix=None):
+    with stream_results(sink, prefix=prefix):
+        return save_rows(rows, "URL Status Test", columns=COLUMNS)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "xlsx"])
+def test_streamed_rows_round_trip(tmp_path, fmt):
+    sink = RowSink(fmt=fmt, directory=str(tmp_path), buffer_rows=4)
+    summary = _stream(sink, _rows(0, 10))
+    sink.close()
+
+    assert summary.to_dict() == [{"sheet": "URL Status Test", "rows": 10, "failed": 4}]
+    sheet = read_report(sink.path)["URL Status Test"]
+    assert list(sheet.columns) == list(COLUMNS)
+    assert sheet.to_dict("records") == list(_rows(0, 10))
+
+
+@pytest.mark.parametrize("fmt", ["csv", "xlsx"])
+def test_declared_columns_survive_a_short_first_row(tmp_path, fmt):
+    sink = RowSink(fmt=fmt, directory=str(tmp_path), buffer_rows=1)
+    _stream(sink, [{"link": "page", "result": "Fail", "comments": "Timeout"}, *_rows(1, 2)])
+    sink.close()
+
+    sheet = read_report(sink.path)["URL Status Test"]
+    assert list(sheet.columns) == list(COLUMNS)
+    assert sheet["link"].tolist() == ["page", "https://example.com/1", "https://example.com/2"]
+
+
+def test_appended_chunks_keep_the_column_order(tmp_path):
+    sink = RowSink(fmt="csv", directory=str(tmp_path), buffer_rows=2)
+    # Later rows list their keys in another order; they are written under the first header
+    reordered = ({key: row[key] for key in reversed(COLUMNS)} for row in _rows(2, 4))
+    _stream(sink, [*_rows(0, 2), *reordered])
+    sink.close()
+
+    sheet = read_report(sink.path)["URL Status Test"]
+    assert list(sheet.columns) == list(COLUMNS)
+    assert sheet.to_dict("records") == list(_rows(0, 6))
+
+
+def test_worker_parts_are_joined_with_the_prefix_first(tmp_path):
+    for part, start in ((101, 0), (102, 5)):
+        sink = RowSink(fmt="csv", directory=str(tmp_path), buffer_rows=2, part=part)
+        _stream(sink, _rows(start, 5), prefix={"page_url": f"https://example.com/page/{part}"})
+        sink.close()
+
+    sheet = read_report(str(tmp_path / "test_report"))["URL Status Test"]
+    assert list(sheet.columns) == ["page_url", *COLUMNS]
+    assert len(sheet) == 10
+    assert sheet["link"].tolist() == [row["link"] for row in _rows(0, 10)]
+
+
+def test_rows_before_a_failure_are_written(tmp_path):
+    def failing():
+        yield from _rows(0, 3)
+        raise RuntimeError("driver gone")
+
+    sink = RowSink(fmt="csv", directory=str(tmp_path), buffer_rows=100)
+    with pytest.raises(RuntimeError):
+        _stream(sink, failing())
+    sink.close()
+
+    assert len(read_report(sink.path)["URL Status Test"]) == 3
+
+
+def test_save_rows_without_a_stream_returns_the_table(monkeypatch):
+    saved = {}
+    monkeypatch.setattr("utils.save_result", lambda df, sheet_name: saved.setdefault(sheet_name, df))
+    table = save_rows(_rows(0, 3), "URL Status Test")
+    assert table.to_dict() == list(_rows(0, 3))
+    assert saved["URL Status Test"] is table
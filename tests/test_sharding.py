@@ -0,0 +1,74 @@
+import pytest
+
+from records import ResultTable
+from report import ReportSink
+from sharding import merge_shards, parse_shard, select_shard, shard_name, shard_of, write_manifest
+
+
+URLS = [f"https://example.com/property/{i}" for i in range(200)]
+
+
+def test_shard_of_is_stable_and_in_range():
+    assignment = [shard_of(url, 4) for url in URLS]
+    assert assignment == [shard_of(url, 4) for url in URLS]
+    assert set(assignment) == {0, 1, 2, 3}
+
+
+def test_shard_of_ignores_trivial_url_differences():
+    assert shard_of("HTTPS://Example.com:443/property/1#top", 8) == shard_of("https://example.com/property/1", 8)
+
+
+def test_select_shard_partitions_the_list_in_order():
+    shards = [select_shard(URLS, index, 3) for index in range(3)]
+    assert sorted(url for shard in shards for url in shard) == sorted(URLS)
+    for shard in shards:
+        assert shard == [url for url in URLS if url in shard]
+
+
+def test_adding_urls_never_moves_existing_ones():
+    before = select_shard(URLS, 1, 4)
+    after = select_shard(URLS + [f"https://example.com/new/{i}" for i in range(50)], 1, 4)
+    assert after[:len(before)] == before
+
+
+@pytest.mark.parametrize("spec", ["4/4", "-1/2", "1", "a/b", "0/0"])
+def test_parse_shard_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        parse_shard(spec)
+
+
+def _write_shard(directory, index, count, pages):
+    summary = ResultTable.from_records([{"page_url": url, "result": "Pass"} for url in pages])
+    checks = ResultTable.from_records([{"page_url": url, "tags": "h1", "result": "Pass"} for url in pages])
+    sink = ReportSink(fmt="csv", directory=directory, name=shard_name(index, count), keep_existing=False)
+    sink.add("Batch Summary", summary)
+    sink.add("H1 Tag Test", checks)
+    sink.flush()
+    write_manifest(index, count, pages, {"Batch Summary": summary}, fmt="csv", directory=directory)
+
+
+def test_merge_shards_drops_pages_reported_twice(tmp_path):
+    directory = str(tmp_path)
+    _write_shard(directory, 0, 2, ["https://example.com/a", "https://example.com/b"])
+    _write_shard(directory, 1, 2, ["https://example.com/b", "https://example.com/c"])
+
+    merged = merge_shards(2, directory=directory)
+
+    assert sorted(merged["Batch Summary"]["page_url"]) == ["https://example.com/a", "https://example.com/b",
+                                                          "https://example.com/c"]
+    assert len(merged["H1 Tag Test"]) == 3
+    shards = merged["Shard Summary"].set_index("shard")
+    assert shards.loc[0, "duplicates"] == 0
+    assert shards.loc[1, "duplicates"] == 1
+
+
+def test_merge_shards_reports_missing_shards(tmp_path):
+    directory = str(tmp_path)
+    _write_shard(directory, 0, 2, ["https://example.com/a"])
+
+    merged = merge_shards(2, directory=directory)
+
+    shards = merged["Shard Summary"].set_index("shard")
+    assert shards.loc[0, "result"] == "Pass"
+    assert shards.loc[1, "result"] == "Fail"
+    assert shards.loc[1, "comments"].startswith("Missing")
@@ -1,7 +1,225 @@
-import os
 import logging
-import pandas as pd
-from openpyxl import load_workbook
+import threading
+from contextlib import contextmanager
+
+from report import ReportSink, RowSink
+from records import ResultTable, as_table
+
+
+# When set, save_result stores result tables here instead of writing the workbook
+# Collectors are per thread, so audits running in parallel threads (daemon.py) keep their results apart
+_local = threading.local()
+
+# Active ReportSink of the current run (see report_sink)
+_sink = None
+
+# Rows per chunk handed to a RowSink by save_rows (see stream_results)
+DEFAULT_STREAM_BUFFER = 500
+
+
+@contextmanager
+def collect_results():
+    """
+    Capture every save_result call in memory instead of writing the Excel file.
+
+    Used by batch workers, which must not write the shared workbook concurrently. The
+    collector only captures the results saved by the current thread.
+
+    Yields:
+        dict: Sheet name mapped to the list of results saved for it.
+    """
+    previous = getattr(_local, "collector", None)
+    _local.collector = {}
+    try:
+        yield _local.collector
+    finally:
+        _local.collector = previous
+
+
+@contextmanager
+def capture_check_errors():
+    """
+    Collect the exceptions that checks of the current thread caught and reported as a 'Fail'
+    row instead of raising (see note_check_error).
+
+    Yields:
+        list: The caught exceptions, in order.
+    """
+    errors = []
+    captures = _local.__dict__.setdefault("error_captures", [])
+    captures.append(errors)
+    try:
+        yield errors
+    finally:
+        captures.remove(errors)
+
+
+def note_check_error(error):
+    """Record that a check caught `error` and saved an error row in place of its results."""
+    for errors in getattr(_local, "error_captures", ()):
+        errors.append(error)
+
+
+@contextmanager
+def report_sink(fmt="xlsx", **kwargs):
+    """
+    Buffer every save_result call of a run and write the report once when the block exits.
+
+    The report is also written when the block exits with an error, so results gathered
+    before a failure are kept.
+
+    Args:
+        fmt (str): Report format: "xlsx", "csv" or "parquet".
+        **kwargs: Extra ReportSink options (directory, name, keep_existing).
+
+    Yields:
+        ReportSink: The active sink.
+    """
+    global _sink
+    previous = _sink
+    _sink = ReportSink(fmt=fmt, **kwargs)
+    try:
+        yield _sink
+    finally:
+        try:
+            _sink.flush()
+        except Exception as e:
+            logging.error(f"Error while writing the report: {str(e)}")
+        _sink = previous
+
+
+@contextmanager
+def stream_results(sink, prefix=None):
+    """
+    Stream the rows of every save_rows call of the current thread into `sink` while the checks
+    produce them, instead of building each sheet in memory.
+
+    The sink is flushed when the block exits, also with an error, so the rows produced before
+    a failure are kept. The caller owns the sink and closes it.
+
+    Args:
+        sink (report.RowSink): Where the rows go.
+        prefix (dict | None): Columns put in front of every row, e.g. {"page_url": url} when
+            the results of many pages share one report.
+
+    Yields:
+        RowSink: The active sink.
+    """
+    previous = getattr(_local, "stream", None)
+    _local.stream = {"sink": sink, "prefix": prefix or {}, "taps": []}
+    try:
+        yield sink
+    finally:
+        try:
+            sink.flush()
+        except Exception as e:
+            logging.error(f"Error while writing the streamed report: {str(e)}")
+        _local.stream = previous
+
+
+@contextmanager
+def stream_report(fmt="csv", **kwargs):
+    """
+    Stream every save_rows call of the block into a new RowSink and close it on exit.
+
+    Args:
+        fmt (str): Report format: "csv", "parquet" or "xlsx".
+        **kwargs: Extra RowSink options (directory, name, buffer_rows).
+
+    Yields:
+        RowSink: The active sink.
+    """
+    sink = RowSink(fmt=fmt, **kwargs)
+    try:
+        with stream_results(sink):
+            yield sink
+    finally:
+        try:
+            sink.close()
+        except Exception as e:
+            logging.error(f"Error while writing the streamed report: {str(e)}")
+
+
+def streaming():
+    """Return True when the current thread streams its results (see stream_results)."""
+    return getattr(_local, "stream", None) is not None
+
+
+@contextmanager
+def stream_tap(tap):
+    """
+    Call `tap(sheet_name, rows)` with every chunk of rows streamed inside the block.
+
+    Used to record the rows somewhere else as well (e.g. the results history) without keeping
+    them until the check ends. Outside stream_results the block does nothing.
+    """
+    stream = getattr(_local, "stream", None)
+    if stream is None:
+        yield
+        return
+    stream["taps"].append(tap)
+    try:
+        yield
+    finally:
+        stream["taps"].remove(tap)
+
+
+def save_rows(rows, sheet_name, columns=None):
+    """
+    Save the result rows of a check as they are produced.
+
+    Inside `stream_results()` the rows are written to the sink in chunks of the sink's buffer
+    size, so memory stays flat however many rows a page produces; rows produced before `rows`
+    raises are still written. Otherwise they are gathered into a ResultTable and passed to
+    save_result.
+
+    Args:
+        rows (iterable): Result rows (dicts), typically a generator.
+        sheet_name: Name of the Excel sheet for this test case.
+        columns (list | None): Columns of the sheet in the streamed report; needed when the
+            first rows saved for the sheet may lack some of them (e.g. an error row).
+
+    Returns:
+        ResultTable: The results; when streaming, a one-row summary with columns 'sheet',
+        'rows' and 'failed' instead.
+    """
+    stream = getattr(_local, "stream", None)
+    if stream is None:
+        result_df = ResultTable.from_records(list(rows))
+        save_result(result_df, sheet_name)
+        return result_df
+
+    sink, prefix = stream["sink"], stream["prefix"]
+    if columns is not None:
+        columns = [*prefix, *columns]
+    buffer_rows = getattr(sink, "buffer_rows", DEFAULT_STREAM_BUFFER)
+    count = failed = 0
+    chunk = []
+
+    def write(chunk):
+        # Taps get the rows as the check produced them, without the report prefix
+        sink.write_many(sheet_name, [{**prefix, **row} for row in chunk] if prefix else chunk, columns=columns)
+        for tap in stream["taps"]:
+            tap(sheet_name, chunk)
+
+    try:
+        for row in rows:
+            chunk.append(row)
+            count += 1
+            failed += row.get("result") == "Fail"
+            if len(chunk) >= buffer_rows:
+                write(chunk)
+                chunk = []
+    except BaseException:
+        # The rows produced before the failure go to disk right away
+        if chunk:
+            write(chunk)
+        sink.flush()
+        raise
+    if chunk:
+        write(chunk)
+    logging.info(f"Streamed {count} rows for sheet: {sheet_name}")
+    return ResultTable.from_records([{"sheet": sheet_name, "rows": count, "failed": failed}])
 
 
 # def save_result(df, sheet_name):
@@ -40,44 +258,33 @@ from openpyxl import load_workbook
 
 def save_result(df, sheet_name):
     """
-    Save the test results DataFrame to an Excel file.
+    Save the test results to the report.
+
+    Inside `report_sink()` the sheet is buffered and written once when the run ends; inside
+    `stream_results()` its rows are written to the streamed report; otherwise a single-sheet
+    report update is written right away.
 
     Args:
-        df: pandas DataFrame with test results.
+        df: ResultTable (or pandas DataFrame) with test results.
         sheet_name: Name of the Excel sheet for this test case.
     """
-    directory = "reports"
-    file_path = os.path.join(directory, "test_report.xlsx")
+    collector = getattr(_local, "collector", None)
+    if collector is not None:
+        collector.setdefault(sheet_name, []).append(df)
+        return
 
-    # Ensure the reports directory exists
-    os.makedirs(directory, exist_ok=True)
+    stream = getattr(_local, "stream", None)
+    if stream is not None:
+        save_rows(as_table(df).to_dict("records"), sheet_name)
+        return
 
-    try:
-        if os.path.exists(file_path):
-            # Open the existing workbook
-            workbook = load_workbook(file_path)
-            
-            # If the sheet exists and is the only one, add a temporary sheet first
-            if sheet_name in workbook.sheetnames:
-                logging.info(f"Overriding existing sheet: {sheet_name}")
-                if len(workbook.sheetnames) == 1:
-                    workbook.create_sheet("TempSheet")
-                
-                # Remove the sheet to be replaced
-                del workbook[sheet_name]
-                workbook.save(file_path)  # Save the workbook after removing the sheet
-            
-            # Remove temporary sheet if it exists
-            if "TempSheet" in workbook.sheetnames:
-                del workbook["TempSheet"]
-                workbook.save(file_path)
-
-        # Write the new data to the specified sheet (whether file existed or not)
-        with pd.ExcelWriter(file_path, engine="openpyxl", mode="a" if os.path.exists(file_path) else "w") as writer:
-            logging.info(f"Saving data to sheet: {sheet_name}")
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    if _sink is not None:
+        _sink.add(sheet_name, df)
+        return
 
+    try:
+        sink = ReportSink()
+        sink.add(sheet_name, df)
+        sink.flush()
     except Exception as e:
         logging.error(f"Error while saving to the Excel file: {str(e)}")
-
-    logging.info(f"Test results saved to {file_path}")
@@ -0,0 +1,156 @@
+import logging
+
+
+# Every wait runs inside the page as an async script and resolves as soon as its condition
+# holds. The in-page timeout always fires before the WebDriver script timeout, so a wait
+# never raises on timeout: it returns its last observation and the caller decides.
+
+WAIT_FOR_TEXT_CHANGE_JS = """
+var selector = arguments[0], previous = arguments[1], expected = arguments[2];
+var timeoutMs = arguments[3], settleMs = arguments[4], done = arguments[arguments.length - 1];
+
+function texts() {
+    return Array.prototype.map.call(document.querySelectorAll(selector), function (el) {
+        return (el.innerText || el.textContent || "").trim();
+    });
+}
+
+function satisfied(current) {
+    if (!current.length) { return false; }
+    if (expected !== null && current.every(function (t) { return t.indexOf(expected) !== -1; })) {
+        return true;
+    }
+    return JSON.stringify(current) !== JSON.stringify(previous);
+}
+
+var settleTimer = null, finished = false;
+var observer = new MutationObserver(function () {
+    clearTimeout(settleTimer);
+    settleTimer = setTimeout(check, settleMs);
+});
+
+function finish(timedOut) {
+    if (finished) { return; }
+    finished = true;
+    observer.disconnect();
+    clearTimeout(settleTimer);
+    done({texts: texts(), timedOut: timedOut});
+}
+
+function check() {
+    if (satisfied(texts())) { finish(false); }
+}
+
+observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+setTimeout(function () { finish(true); }, timeoutMs);
+check();
+"""
+
+WAIT_FOR_DOM_QUIET_JS = """
+var quietMs = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+var mutations = 0, quietTimer = null, finished = false;
+
+var observer = new MutationObserver(function (records) {
+    mutations += records.length;
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(function () { finish(false); }, quietMs);
+});
+
+function finish(timedOut) {
+    if (finished) { return; }
+    finished = true;
+    observer.disconnect();
+    clearTimeout(quietTimer);
+    done({mutations: mutations, timedOut: timedOut});
+}
+
+observer.observe(document.documentElement, {childList: true, subtree: true});
+quietTimer = setTimeout(function () { finish(false); }, quietMs);
+setTimeout(function () { finish(true); }, timeoutMs);
+"""
+
+SCROLL_TO_BOTTOM_JS = """
+window.scrollTo(0, document.body.scrollHeight);
+return {height: document.body.scrollHeight, nodes: document.getElementsByTagName("*").length};
+"""
+
+
+def _run_async(driver, script, timeout, *args):
+    # Keep the WebDriver script timeout above the in-page timeout for this call only; the
+    # driver is shared with other checks (and daemon jobs) that expect their own setting
+    previous = driver.timeouts.script
+    driver.set_script_timeout(timeout + 5)
+    try:
+        return driver.execute_async_script(script, *args)
+    finally:
+        driver.set_script_timeout(previous)
+
+
+def wait_for_text_change(driver, selector, previous, expected=None, timeout=10, settle=0.2):
+    """
+    Wait until the texts of the elements matching `selector` differ from `previous`.
+
+    A MutationObserver re-checks the texts whenever the DOM has been quiet for `settle`
+    seconds, so the wait returns as soon as the update has landed instead of after a fixed sleep.
+
+    Args:
+        driver (webdriver): Selenium WebDriver instance.
+        selector (str): CSS selector of the elements to watch.
+        previous (list): Texts observed before the action.
+        expected (str | None): Also stop once every text contains this substring.
+        timeout (float): Maximum seconds to wait.
+        settle (float): Seconds without DOM mutations before the texts are compared.
+
+    Returns:
+        list: The texts at the moment the wait ended (also when it timed out).
+    """
+    outcome = _run_async(
+        driver, WAIT_FOR_TEXT_CHANGE_JS, timeout,
+        selector, list(previous), expected, int(timeout * 1000), int(settle * 1000),
+    )
+    if outcome["timedOut"]:
+        logging.warning(f"Texts of '{selector}' did not change within {timeout}s.")
+    return outcome["texts"]
+
+
+def wait_for_dom_quiet(driver, quiet=0.5, timeout=10):
+    """
+    Wait until no nodes have been added or removed for `quiet` seconds.
+
+    Args:
+        driver (webdriver): Selenium WebDriver instance.
+        quiet (float): Seconds without mutations that count as settled.
+        timeout (float): Maximum seconds to wait.
+
+    Returns:
+        int: Number of mutation records observed while waiting.
+    """
+    outcome = _run_async(driver, WAIT_FOR_DOM_QUIET_JS, timeout, int(quiet * 1000), int(timeout * 1000))
+    if outcome["timedOut"]:
+        logging.warning(f"DOM did not settle within {timeout}s.")
+    return outcome["mutations"]
+
+
+def scroll_until_stable(driver, max_rounds=5, quiet=0.5, timeout=3):
+    """
+    Scroll to the bottom repeatedly until scrolling no longer lazy-loads new content.
+
+    Args:
+        driver (webdriver): Selenium WebDriver instance.
+        max_rounds (int): Maximum number of scrolls.
+        quiet (float): Seconds without added/removed nodes after a scroll that count as settled.
+        timeout (float): Maximum seconds to wait after each scroll.
+
+    Returns:
+        int: Number of scrolls performed.
+    """
+    for rounds in range(1, max_rounds + 1):
+        before = driver.execute_script(SCROLL_TO_BOTTOM_JS)
+        wait_for_dom_quiet(driver, quiet=quiet, timeout=timeout)
+        after = driver.execute_script(SCROLL_TO_BOTTOM_JS)
+        # No new nodes and no extra height: nothing more is lazy-loaded
+        if before == after:
+            logging.info(f"Page stopped growing after {rounds} scroll(s).")
+            return rounds
+    logging.warning(f"Page was still growing after {max_rounds} scrolls.")
+    return max_rounds